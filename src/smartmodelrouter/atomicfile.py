@@ -0,0 +1,33 @@
+"""Atomic replacement of files written by several processes or threads."""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+
+@contextlib.contextmanager
+def atomic_writer(path: str | os.PathLike[str]) -> Iterator[BinaryIO]:
+    """Write ``path`` through a temporary file that replaces it on success.
+
+    Readers see either the old or the new content, never a partial file. The
+    temporary file sits next to ``path`` and is named after the process and
+    thread, so concurrent writers never share one; it is removed if writing
+    fails.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_path.open("wb") as fh:
+            yield fh
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+__all__ = ["atomic_writer"]
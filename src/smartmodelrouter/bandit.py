@@ -0,0 +1,245 @@
+"""Contextual-bandit router that learns from live request outcomes."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from .atomicfile import atomic_writer
+from .embeddings import embed_texts
+
+_POLICIES = ("linucb", "thompson")
+
+
+class _ArmState(NamedTuple):
+    """Immutable snapshot of one model's ridge-regression state."""
+
+    a_inv: np.ndarray
+    b: np.ndarray
+    theta: np.ndarray
+    pulls: int
+
+
+@dataclass(frozen=True)
+class RoutingDecision:
+    """The model chosen for a request and the context it was chosen for."""
+
+    model: str
+    features: np.ndarray
+    scores: dict[str, float]
+
+
+class OnlineRouter:
+    """Pick a model per prompt with LinUCB or Thompson sampling.
+
+    Prompts are featurized with the package's hashing embedder plus a constant
+    bias term. Each model keeps the inverse of its ridge-regression design
+    matrix, which is updated in ``O(d**2)`` with the Sherman-Morrison formula
+    when an outcome is reported.
+
+    Selection never takes a lock: every model's state is an immutable snapshot
+    that :meth:`update` replaces atomically, so concurrent :meth:`select` calls
+    read a consistent, possibly slightly stale, view. Updates to the same model
+    are serialized by a per-model lock.
+
+    Parameters
+    ----------
+    models:
+        Candidate model identifiers.
+    policy:
+        ``"linucb"`` or ``"thompson"``.
+    alpha:
+        Exploration strength: the UCB width multiplier for LinUCB or the
+        posterior scale for Thompson sampling.
+    ridge:
+        L2 regularization, i.e. the initial diagonal of the design matrix.
+    latency_weight:
+        Reward penalty per second of latency.
+    token_weight:
+        Reward penalty per token, multiplied by the model's entry in
+        ``token_prices``.
+    token_prices:
+        Relative price per token for each model. Unlisted models default to 1.
+    dim:
+        Width of the context vectors; defaults to that of :meth:`featurize`.
+        A different width raises ``ValueError``.
+    seed:
+        Seed for Thompson sampling.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        policy: str = "linucb",
+        alpha: float = 1.0,
+        ridge: float = 1.0,
+        latency_weight: float = 0.0,
+        token_weight: float = 0.0,
+        token_prices: Mapping[str, float] | None = None,
+        dim: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        if policy not in _POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; expected one of {_POLICIES}")
+        if not models:
+            raise ValueError("At least one model is required")
+        self.models = list(models)
+        self.policy = policy
+        self.alpha = alpha
+        self.ridge = ridge
+        self.latency_weight = latency_weight
+        self.token_weight = token_weight
+        self.token_prices = dict(token_prices or {})
+        width = self.featurize("").shape[0]
+        if dim is not None and dim != width:
+            raise ValueError(f"dim {dim} does not match the featurizer width {width}")
+        self.dim = width
+        self._index = {model: i for i, model in enumerate(self.models)}
+        eye = np.eye(self.dim) / ridge
+        zeros = np.zeros(self.dim)
+        self._arms = [_ArmState(eye, zeros, zeros, 0) for _ in self.models]
+        self._locks = [threading.Lock() for _ in self.models]
+        self._rng_local = threading.local()
+        self._seed = seed
+
+    def _rng(self) -> np.random.Generator:
+        rng = getattr(self._rng_local, "rng", None)
+        if rng is None:
+            seed = None if self._seed is None else self._seed + threading.get_ident()
+            rng = self._rng_local.rng = np.random.default_rng(seed)
+        return rng
+
+    def featurize(self, prompt: str) -> np.ndarray:
+        """Return the context vector for ``prompt``."""
+        embedding = embed_texts([prompt])[0]
+        return np.concatenate(([1.0], embedding))
+
+    def _scores(self, x: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.models))
+        thompson = self.policy == "thompson"
+        rng = self._rng() if thompson else None
+        for i, arm in enumerate(self._arms):
+            mean = arm.theta @ x
+            width = np.sqrt(max(x @ arm.a_inv @ x, 0.0))
+            if thompson:
+                scores[i] = rng.normal(mean, self.alpha * width)
+            else:
+                scores[i] = mean + self.alpha * width
+        return scores
+
+    def select(
+        self,
+        prompt: str | None = None,
+        features: np.ndarray | None = None,
+        candidates: Sequence[str] | None = None,
+    ) -> RoutingDecision:
+        """Choose a model for ``prompt`` or a pre-computed ``features`` vector.
+
+        ``candidates`` restricts the choice to a subset of the models, e.g. the
+        ones whose circuit breaker is closed.
+        """
+        if features is None:
+            if prompt is None:
+                raise ValueError("Either prompt or features is required")
+            features = self.featurize(prompt)
+        x = np.asarray(features, dtype=np.float64)
+        if x.shape != (self.dim,):
+            raise ValueError(f"features must have shape ({self.dim},), got {x.shape}")
+        scores = self._scores(x)
+        allowed = self.models if candidates is None else list(candidates)
+        if not allowed:
+            raise ValueError("No candidate models")
+        best = max(allowed, key=lambda model: scores[self._index[model]])
+        return RoutingDecision(
+            model=best,
+            features=x,
+            scores={model: float(scores[self._index[model]]) for model in allowed},
+        )
+
+    def reward(
+        self,
+        model: str,
+        success: float,
+        latency: float | None = None,
+        tokens: int | None = None,
+    ) -> float:
+        """Return the scalar reward for an outcome of ``model``."""
+        value = float(success)
+        if latency is not None:
+            value -= self.latency_weight * latency
+        if tokens is not None:
+            value -= self.token_weight * tokens * self.token_prices.get(model, 1.0)
+        return value
+
+    def update(self, model: str, features: np.ndarray, reward: float) -> None:
+        """Fold a single ``(features, reward)`` observation into ``model``."""
+        i = self._index[model]
+        x = np.asarray(features, dtype=np.float64)
+        with self._locks[i]:
+            arm = self._arms[i]
+            a_inv_x = arm.a_inv @ x
+            a_inv = arm.a_inv - np.outer(a_inv_x, a_inv_x) / (1.0 + x @ a_inv_x)
+            b = arm.b + reward * x
+            self._arms[i] = _ArmState(a_inv, b, a_inv @ b, arm.pulls + 1)
+
+    def report(
+        self,
+        decision: RoutingDecision,
+        success: float,
+        latency: float | None = None,
+        tokens: int | None = None,
+    ) -> float:
+        """Record the outcome of ``decision`` and return the reward applied."""
+        value = self.reward(decision.model, success, latency=latency, tokens=tokens)
+        self.update(decision.model, decision.features, value)
+        return value
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return the number of observations per model."""
+        return {model: {"pulls": arm.pulls} for model, arm in zip(self.models, self._arms)}
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Checkpoint the router state to ``path`` (an ``.npz`` file)."""
+        path = Path(path)
+        arms = list(self._arms)
+        config = {
+            "models": self.models,
+            "policy": self.policy,
+            "alpha": self.alpha,
+            "ridge": self.ridge,
+            "latency_weight": self.latency_weight,
+            "token_weight": self.token_weight,
+            "token_prices": self.token_prices,
+            "dim": self.dim,
+            "seed": self._seed,
+        }
+        with atomic_writer(path) as fh:
+            np.savez(
+                fh,
+                config=np.array(json.dumps(config)),
+                a_inv=np.stack([arm.a_inv for arm in arms]),
+                b=np.stack([arm.b for arm in arms]),
+                pulls=np.array([arm.pulls for arm in arms]),
+            )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> OnlineRouter:
+        """Restore a router written by :meth:`save`."""
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            router = cls(**config)
+            for i, (a_inv, b, pulls) in enumerate(
+                zip(data["a_inv"], data["b"], data["pulls"])
+            ):
+                router._arms[i] = _ArmState(a_inv, b, a_inv @ b, int(pulls))
+        return router
+
+
+__all__ = ["OnlineRouter", "RoutingDecision"]
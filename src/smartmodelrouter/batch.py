@@ -0,0 +1,262 @@
+"""Bulk chat completions through the OpenAI-compatible Batch API."""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from .llm import MODEL_NAME, _get_client
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Upper bound on requests per batch file accepted by the OpenAI Batch API.
+MAX_BATCH_REQUESTS = 50_000
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchError(RuntimeError):
+    """Raised when batch requests still fail after every retry.
+
+    ``failed`` maps the ``custom_id`` of each failed request to its error.
+    """
+
+    def __init__(self, message: str, failed: Mapping[str, str]) -> None:
+        super().__init__(message)
+        self.failed = dict(failed)
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    """How batches are submitted and polled.
+
+    Attributes
+    ----------
+    poll_interval:
+        Seconds before the first status check of a batch.
+    max_poll_interval:
+        Upper bound on the delay between status checks.
+    backoff:
+        Factor by which the delay grows after every check.
+    timeout:
+        Seconds to wait for a batch before raising :class:`TimeoutError`, or
+        ``None`` to wait for the provider's ``completion_window``.
+    completion_window:
+        Completion window requested from the provider.
+    max_requests:
+        Maximum requests per batch; larger workloads are split.
+    retries:
+        Number of times failed requests are resubmitted in a new batch.
+    """
+
+    poll_interval: float = 5.0
+    max_poll_interval: float = 60.0
+    backoff: float = 2.0
+    timeout: float | None = None
+    completion_window: str = "24h"
+    max_requests: int = MAX_BATCH_REQUESTS
+    retries: int = 1
+
+    def __post_init__(self) -> None:
+        if self.poll_interval <= 0 or self.max_poll_interval < self.poll_interval:
+            raise ValueError("poll intervals must be positive and ordered")
+        if self.backoff < 1:
+            raise ValueError("backoff must be at least 1")
+        if not 1 <= self.max_requests <= MAX_BATCH_REQUESTS:
+            raise ValueError(f"max_requests must be between 1 and {MAX_BATCH_REQUESTS}")
+        if self.retries < 0:
+            raise ValueError("retries must not be negative")
+
+
+def request_line(
+    custom_id: str,
+    prompt: str,
+    model: str | None = None,
+    max_tokens: int = 1024,
+    temperature: float = 0,
+) -> dict[str, Any]:
+    """Return the batch input line of one chat completion request."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model or MODEL_NAME,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+    }
+
+
+def submit_batch(
+    lines: Iterable[Mapping[str, Any]],
+    settings: BatchSettings | None = None,
+    client: Any = None,
+) -> str:
+    """Upload ``lines`` as a JSONL file, create a batch from it and return its id."""
+    settings = settings or BatchSettings()
+    client = client or _get_client()
+    data = b"".join(json.dumps(line).encode("utf-8") + b"\n" for line in lines)
+    uploaded = client.files.create(
+        file=("batch.jsonl", data, "application/jsonl"), purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=settings.completion_window,
+    )
+    return batch.id
+
+
+def wait_for_batch(
+    batch_id: str, settings: BatchSettings | None = None, client: Any = None
+) -> Any:
+    """Poll batch ``batch_id`` with exponential backoff until it finishes.
+
+    Returns the final batch object, whose status is one of
+    :data:`TERMINAL_STATUSES`.
+    """
+    settings = settings or BatchSettings()
+    client = client or _get_client()
+    deadline = None if settings.timeout is None else time.monotonic() + settings.timeout
+    interval = settings.poll_interval
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Batch {batch_id} did not finish within {settings.timeout}s"
+                )
+            interval = min(interval, remaining)
+        time.sleep(interval)
+        interval = min(interval * settings.backoff, settings.max_poll_interval)
+
+
+def _error_message(item: Mapping[str, Any]) -> str:
+    error = item.get("error") or (item.get("response") or {}).get("body", {}).get("error")
+    if isinstance(error, Mapping):
+        return str(error.get("message") or error)
+    status = (item.get("response") or {}).get("status_code")
+    return str(error) if error else f"Request failed with status {status}"
+
+
+def fetch_results(
+    batch: Any, client: Any = None
+) -> tuple[dict[str, dict[str, Any]], dict[str, str]]:
+    """Download the output and error files of a finished ``batch``.
+
+    Returns
+    -------
+    tuple
+        ``(results, failed)``: ``results`` maps ``custom_id`` to a mapping with
+        the same keys as :func:`smartmodelrouter.llm.chat_completion` returns
+        (``response`` is the raw completion body), ``failed`` maps
+        ``custom_id`` to an error message.
+    """
+    client = client or _get_client()
+    results: dict[str, dict[str, Any]] = {}
+    failed: dict[str, str] = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            custom_id = item["custom_id"]
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                failed[custom_id] = _error_message(item)
+                continue
+            body = response.get("body") or {}
+            choices = body.get("choices") or []
+            content = (choices[0].get("message") or {}).get("content") if choices else None
+            if content is None:
+                failed[custom_id] = "Completion returned no message content"
+                continue
+            results[custom_id] = {
+                "model": body.get("model"),
+                "message": content,
+                "usage": body.get("usage"),
+                "response": body,
+            }
+    return results, failed
+
+
+def iter_batch(
+    lines: Iterable[Mapping[str, Any]],
+    settings: BatchSettings | None = None,
+    client: Any = None,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Run request ``lines`` as batches and yield ``(custom_id, result)`` pairs.
+
+    The requests are split into batches of at most ``settings.max_requests``,
+    all submitted before the first is polled. Results are yielded as each
+    batch finishes, so callers can persist them before the rest arrive.
+    Requests that fail, or are missing from an expired, cancelled or failed
+    batch, are resubmitted up to ``settings.retries`` times.
+
+    Raises
+    ------
+    BatchError
+        After every successful result has been yielded, if some requests
+        still failed.
+    """
+    settings = settings or BatchSettings()
+    client = client or _get_client()
+    pending = {line["custom_id"]: line for line in lines}
+    failed: dict[str, str] = {}
+    for _ in range(settings.retries + 1):
+        if not pending:
+            break
+        items = list(pending.values())
+        chunks = [
+            items[start : start + settings.max_requests]
+            for start in range(0, len(items), settings.max_requests)
+        ]
+        submitted = [(submit_batch(chunk, settings, client), chunk) for chunk in chunks]
+        failed = {}
+        for batch_id, chunk in submitted:
+            batch = wait_for_batch(batch_id, settings, client)
+            results, errors = fetch_results(batch, client)
+            failed.update(errors)
+            for custom_id, result in results.items():
+                if pending.pop(custom_id, None) is not None:
+                    yield custom_id, result
+            reason = (
+                "Request missing from batch output"
+                if batch.status == "completed"
+                else f"Batch {batch_id} {batch.status}"
+            )
+            for line in chunk:
+                if line["custom_id"] in pending:
+                    failed.setdefault(line["custom_id"], reason)
+    if pending:
+        raise BatchError(f"{len(pending)} batch requests failed", failed)
+
+
+def run_batch(
+    lines: Iterable[Mapping[str, Any]],
+    settings: BatchSettings | None = None,
+    client: Any = None,
+) -> dict[str, dict[str, Any]]:
+    """Return the results of :func:`iter_batch` keyed by ``custom_id``."""
+    return dict(iter_batch(lines, settings, client))
+
+
+__all__ = [
+    "BATCH_ENDPOINT",
+    "BatchError",
+    "BatchSettings",
+    "fetch_results",
+    "iter_batch",
+    "request_line",
+    "run_batch",
+    "submit_batch",
+    "wait_for_batch",
+]
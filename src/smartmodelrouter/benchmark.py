@@ -2,36 +2,112 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
-from pathlib import Path
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Any
 
-import httpx
+from .batch import BatchSettings, iter_batch, request_line
+from .datasets import _get_entry, load_dataset
+from .grading import answer_matches
+from .llm import achat_completion, chat_completion
+from .results import ResultSink
+from .stopping import EarlyStopping
 
-from .llm import chat_completion
 
-_DATA_URL_TEMPLATE = (
-    "https://raw.githubusercontent.com/LiveBench/LiveBench/main/data/{dataset}.json"
-)
+def _load_dataset(dataset: str) -> Sequence[dict[str, Any]]:
+    """Return the questions for ``dataset``.
 
+    Served from the dataset cache in :mod:`smartmodelrouter.datasets`, which
+    downloads from the official LiveBench repository when needed and falls back
+    to a bundled local copy when the network is unavailable.
+    """
+    return load_dataset(dataset)
 
-def _load_dataset(dataset: str) -> list[dict[str, Any]]:
-    """Return the questions for ``dataset``.
 
-    Attempts to download the dataset from the official LiveBench repository. If
-    the network request fails, falls back to reading a bundled local copy.
+def _is_correct(message: str, answer: Any) -> bool:
+    """Return whether ``message`` states the reference ``answer``.
+
+    Uses :func:`smartmodelrouter.grading.answer_matches`; coding responses are
+    only executed when stored runs are re-scored with
+    :func:`smartmodelrouter.grading.grade_records`.
     """
-    url = _DATA_URL_TEMPLATE.format(dataset=dataset)
-    try:
-        response = httpx.get(url, timeout=10.0)
-        response.raise_for_status()
-        return response.json()
-    except Exception:
-        local_path = Path(__file__).parent / "data" / f"{dataset}.json"
-        if not local_path.exists():  # pragma: no cover - developer error
-            raise RuntimeError(f"Dataset '{dataset}' not available")
-        with local_path.open("r", encoding="utf-8") as fh:
-            return json.load(fh)
+    return answer_matches(message, answer)
+
+
+def _run_record(
+    model: str,
+    dataset: str,
+    index: int,
+    run: int,
+    entry: dict[str, Any],
+    result: dict[str, Any],
+    latency: float | None,
+) -> dict[str, Any]:
+    """Return the record of one completed run."""
+    message = result["message"].strip()
+    return {
+        "model": model,
+        "dataset": dataset,
+        "index": index,
+        "run": run,
+        "problem": entry["question"],
+        "message": message,
+        "usage": result.get("usage"),
+        "latency": latency,
+        "correct": _is_correct(message, entry.get("answer")),
+    }
+
+
+def _restored_record(
+    sink: ResultSink | None, model: str, dataset: str, index: int, run: int
+) -> dict[str, Any] | None:
+    """Return the checkpointed record of a run, if ``sink`` has one."""
+    if sink is None:
+        return None
+    return sink.get((model, dataset, index, run))
+
+
+class _Tally:
+    """Accumulate the runs of one problem and apply an early-stopping rule."""
+
+    def __init__(self, answer: Any, stopping: EarlyStopping | None) -> None:
+        self.answer = answer
+        self.stopping = stopping
+        self.responses: list[str] = []
+        self.correct = 0
+        self.calls = 0
+        self.stopped: str | None = None
+
+    def add(self, record: dict[str, Any], called: bool) -> bool:
+        """Count one run and return whether sampling should stop."""
+        message = record["message"]
+        self.responses.append(message)
+        self.correct += _is_correct(message, self.answer)
+        self.calls += called
+        if self.stopping is not None:
+            self.stopped = self.stopping.check(self.responses, self.correct)
+        return self.stopped is not None
+
+    def result(self, model: str, prompt: str, runs: int) -> dict[str, Any]:
+        """Return the :func:`evaluate_model` result for ``runs`` requested runs."""
+        responses, correct = self.responses, self.correct
+        if self.stopped == "identical":
+            # The skipped runs are taken to repeat the identical responses.
+            responses = responses + [responses[0]] * (runs - len(responses))
+            correct = len(responses) if correct else 0
+        return {
+            "model": model,
+            "runs": len(responses),
+            "correct": correct,
+            "responses": responses,
+            "problem": prompt,
+            "calls": self.calls,
+            "stopped": self.stopped,
+        }
 
 
 def evaluate_model(
@@ -39,6 +115,9 @@ def evaluate_model(
     dataset: str,
     index: int,
     runs: int = 10,
+    sink: ResultSink | None = None,
+    stopping: EarlyStopping | None = None,
+    batch: BatchSettings | None = None,
 ) -> dict[str, Any]:
     """Run ``runs`` evaluations of ``model`` on a LiveBench problem.
 
@@ -52,39 +131,408 @@ def evaluate_model(
         Zero-based index of the problem in the dataset.
     runs:
         Number of times to query the model. Defaults to 10.
+    sink:
+        Checkpoint that receives every run as it completes. Runs already
+        recorded in it are not repeated.
+    stopping:
+        Optional :class:`~smartmodelrouter.stopping.EarlyStopping` rule
+        checked after every run. Once it fires no further runs are made, so
+        ``runs`` becomes an upper bound.
+    batch:
+        Submit all runs through the provider's Batch API with these
+        :class:`~smartmodelrouter.batch.BatchSettings` instead of calling
+        :func:`~smartmodelrouter.llm.chat_completion` once per run. Cannot be
+        combined with ``stopping``.
 
     Returns
     -------
     dict
-        Mapping with keys ``model``, ``runs``, ``correct``, ``responses`` and
-        ``problem``.
+        Mapping with keys ``model``, ``runs``, ``correct``, ``responses``,
+        ``problem``, ``calls`` and ``stopped``. ``calls`` is the number of
+        completions actually requested (runs restored from ``sink`` are not
+        counted) and ``stopped`` the rule that ended sampling early, if any.
+        When sampling stops on a settled estimate, ``runs`` and ``responses``
+        cover only the runs made; when it stops on identical responses, the
+        skipped runs are filled in with the repeated response.
     """
-    questions = _load_dataset(dataset)
-    try:
-        entry = questions[index]
-    except IndexError as exc:  # pragma: no cover - invalid test usage
-        raise IndexError(
-            f"Problem index {index} out of range for dataset '{dataset}'"
-        ) from exc
+    if batch is not None and stopping is not None:
+        raise ValueError("stopping cannot be combined with batch")
+    entry = _get_entry(_load_dataset(dataset), dataset, index)
 
     prompt = entry["question"]
-    answer = entry.get("answer")
+    tally = _Tally(entry.get("answer"), stopping)
+    if batch is not None:
+        restored = {
+            run
+            for run in range(runs)
+            if _restored_record(sink, model, dataset, index, run) is not None
+        }
+        records = iter_suite([model], [dataset], [index], runs=runs, sink=sink, batch=batch)
+        for record in sorted(records, key=lambda record: record["run"]):
+            tally.add(record, record["run"] not in restored)
+        return tally.result(model, prompt, runs)
+
+    for run in range(runs):
+        record = _restored_record(sink, model, dataset, index, run)
+        called = record is None
+        if called:
+            started = time.perf_counter()
+            result = chat_completion(prompt, model=model, max_tokens=1024, temperature=0)
+            record = _run_record(
+                model, dataset, index, run, entry, result, time.perf_counter() - started
+            )
+            if sink is not None:
+                sink.write(record)
+        if tally.add(record, called):
+            break
+
+    return tally.result(model, prompt, runs)
+
+
+async def aevaluate_model(
+    model: str,
+    dataset: str,
+    index: int,
+    runs: int = 10,
+    concurrency: int = 10,
+    sink: ResultSink | None = None,
+    stopping: EarlyStopping | None = None,
+) -> dict[str, Any]:
+    """Asynchronously run ``runs`` evaluations of ``model`` on a LiveBench problem.
+
+    All ``runs`` requests are issued at once through
+    :func:`smartmodelrouter.llm.achat_completion`, with at most ``concurrency``
+    of them in flight at any time. With ``stopping``, runs are instead issued
+    in waves: the first covers the runs the rule needs before it can fire
+    (:attr:`~smartmodelrouter.stopping.EarlyStopping.first_check`), each later
+    one up to ``concurrency`` runs, and the rule is checked in run order after
+    every wave. Parameters (including ``sink``) and return value otherwise
+    match :func:`evaluate_model`; ``responses`` keeps the order of the runs.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    questions = await asyncio.to_thread(_load_dataset, dataset)
+    entry = _get_entry(questions, dataset, index)
+
+    prompt = entry["question"]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_once(run: int) -> tuple[dict[str, Any], bool]:
+        record = _restored_record(sink, model, dataset, index, run)
+        if record is not None:
+            return record, False
+        async with semaphore:
+            started = time.perf_counter()
+            result = await achat_completion(
+                prompt, model=model, max_tokens=1024, temperature=0
+            )
+        record = _run_record(
+            model, dataset, index, run, entry, result, time.perf_counter() - started
+        )
+        if sink is not None:
+            sink.write(record)
+        return record, True
+
+    tally = _Tally(entry.get("answer"), stopping)
+    wave = runs if stopping is None else stopping.first_check
+    done = 0
+    while done < runs:
+        end = min(done + wave, runs)
+        outcomes = await asyncio.gather(*(run_once(run) for run in range(done, end)))
+        if any(tally.add(record, called) for record, called in outcomes):
+            # Completions already made past the stopping point still count.
+            tally.calls += sum(called for _, called in outcomes[len(tally.responses) - done :])
+            break
+        done, wave = end, concurrency
+
+    return tally.result(model, prompt, runs)
+
+
+def _resolve_indices(
+    dataset: str,
+    questions: Sequence[dict[str, Any]],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None,
+) -> list[int]:
+    """Return the problem indices of ``dataset`` selected by ``indices``."""
+    if indices is None:
+        return list(range(len(questions)))
+    if isinstance(indices, Mapping):
+        selected = indices.get(dataset)
+        return list(range(len(questions))) if selected is None else list(selected)
+    return list(indices)
+
+
+def _model_limit(model: str, model_concurrency: int | Mapping[str, int]) -> int:
+    """Return the in-flight request limit for ``model``."""
+    if isinstance(model_concurrency, Mapping):
+        limit = model_concurrency.get(model, 1)
+    else:
+        limit = model_concurrency
+    if limit < 1:
+        raise ValueError(f"Concurrency for model '{model}' must be at least 1")
+    return limit
 
-    responses: list[str] = []
-    correct = 0
-    for _ in range(runs):
+
+def iter_suite(
+    models: Sequence[str],
+    datasets: Sequence[str],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None = None,
+    runs: int = 10,
+    max_workers: int = 32,
+    model_concurrency: int | Mapping[str, int] = 4,
+    sink: ResultSink | None = None,
+    batch: BatchSettings | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield individual run results of a model/dataset sweep as they finish.
+
+    Every ``(model, dataset, index, run)`` combination becomes one
+    :func:`smartmodelrouter.llm.chat_completion` call scheduled on a shared
+    thread pool of ``max_workers`` threads. Each model has its own queue and
+    never has more than ``model_concurrency`` requests in flight, and models
+    are served round-robin, so a sweep takes roughly as long as its slowest
+    model rather than the sum of all calls.
+
+    Parameters
+    ----------
+    models:
+        Model identifiers to evaluate.
+    datasets:
+        Dataset names, e.g. ``"reasoning"``, ``"math"`` and ``"coding"``.
+    indices:
+        Problem indices to evaluate. Either a sequence applied to every dataset,
+        a mapping of dataset name to indices, or ``None`` for every problem.
+    runs:
+        Number of times to query each model on each problem.
+    max_workers:
+        Size of the shared worker pool.
+    model_concurrency:
+        Maximum in-flight requests per model, either one value for every model
+        or a mapping of model to limit (unlisted models default to 1).
+    sink:
+        Checkpoint that receives every run as it completes. Runs already
+        recorded in it are yielded first, from the checkpoint, and not
+        repeated, so an interrupted sweep resumes where it stopped.
+    batch:
+        Instead of scheduling calls, submit every run through the provider's
+        Batch API (:func:`smartmodelrouter.batch.iter_batch`) with these
+        settings. Runs are yielded, and written to ``sink``, as each batch
+        finishes, with ``latency`` set to ``None``; ``max_workers`` and
+        ``model_concurrency`` are ignored.
+
+    Yields
+    ------
+    dict
+        Mapping with keys ``model``, ``dataset``, ``index``, ``run``,
+        ``problem``, ``message``, ``usage``, ``latency`` (seconds) and
+        ``correct``.
+    """
+    for record, _ in _iter_suite_runs(
+        models, datasets, indices, runs, max_workers, model_concurrency, sink, batch
+    ):
+        yield record
+
+
+def _iter_suite_runs(
+    models: Sequence[str],
+    datasets: Sequence[str],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None,
+    runs: int,
+    max_workers: int,
+    model_concurrency: int | Mapping[str, int],
+    sink: ResultSink | None,
+    batch: BatchSettings | None,
+) -> Iterator[tuple[dict[str, Any], bool]]:
+    """Yield ``(record, called)`` for the runs of :func:`iter_suite`.
+
+    ``called`` is false for runs restored from ``sink``.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    problems: dict[tuple[str, int], dict[str, Any]] = {}
+    for dataset in datasets:
+        questions = _load_dataset(dataset)
+        for index in _resolve_indices(dataset, questions, indices):
+            problems[(dataset, index)] = _get_entry(questions, dataset, index)
+
+    pending: dict[str, deque[tuple[str, int, int]]] = {model: deque() for model in models}
+    for model in models:
+        for (dataset, index), entry in problems.items():
+            for run in range(runs):
+                record = _restored_record(sink, model, dataset, index, run)
+                if record is None:
+                    pending[model].append((dataset, index, run))
+                else:
+                    yield {
+                        **record,
+                        "problem": entry["question"],
+                        "correct": _is_correct(record["message"], entry.get("answer")),
+                    }, False
+    if batch is not None:
+        for record in _iter_batch_runs(pending, problems, sink, batch):
+            yield record, True
+        return
+    limits = {model: _model_limit(model, model_concurrency) for model in models}
+    in_flight = dict.fromkeys(models, 0)
+    futures: dict[Future, tuple[str, str, int, int]] = {}
+
+    def run_once(model: str, prompt: str) -> tuple[dict[str, Any], float]:
+        started = time.perf_counter()
         result = chat_completion(prompt, model=model, max_tokens=1024, temperature=0)
-        message = result["message"].strip()
-        responses.append(message)
-        if answer is not None and message.strip().lower() == str(answer).strip().lower():
-            correct += 1
+        return result, time.perf_counter() - started
 
-    return {
-        "model": model,
-        "runs": runs,
-        "correct": correct,
-        "responses": responses,
-        "problem": prompt,
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+        def fill() -> None:
+            # Round-robin one task per model per pass so every model advances
+            # in parallel instead of draining the first model's queue first.
+            progressed = True
+            while progressed and len(futures) < max_workers:
+                progressed = False
+                for model in models:
+                    if len(futures) >= max_workers:
+                        break
+                    if not pending[model] or in_flight[model] >= limits[model]:
+                        continue
+                    dataset, index, run = pending[model].popleft()
+                    prompt = problems[(dataset, index)]["question"]
+                    future = pool.submit(run_once, model, prompt)
+                    futures[future] = (model, dataset, index, run)
+                    in_flight[model] += 1
+                    progressed = True
+
+        try:
+            fill()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model, dataset, index, run = futures.pop(future)
+                    in_flight[model] -= 1
+                    result, latency = future.result()
+                    record = _run_record(
+                        model, dataset, index, run, problems[(dataset, index)], result, latency
+                    )
+                    if sink is not None:
+                        sink.write(record)
+                    yield record, True
+                fill()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _iter_batch_runs(
+    pending: Mapping[str, Sequence[tuple[str, int, int]]],
+    problems: Mapping[tuple[str, int], dict[str, Any]],
+    sink: ResultSink | None,
+    settings: BatchSettings,
+) -> Iterator[dict[str, Any]]:
+    """Yield the records of ``pending`` runs executed as provider batches."""
+    lines = [
+        request_line(
+            json.dumps([model, dataset, index, run]),
+            problems[(dataset, index)]["question"],
+            model=model,
+            max_tokens=1024,
+            temperature=0,
+        )
+        for model, runs in pending.items()
+        for dataset, index, run in runs
+    ]
+    for custom_id, result in iter_batch(lines, settings):
+        model, dataset, index, run = json.loads(custom_id)
+        record = _run_record(
+            model, dataset, index, run, problems[(dataset, index)], result, None
+        )
+        if sink is not None:
+            sink.write(record)
+        yield record
+
+
+def evaluate_suite(
+    models: Sequence[str],
+    datasets: Sequence[str],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None = None,
+    runs: int = 10,
+    max_workers: int = 32,
+    model_concurrency: int | Mapping[str, int] = 4,
+    on_result: Callable[[dict[str, Any]], None] | None = None,
+    sink: ResultSink | None = None,
+    batch: BatchSettings | None = None,
+) -> dict[str, Any]:
+    """Evaluate every model on every selected problem and aggregate accuracy.
+
+    Runs are scheduled by :func:`iter_suite`; see it for the meaning of the
+    scheduling parameters, of ``sink``, which persists runs and resumes an
+    interrupted evaluation, and of ``batch``, which runs them through the
+    provider's Batch API. ``on_result`` is called with each run result as
+    soon as it completes (and with every run restored from ``sink``), which
+    allows progress reporting.
+
+    Returns
+    -------
+    dict
+        Mapping with keys:
+
+        ``results``
+            ``{model: {dataset: {index: result}}}`` where each ``result`` has
+            the same shape as the return value of :func:`evaluate_model`.
+            Suites do not stop early, so ``stopped`` is always ``None`` and
+            ``calls`` counts the runs not restored from ``sink``.
+        ``accuracy``
+            ``{model: {dataset: fraction_correct}}``.
+        ``overall``
+            ``{model: fraction_correct}`` across all datasets.
+    """
+    outcomes = _iter_suite_runs(
+        models, datasets, indices, runs, max_workers, model_concurrency, sink, batch
+    )
+    return _summarize_suite(models, outcomes, runs, on_result)
+
+
+def _summarize_suite(
+    models: Sequence[str],
+    outcomes: Iterable[tuple[dict[str, Any], bool]],
+    runs: int,
+    on_result: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Aggregate ``(record, called)`` pairs into the :func:`evaluate_suite` result."""
+    results: dict[str, dict[str, dict[int, dict[str, Any]]]] = {
+        model: {} for model in models
     }
+    for record, called in outcomes:
+        if on_result is not None:
+            on_result(record)
+        problem = results[record["model"]].setdefault(record["dataset"], {}).setdefault(
+            record["index"],
+            {
+                "model": record["model"],
+                "runs": runs,
+                "correct": 0,
+                "responses": [None] * runs,
+                "problem": record["problem"],
+                "calls": 0,
+                "stopped": None,
+            },
+        )
+        problem["responses"][record["run"]] = record["message"]
+        problem["correct"] += int(record["correct"])
+        problem["calls"] += called
+
+    accuracy: dict[str, dict[str, float]] = {}
+    overall: dict[str, float] = {}
+    for model, per_dataset in results.items():
+        accuracy[model] = {}
+        total_correct = total_runs = 0
+        for dataset, per_index in per_dataset.items():
+            correct = sum(problem["correct"] for problem in per_index.values())
+            count = sum(problem["runs"] for problem in per_index.values())
+            accuracy[model][dataset] = correct / count if count else 0.0
+            total_correct += correct
+            total_runs += count
+        overall[model] = total_correct / total_runs if total_runs else 0.0
+
+    return {"results": results, "accuracy": accuracy, "overall": overall}
+
 
-__all__ = ["evaluate_model"]
+__all__ = ["aevaluate_model", "evaluate_model", "evaluate_suite", "iter_suite"]
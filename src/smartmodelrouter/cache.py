@@ -0,0 +1,279 @@
+"""Deterministic response cache for chat completions."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Return ``value`` converted to plain JSON-compatible data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    try:
+        json.dumps(value)
+    except TypeError:
+        return None
+    return value
+
+
+class ResponseCache:
+    """Two-tier cache of completion results.
+
+    Results are kept in an in-memory LRU and, when ``path`` is given, in a
+    SQLite database so they survive restarts. Identical requests made while a
+    result is being computed are coalesced: only the first goes over the wire
+    and the others wait for its result.
+
+    Cached results have the same ``model``/``message``/``usage``/``response``
+    shape as :func:`smartmodelrouter.llm.chat_completion`, with ``response``
+    stored as a plain dictionary, and carry ``cached=True``.
+
+    Parameters
+    ----------
+    path:
+        SQLite database file for the persistent tier. ``None`` keeps results in
+        memory only.
+    max_entries:
+        Maximum number of results in the in-memory tier.
+    max_disk_entries:
+        Maximum number of rows in the SQLite tier; least recently used rows are
+        evicted first. ``None`` means unbounded.
+    ttl:
+        Seconds a result stays valid. ``None`` means forever.
+    cache_sampled:
+        Also cache requests with ``temperature > 0``. By default only
+        deterministic (temperature 0) requests are cached.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        max_entries: int = 1024,
+        max_disk_entries: int | None = None,
+        ttl: float | None = None,
+        cache_sampled: bool = False,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.cache_sampled = cache_sampled
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: list[dict[str, Any]],
+        max_tokens: int,
+        temperature: float,
+        base_url: str | None,
+    ) -> str:
+        """Return the cache key for a request."""
+        payload = json.dumps(
+            [model, messages, max_tokens, float(temperature), base_url],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_cache(self, temperature: float) -> bool:
+        """Return whether requests at ``temperature`` are cacheable."""
+        return temperature == 0 or self.cache_sampled
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created >= self.ttl
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached result for ``key`` or ``None``."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    return {**value, "cached": True}
+                del self._memory[key]
+
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        return {**value, "cached": True}
+
+    def _remember(self, key: str, created: float, value: dict[str, Any]) -> None:
+        with self._lock:
+            if self.max_entries <= 0:
+                return
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def set(self, key: str, result: dict[str, Any]) -> None:
+        """Store ``result`` under ``key``."""
+        value = {
+            "message": result["message"],
+            "usage": _to_jsonable(result.get("usage")),
+            "response": _to_jsonable(result.get("response")),
+        }
+        if "model" in result:
+            value["model"] = result["model"]
+        now = time.time()
+        self._remember(key, now, value)
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if self.max_disk_entries is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def _claim(self, key: str) -> tuple[Future, bool]:
+        """Return the in-flight future for ``key`` and whether we own it."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _settle(
+        self,
+        key: str,
+        future: Future,
+        result: dict[str, Any] | None,
+        exc: BaseException | None,
+    ) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Return the cached result for ``key``, computing it at most once.
+
+        Concurrent callers with the same key share a single ``compute`` call.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        future, owner = self._claim(key)
+        if not owner:
+            return {**future.result(), "cached": True}
+        # Waiters are released on every path, even when storing fails.
+        try:
+            # The previous owner may have stored the result after our lookup.
+            cached = self.get(key)
+            if cached is None:
+                result = compute()
+                self.set(key, result)
+        except BaseException as exc:
+            self._settle(key, future, None, exc)
+            raise
+        if cached is not None:
+            self._settle(key, future, cached, None)
+            return cached
+        self._settle(key, future, {**result, "cached": True}, None)
+        return {**result, "cached": False}
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        """Asynchronous counterpart of :meth:`get_or_compute`."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        future, owner = self._claim(key)
+        if not owner:
+            return {**await asyncio.wrap_future(future), "cached": True}
+        # Waiters are released on every path, even when storing fails.
+        try:
+            # The previous owner may have stored the result after our lookup.
+            cached = self.get(key)
+            if cached is None:
+                result = await compute()
+                self.set(key, result)
+        except BaseException as exc:
+            self._settle(key, future, None, exc)
+            raise
+        if cached is not None:
+            self._settle(key, future, cached, None)
+            return cached
+        self._settle(key, future, {**result, "cached": True}, None)
+        return {**result, "cached": False}
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+
+__all__ = ["ResponseCache"]
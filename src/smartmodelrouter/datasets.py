@@ -0,0 +1,359 @@
+"""Cached loading of LiveBench datasets.
+
+Datasets are resolved through two cache levels before falling back to the
+copies bundled with the package:
+
+1. An in-process LRU of loaded datasets.
+2. An on-disk cache of the raw JSON under :func:`cache_dir`, revalidated with
+   ``ETag``/``If-Modified-Since`` once its TTL has expired.
+
+Datasets are never parsed up front: the cached download, the bundled copy and
+any local ``.json`` or ``.jsonl`` file given in place of a dataset name are all
+served through a :class:`~smartmodelrouter.recordfile.RecordFile`, which reads
+entries on access.
+
+Behaviour can be tuned with :func:`configure_dataset_cache` or the
+``SMARTMODELROUTER_CACHE_DIR``, ``SMARTMODELROUTER_DATASET_TTL`` and
+``SMARTMODELROUTER_OFFLINE`` environment variables. In offline mode the network
+is never touched.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from .atomicfile import atomic_writer
+from .recordfile import RecordFile, is_record_file
+
+
+def __getattr__(name: str) -> Any:
+    # httpx is only needed to fetch datasets, so it is imported on first use.
+    if name == "httpx":
+        import httpx
+
+        return httpx
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_DATA_URL_TEMPLATE = (
+    "https://raw.githubusercontent.com/LiveBench/LiveBench/main/data/{dataset}.json"
+)
+_BUNDLED_DIR = Path(__file__).parent / "data"
+_DEFAULT_TTL = 24 * 60 * 60
+_DEFAULT_MAXSIZE = 8
+
+_cache_lock = threading.Lock()
+_memory_cache: OrderedDict[str, tuple[float, Sequence[dict[str, Any]]]] = OrderedDict()
+_dataset_locks: dict[str, threading.Lock] = {}
+_record_files: dict[str, tuple[tuple[int, int], RecordFile]] = {}
+_settings: dict[str, Any] = {
+    "cache_dir": None,
+    "ttl": None,
+    "offline": None,
+    "maxsize": _DEFAULT_MAXSIZE,
+}
+
+
+def configure_dataset_cache(
+    cache_dir: str | os.PathLike[str] | None = None,
+    ttl: float | None = None,
+    offline: bool | None = None,
+    maxsize: int | None = None,
+) -> None:
+    """Override the dataset cache settings.
+
+    Parameters left as ``None`` keep their current value. Explicit settings take
+    precedence over the corresponding environment variables.
+
+    Parameters
+    ----------
+    cache_dir:
+        Directory holding the on-disk cache.
+    ttl:
+        Seconds a cached copy is trusted before it is revalidated.
+    offline:
+        When true, never access the network.
+    maxsize:
+        Maximum number of loaded datasets kept in memory.
+    """
+    with _cache_lock:
+        if cache_dir is not None:
+            _settings["cache_dir"] = Path(cache_dir)
+        if ttl is not None:
+            _settings["ttl"] = float(ttl)
+        if offline is not None:
+            _settings["offline"] = offline
+        if maxsize is not None:
+            if maxsize < 0:
+                raise ValueError("maxsize must be non-negative")
+            _settings["maxsize"] = maxsize
+            while len(_memory_cache) > maxsize:
+                _memory_cache.popitem(last=False)
+
+
+def reset_dataset_cache_config() -> None:
+    """Restore the default cache settings and drop the in-memory cache."""
+    with _cache_lock:
+        _settings.update(
+            cache_dir=None, ttl=None, offline=None, maxsize=_DEFAULT_MAXSIZE
+        )
+        _memory_cache.clear()
+        _record_files.clear()
+
+
+def cache_dir() -> Path:
+    """Return the directory used for the on-disk dataset cache."""
+    configured = _settings["cache_dir"]
+    if configured is not None:
+        return configured
+    env_dir = os.getenv("SMARTMODELROUTER_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "smartmodelrouter" / "datasets"
+
+
+def _ttl() -> float:
+    if _settings["ttl"] is not None:
+        return _settings["ttl"]
+    env_ttl = os.getenv("SMARTMODELROUTER_DATASET_TTL")
+    return float(env_ttl) if env_ttl else float(_DEFAULT_TTL)
+
+
+def is_offline() -> bool:
+    """Return whether dataset loading must avoid the network."""
+    if _settings["offline"] is not None:
+        return bool(_settings["offline"])
+    return os.getenv("SMARTMODELROUTER_OFFLINE", "").lower() in {"1", "true", "yes"}
+
+
+def clear_dataset_cache(disk: bool = False) -> None:
+    """Drop the in-memory dataset cache, and the on-disk cache if ``disk``."""
+    with _cache_lock:
+        _memory_cache.clear()
+        _record_files.clear()
+    if disk:
+        directory = cache_dir()
+        if directory.exists():
+            for pattern in ("*.json", "*.json.idx"):
+                for path in directory.glob(pattern):
+                    path.unlink(missing_ok=True)
+
+
+def _dataset_lock(dataset: str) -> threading.Lock:
+    with _cache_lock:
+        return _dataset_locks.setdefault(dataset, threading.Lock())
+
+
+def _remember(dataset: str, data: Sequence[dict[str, Any]]) -> None:
+    with _cache_lock:
+        maxsize = _settings["maxsize"]
+        if maxsize == 0:
+            return
+        _memory_cache[dataset] = (time.time(), data)
+        _memory_cache.move_to_end(dataset)
+        while len(_memory_cache) > maxsize:
+            _memory_cache.popitem(last=False)
+
+
+def _recall(dataset: str, max_age: float | None) -> Sequence[dict[str, Any]] | None:
+    with _cache_lock:
+        cached = _memory_cache.get(dataset)
+        if cached is None:
+            return None
+        loaded_at, data = cached
+        if max_age is not None and time.time() - loaded_at >= max_age:
+            return None
+        _memory_cache.move_to_end(dataset)
+        return data
+
+
+def _cache_paths(dataset: str) -> tuple[Path, Path]:
+    directory = cache_dir()
+    return directory / f"{dataset}.json", directory / f"{dataset}.meta.json"
+
+
+def _read_meta(meta_path: Path) -> dict[str, Any]:
+    try:
+        with meta_path.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _atomic_write(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_writer(path) as fh:
+        fh.write(content)
+
+
+def _write_meta(meta_path: Path, meta: dict[str, Any]) -> None:
+    _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+def _load_bundled(dataset: str) -> Sequence[dict[str, Any]]:
+    local_path = _BUNDLED_DIR / f"{dataset}.json"
+    if not local_path.exists():  # pragma: no cover - developer error
+        raise RuntimeError(f"Dataset '{dataset}' not available")
+    # The package directory may be read-only, so its index lives in the cache.
+    index = cache_dir() / f"bundled-{dataset}.json.idx"
+    try:
+        index.parent.mkdir(parents=True, exist_ok=True)
+    except OSError:  # pragma: no cover - RecordFile keeps the index in memory
+        pass
+    return _open_record_file(str(local_path), index)
+
+
+def _fetch(dataset: str) -> Sequence[dict[str, Any]]:
+    """Return ``dataset`` from the disk cache, revalidating it when stale."""
+    data_path, meta_path = _cache_paths(dataset)
+    meta = _read_meta(meta_path) if data_path.exists() else {}
+    if meta and time.time() - meta.get("fetched_at", 0) < _ttl():
+        return _open_record_file(str(data_path))
+
+    url = _DATA_URL_TEMPLATE.format(dataset=dataset)
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    import httpx
+
+    response = httpx.get(url, headers=headers, timeout=10.0)
+    if response.status_code == 304 and meta:
+        meta["fetched_at"] = time.time()
+        _write_meta(meta_path, meta)
+        return _open_record_file(str(data_path))
+    response.raise_for_status()
+    try:
+        _atomic_write(data_path, response.content)
+        _write_meta(
+            meta_path,
+            {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            },
+        )
+    except OSError:  # pragma: no cover - read-only cache directory
+        return response.json()
+    return _open_record_file(str(data_path))
+
+
+def _open_record_file(path: str, index: Path | None = None) -> RecordFile:
+    """Return a shared :class:`RecordFile` for ``path``, reopened when it changes.
+
+    The replaced handle is closed.
+    """
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        cached = _record_files.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    records = RecordFile(path, index)
+    with _cache_lock:
+        replaced = _record_files.get(path)
+        _record_files[path] = (version, records)
+    if replaced is not None and replaced[1] is not records:
+        replaced[1].close()
+    return records
+
+
+def _get_entry(
+    questions: Sequence[dict[str, Any]], dataset: str, index: int
+) -> dict[str, Any]:
+    """Return entry ``index`` of ``questions`` with a helpful error message."""
+    try:
+        return questions[index]
+    except IndexError as exc:  # pragma: no cover - invalid test usage
+        raise IndexError(
+            f"Problem index {index} out of range for dataset '{dataset}'"
+        ) from exc
+
+
+def load_dataset(
+    dataset: str,
+    offline: bool | None = None,
+    refresh: bool = False,
+) -> Sequence[dict[str, Any]]:
+    """Return the questions for ``dataset``.
+
+    Parameters
+    ----------
+    dataset:
+        One of ``"reasoning"``, ``"math"`` or ``"coding"``, or the path of a
+        local JSON array or JSON Lines file.
+    offline:
+        Override :func:`is_offline` for this call. Offline loads use the disk
+        cache regardless of age, then the bundled copy.
+    refresh:
+        Bypass the in-memory cache and revalidate the disk cache with the
+        server even if its TTL has not expired.
+
+    Returns
+    -------
+    RecordFile or list
+        A lazily parsed :class:`~smartmodelrouter.recordfile.RecordFile`, or a
+        parsed list when the download could not be stored in the disk cache.
+        Either is shared with the in-memory cache and must not be mutated by
+        callers. A ``RecordFile`` is closed once its file changes and is
+        reopened, so hold on to entries, not to an old dataset.
+    """
+    if is_record_file(dataset):
+        return _open_record_file(dataset)
+    offline = is_offline() if offline is None else offline
+    max_age = None if offline else _ttl()
+    if not refresh:
+        cached = _recall(dataset, max_age)
+        if cached is not None:
+            return cached
+
+    with _dataset_lock(dataset):
+        if not refresh:
+            cached = _recall(dataset, max_age)
+            if cached is not None:
+                return cached
+
+        data_path, meta_path = _cache_paths(dataset)
+        if refresh and meta_path.exists():
+            meta = _read_meta(meta_path)
+            meta["fetched_at"] = 0
+            _write_meta(meta_path, meta)
+
+        data: Sequence[dict[str, Any]] | None = None
+        if offline:
+            if data_path.exists():
+                data = _open_record_file(str(data_path))
+        else:
+            try:
+                data = _fetch(dataset)
+            except Exception:
+                # Serve a stale disk copy when revalidation fails.
+                if data_path.exists():
+                    try:
+                        data = _open_record_file(str(data_path))
+                    except (OSError, ValueError):
+                        data = None
+        if data is None:
+            data = _load_bundled(dataset)
+        _remember(dataset, data)
+        return data
+
+
+__all__ = [
+    "cache_dir",
+    "clear_dataset_cache",
+    "configure_dataset_cache",
+    "is_offline",
+    "load_dataset",
+    "reset_dataset_cache_config",
+]
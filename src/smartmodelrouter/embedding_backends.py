@@ -0,0 +1,187 @@
+"""Pluggable embedding backends, selected by embedding model name."""
+
+from __future__ import annotations
+
+import base64
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Protocol
+
+import numpy as np
+
+from . import embeddings as _embeddings
+from . import llm
+from .ratelimit import estimate_tokens
+from .resilience import RetryPolicy
+
+
+class EmbeddingBackend(Protocol):
+    """Turns texts into a dense ``(len(texts), dim)`` matrix.
+
+    ``config`` identifies the backend and its settings, e.g. as the ``config``
+    of an :class:`~smartmodelrouter.embedding_store.EmbeddingStore`. ``dim``
+    is the row width, or ``None`` while it is not known yet.
+    """
+
+    config: str
+    dim: int | None
+
+    def embed(self, texts: Sequence[str], dtype: type = np.float64) -> np.ndarray:
+        """Return one row per text, in order."""
+        ...
+
+
+class HashingBackend:
+    """The local feature hasher used by :func:`~smartmodelrouter.embeddings.embed_texts`."""
+
+    @property
+    def config(self) -> str:
+        return _embeddings.embedder_config()
+
+    @property
+    def dim(self) -> int:
+        return _embeddings._get_vectorizer().n_features
+
+    def embed(self, texts: Sequence[str], dtype: type = np.float64) -> np.ndarray:
+        return _embeddings.embed_texts(texts, dtype=dtype)
+
+
+class OpenAIEmbeddingBackend:
+    """Backend calling an OpenAI-compatible ``/embeddings`` endpoint.
+
+    Each call sends every distinct text once. The texts are packed, in order,
+    into requests of at most ``max_batch_inputs`` texts and
+    ``max_batch_tokens`` estimated tokens, which are sent ``concurrency`` at a
+    time through the shared client of :mod:`smartmodelrouter.llm` (including
+    its provider registry). Vectors are requested base64-encoded and decoded
+    straight into the result matrix.
+
+    Parameters
+    ----------
+    model:
+        Embedding model name.
+    dimensions:
+        Requested output width, for models that can shorten their embeddings.
+    max_batch_inputs:
+        Maximum number of texts per request.
+    max_batch_tokens:
+        Maximum estimated tokens per request. A longer single text is sent on
+        its own.
+    concurrency:
+        Maximum number of requests in flight.
+    retry_policy:
+        Backoff for transient failures. Defaults to the policy of
+        :func:`~smartmodelrouter.llm.set_retry_policy`.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int | None = None,
+        max_batch_inputs: int = 2048,
+        max_batch_tokens: int = 200_000,
+        concurrency: int = 4,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        if max_batch_inputs < 1 or max_batch_tokens < 1:
+            raise ValueError("batch limits must be at least 1")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.model = model
+        self.dimensions = dimensions
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.retry_policy = retry_policy
+        self.dim = dimensions
+
+    @property
+    def config(self) -> str:
+        return f"openai:{self.model}:dimensions={self.dimensions}"
+
+    def batches(self, texts: Sequence[str]) -> list[tuple[int, int]]:
+        """Return the ``(start, stop)`` slices of ``texts`` sent per request."""
+        spans: list[tuple[int, int]] = []
+        start = tokens = 0
+        for position, text in enumerate(texts):
+            cost = estimate_tokens(text)
+            if position > start and (
+                position - start >= self.max_batch_inputs
+                or tokens + cost > self.max_batch_tokens
+            ):
+                spans.append((start, position))
+                start, tokens = position, 0
+            tokens += cost
+        if start < len(texts):
+            spans.append((start, len(texts)))
+        return spans
+
+    def embed(self, texts: Sequence[str], dtype: type = np.float64) -> np.ndarray:
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return np.empty((0, self.dim or 0), dtype=dtype)
+        spans = self.batches(unique)
+        matrix: np.ndarray | None = None
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(spans))) as pool:
+            futures = [
+                (start, pool.submit(self._request, unique[start:stop])) for start, stop in spans
+            ]
+            for start, future in futures:
+                block = future.result()
+                if matrix is None:
+                    matrix = np.empty((len(unique), block.shape[1]), dtype=dtype)
+                    self.dim = block.shape[1]
+                matrix[start : start + len(block)] = block
+        if len(unique) == len(texts):
+            return matrix
+        row_of = {text: row for row, text in enumerate(unique)}
+        return matrix[[row_of[text] for text in texts]]
+
+    def _request(self, inputs: list[str]) -> np.ndarray:
+        response = self._create(inputs)
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(inputs):
+            raise RuntimeError(f"expected {len(inputs)} embeddings, got {len(data)}")
+        return np.vstack([_decode(item.embedding) for item in data])
+
+    def _create(self, inputs: list[str]) -> Any:
+        extra = {} if self.dimensions is None else {"dimensions": self.dimensions}
+        return llm.call_with_retries(
+            self.model,
+            lambda client: client.embeddings.create(
+                model=self.model, input=inputs, encoding_format="base64", **extra
+            ),
+            retry_policy=self.retry_policy,
+        )
+
+
+def _decode(embedding: str | list[float]) -> np.ndarray:
+    """Return a float32 vector from a base64 or plain list embedding."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
+
+
+_local = HashingBackend()
+_backends: dict[str, EmbeddingBackend] = {}
+
+
+def register_backend(model: str, backend: EmbeddingBackend) -> None:
+    """Use ``backend`` for the embedding model named ``model``."""
+    _backends[model] = backend
+
+
+def get_backend(model: str | None = None) -> EmbeddingBackend:
+    """Return the backend registered for ``model``, or the local hasher."""
+    if model is None:
+        return _local
+    return _backends.get(model, _local)
+
+
+__all__ = [
+    "EmbeddingBackend",
+    "HashingBackend",
+    "OpenAIEmbeddingBackend",
+    "get_backend",
+    "register_backend",
+]
@@ -0,0 +1,244 @@
+"""Persistent, memory-mapped store of embeddings keyed by content hash."""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from .atomicfile import atomic_writer
+
+_KEY_SIZE = 16
+_DTYPE = np.dtype("<f4")
+
+
+def content_key(text: str, config: str = "") -> bytes:
+    """Return the 16-byte key of ``text`` embedded with embedder ``config``."""
+    digest = hashlib.blake2b(digest_size=_KEY_SIZE)
+    digest.update(config.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+class EmbeddingStore:
+    """Append-only on-disk arena of float32 embeddings.
+
+    The store is a directory holding three files:
+
+    ``vectors.f32``
+        Raw little-endian float32 rows of ``dim`` values, memory-mapped for
+        reading.
+    ``keys.bin``
+        One 16-byte :func:`content_key` per row, in row order.
+    ``meta.json``
+        The row width, checked when the store is reopened.
+
+    A row is keyed by a hash of the text together with the embedder
+    ``config``, so embeddings from different embedders can share one store
+    without colliding. New rows are appended under an exclusive file lock, so
+    several processes may add to the same store; rows are never rewritten.
+    Readers only see rows whose key and vector are both complete, and a row
+    left half-written by a crash is discarded by the next writer.
+
+    Parameters
+    ----------
+    path:
+        Directory of the store; created if missing unless ``readonly``.
+    dim:
+        Width of each embedding. May be omitted when opening an existing
+        store.
+    config:
+        Identifier of the embedder, e.g. its model name and settings.
+    readonly:
+        Open without write access. :meth:`add` and :meth:`embed` of unseen
+        texts raise :class:`PermissionError`.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        dim: int | None = None,
+        config: str = "",
+        readonly: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.config = config
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._rows: dict[bytes, int] = {}
+        self._key_bytes = 0
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            stored = json.loads(meta_path.read_text(encoding="utf-8"))["dim"]
+            if dim is not None and dim != stored:
+                raise ValueError(f"store has dimension {stored}, not {dim}")
+            dim = stored
+        elif readonly:
+            raise FileNotFoundError(f"no embedding store at {self.path}")
+        elif dim is None:
+            raise ValueError("dim is required to create a new store")
+        else:
+            if dim < 1:
+                raise ValueError("dim must be at least 1")
+            self.path.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                if not meta_path.exists():
+                    with atomic_writer(meta_path) as fh:
+                        fh.write(json.dumps({"dim": dim}).encode("utf-8"))
+        self.dim = int(dim)
+        self._vectors = np.empty((0, self.dim), dtype=_DTYPE)
+        if not readonly:
+            self._vector_path.touch()
+            self._key_path.touch()
+        self.refresh()
+
+    @property
+    def _vector_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _key_path(self) -> Path:
+        return self.path / "keys.bin"
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with (self.path / ".lock").open("a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _complete_rows(self) -> int:
+        try:
+            keys = self._key_path.stat().st_size // _KEY_SIZE
+            vectors = self._vector_path.stat().st_size // (self.dim * _DTYPE.itemsize)
+        except FileNotFoundError:
+            return 0
+        return min(keys, vectors)
+
+    def refresh(self) -> int:
+        """Pick up rows appended by other processes and return the row count."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        count = self._complete_rows()
+        end = count * _KEY_SIZE
+        if end > self._key_bytes:
+            with self._key_path.open("rb") as fh:
+                fh.seek(self._key_bytes)
+                data = fh.read(end - self._key_bytes)
+            first = self._key_bytes // _KEY_SIZE
+            for row, offset in enumerate(range(0, len(data), _KEY_SIZE), start=first):
+                self._rows.setdefault(data[offset : offset + _KEY_SIZE], row)
+            self._key_bytes = end
+        if count != self._vectors.shape[0]:
+            # The arena only grows, so remapping exposes the new rows without
+            # copying the existing ones.
+            self._vectors = np.memmap(
+                self._vector_path, dtype=_DTYPE, mode="r", shape=(count, self.dim)
+            )
+        return count
+
+    def __len__(self) -> int:
+        return self._vectors.shape[0]
+
+    def __contains__(self, text: object) -> bool:
+        return isinstance(text, str) and content_key(text, self.config) in self._rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only ``(len(self), dim)`` memory map of every stored row."""
+        return self._vectors
+
+    def rows(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the row of each text, or ``-1`` for texts not in the store."""
+        rows = self._rows
+        return np.fromiter(
+            (rows.get(content_key(text, self.config), -1) for text in texts),
+            dtype=np.int64,
+            count=len(texts),
+        )
+
+    def get(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the stored embeddings of ``texts``.
+
+        Raises
+        ------
+        KeyError
+            If any text is not in the store.
+        """
+        rows = self.rows(texts)
+        missing = np.flatnonzero(rows < 0)
+        if missing.size:
+            raise KeyError(texts[int(missing[0])])
+        return np.asarray(self._vectors[rows])
+
+    def add(self, texts: Sequence[str], vectors: np.ndarray) -> np.ndarray:
+        """Append embeddings for ``texts`` and return their rows.
+
+        Texts already in the store, or repeated within ``texts``, keep their
+        first row and are not written again.
+        """
+        if self.readonly:
+            raise PermissionError("embedding store is read-only")
+        matrix = np.asarray(vectors, dtype=_DTYPE).reshape(len(texts), -1)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim} columns, got {matrix.shape[1]}")
+        keys = [content_key(text, self.config) for text in texts]
+        with self._lock, self._file_lock():
+            count = self._refresh()
+            fresh: dict[bytes, int] = {}
+            for position, key in enumerate(keys):
+                if key not in self._rows and key not in fresh:
+                    fresh[key] = position
+            if fresh:
+                self._append(count, list(fresh), matrix[list(fresh.values())])
+                self._refresh()
+        return np.array([self._rows[key] for key in keys], dtype=np.int64)
+
+    def _append(self, count: int, keys: list[bytes], matrix: np.ndarray) -> None:
+        # Drop any partial row left by a crashed writer before appending, so
+        # keys and vectors stay aligned. Vectors are written first: a reader
+        # never sees a key whose vector is not yet on disk.
+        with self._vector_path.open("r+b") as fh:
+            fh.truncate(count * self.dim * _DTYPE.itemsize)
+            fh.seek(0, os.SEEK_END)
+            fh.write(np.ascontiguousarray(matrix).tobytes())
+        with self._key_path.open("r+b") as fh:
+            fh.truncate(count * _KEY_SIZE)
+            fh.seek(0, os.SEEK_END)
+            fh.write(b"".join(keys))
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        embed: Callable[[list[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Return embeddings of ``texts``, computing only the unseen ones.
+
+        ``embed`` is called once with the distinct texts missing from the
+        store, and its rows are appended before the full ``(len(texts), dim)``
+        float32 matrix is returned.
+        """
+        rows = self.rows(texts)
+        missing = np.flatnonzero(rows < 0)
+        if missing.size:
+            unseen = list(dict.fromkeys(texts[int(position)] for position in missing))
+            added = self.add(unseen, embed(unseen))
+            row_of = dict(zip(unseen, added.tolist()))
+            for position in missing:
+                rows[position] = row_of[texts[int(position)]]
+        return np.asarray(self._vectors[rows])
+
+
+__all__ = ["EmbeddingStore", "content_key"]
@@ -2,28 +2,213 @@
 
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING, Any
 
-from sklearn.feature_extraction.text import HashingVectorizer
+import numpy as np
 
-from .benchmark import _load_dataset
+from .datasets import _get_entry
+from .datasets import load_dataset as _load_dataset
+from .hashing import HashingEmbedder
 
+if TYPE_CHECKING:
+    from scipy import sparse as sp
 
-def _get_vectorizer() -> HashingVectorizer:
-    """Return the HashingVectorizer used for embeddings."""
+    from .embedding_backends import EmbeddingBackend
+    from .embedding_store import EmbeddingStore
 
-    # Use a small feature space so the embedding is inexpensive.
-    return HashingVectorizer(n_features=128, alternate_sign=False)
+# The embedder is stateless, so a single instance can be shared by every
+# caller (including concurrent threads) instead of being rebuilt per call.
+# Use a small feature space so the embedding is inexpensive. It produces the
+# same vectors as ``HashingVectorizer(n_features=128, alternate_sign=False)``
+# without importing scikit-learn.
+_VECTORIZER = HashingEmbedder(n_features=128, alternate_sign=False)
+
+
+def _get_vectorizer() -> HashingEmbedder:
+    """Return the feature hasher used for embeddings."""
+
+    return _VECTORIZER
+
+
+def embedder_config() -> str:
+    """Return an identifier of the local embedder's settings.
+
+    Used as the ``config`` of an :class:`~smartmodelrouter.embedding_store.EmbeddingStore`
+    so stored vectors are invalidated when the embedder changes.
+    """
+    vectorizer = _get_vectorizer()
+    return (
+        f"hashing:n_features={vectorizer.n_features}:"
+        f"alternate_sign={vectorizer.alternate_sign}:norm={vectorizer.norm}"
+    )
+
+
+def embed_texts(
+    texts: Sequence[str],
+    sparse: bool = False,
+    dtype: type = np.float64,
+) -> np.ndarray | sp.csr_matrix:
+    """Embed ``texts`` in a single vectorized call.
+
+    Parameters
+    ----------
+    texts:
+        Prompts to embed.
+    sparse:
+        Return a SciPy CSR matrix instead of a dense NumPy array.
+    dtype:
+        Element type of the returned matrix.
+
+    Returns
+    -------
+    numpy.ndarray or scipy.sparse.csr_matrix
+        Matrix with one row per text.
+    """
+    matrix = _get_vectorizer().transform(list(texts))
+    if hasattr(matrix, "toarray"):
+        matrix = matrix.toarray()
+    if sparse:
+        from scipy import sparse as sp
+
+        return sp.csr_matrix(np.asarray(matrix), dtype=dtype)
+    return np.asarray(matrix, dtype=dtype)
+
+
+def _iter_embedding_batches(
+    questions: Sequence[dict[str, Any]],
+    dataset: str,
+    indices: list[int],
+    batch_size: int,
+    sparse: bool,
+    dtype: type,
+    store: EmbeddingStore | None = None,
+    backend: EmbeddingBackend | None = None,
+) -> Iterator[tuple[list[int], np.ndarray | sp.csr_matrix]]:
+    def embed(texts: list[str], dtype: type) -> np.ndarray:
+        if backend is None:
+            return embed_texts(texts, dtype=dtype)
+        return backend.embed(texts, dtype=dtype)
+
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start : start + batch_size]
+        prompts = [_get_entry(questions, dataset, index)["question"] for index in batch]
+        if store is not None:
+            matrix = store.embed(prompts, lambda texts: embed(texts, np.float32))
+            yield batch, matrix.astype(dtype, copy=False)
+        elif sparse:
+            yield batch, embed_texts(prompts, sparse=True, dtype=dtype)
+        else:
+            yield batch, embed(prompts, dtype)
+
+
+def _get_backend(model: str | None) -> EmbeddingBackend | None:
+    """Return the backend for ``model``, or ``None`` for the local embedder."""
+    if model is None:
+        return None
+    from .embedding_backends import HashingBackend, get_backend
+
+    backend = get_backend(model)
+    return None if isinstance(backend, HashingBackend) else backend
+
+
+def embed_dataset(
+    dataset: str,
+    indices: Sequence[int] | None = None,
+    batch_size: int = 1024,
+    sparse: bool = False,
+    stream: bool = False,
+    dtype: type = np.float64,
+    store: EmbeddingStore | None = None,
+    model: str | None = None,
+) -> np.ndarray | sp.csr_matrix | Iterator[tuple[list[int], np.ndarray | sp.csr_matrix]]:
+    """Embed many problems of a LiveBench dataset at once.
+
+    The dataset is loaded once and prompts are embedded ``batch_size`` at a
+    time, through the shared vectorizer unless ``model`` names a registered
+    backend.
+
+    Parameters
+    ----------
+    dataset:
+        One of ``"reasoning"``, ``"math"`` or ``"coding"``.
+    indices:
+        Zero-based problem indices to embed. Defaults to the whole dataset.
+    batch_size:
+        Number of prompts transformed per vectorized call.
+    sparse:
+        Produce SciPy CSR matrices instead of dense NumPy arrays.
+    stream:
+        Return an iterator of ``(indices, matrix)`` chunks of at most
+        ``batch_size`` rows instead of one stacked matrix.
+    dtype:
+        Element type of the returned matrices.
+    store:
+        Persistent store to read embeddings from. Only prompts missing from
+        the store are embedded, and they are appended to it. Its ``config``
+        should be the ``config`` of the backend used, :func:`embedder_config`
+        for the local embedder. Cannot be combined with ``sparse``.
+    model:
+        Embedding model whose backend, registered with
+        :func:`~smartmodelrouter.embedding_backends.register_backend`, embeds
+        the prompts. Unregistered models and ``None`` use the local embedder,
+        the only one that supports ``sparse``.
+
+    Returns
+    -------
+    numpy.ndarray, scipy.sparse.csr_matrix or iterator
+        Matrix with one row per requested index, in order, or an iterator of
+        chunks when ``stream`` is true.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if store is not None and sparse:
+        raise ValueError("store cannot be combined with sparse output")
+    backend = _get_backend(model)
+    if backend is not None and sparse:
+        raise ValueError(f"embedding model {model!r} does not produce sparse output")
+    questions = _load_dataset(dataset)
+    selected = list(range(len(questions))) if indices is None else list(indices)
+    batches = _iter_embedding_batches(
+        questions, dataset, selected, batch_size, sparse, dtype, store, backend
+    )
+    if stream:
+        return batches
+
+    matrices = [matrix for _, matrix in batches]
+    if not matrices:
+        if store is not None:
+            width = store.dim
+        elif backend is not None:
+            width = backend.dim or 0
+        else:
+            width = _get_vectorizer().n_features
+        if sparse:
+            from scipy import sparse as sp
+
+            return sp.csr_matrix((0, width), dtype=dtype)
+        return np.empty((0, width), dtype=dtype)
+    if len(matrices) == 1:
+        return matrices[0]
+    if sparse:
+        from scipy import sparse as sp
+
+        return sp.vstack(matrices, format="csr")
+    return np.vstack(matrices)
 
 
 def embed_problem(model: str, dataset: str, index: int) -> dict[str, Any]:
     """Return an embedding for a LiveBench problem.
 
+    Thin wrapper around :func:`embed_dataset` for a single index.
+
     Parameters
     ----------
     model:
-        Identifier for the embedding model. For the local HashingVectorizer the
-        value is informational only but included in the result for consistency.
+        Embedding model. Models registered with
+        :func:`~smartmodelrouter.embedding_backends.register_backend` use their
+        backend; any other value selects the local HashingVectorizer and is
+        only included in the result for consistency.
     dataset:
         One of ``"reasoning"``, ``"math"`` or ``"coding"``.
     index:
@@ -36,19 +221,7 @@ def embed_problem(model: str, dataset: str, index: int) -> dict[str, Any]:
         ``embedding``.
     """
 
-    questions = _load_dataset(dataset)
-    try:
-        entry = questions[index]
-    except IndexError as exc:  # pragma: no cover - invalid test usage
-        raise IndexError(
-            f"Problem index {index} out of range for dataset '{dataset}'"
-        ) from exc
-
-    prompt = entry["question"]
-
-    vectorizer = _get_vectorizer()
-    embedding_arr = vectorizer.transform([prompt]).toarray()[0]
-    embedding = list(embedding_arr)
+    embedding = embed_dataset(dataset, indices=[index], model=model)[0].tolist()
     response = {"embedding": embedding}
 
     return {
@@ -60,5 +233,4 @@ def embed_problem(model: str, dataset: str, index: int) -> dict[str, Any]:
     }
 
 
-__all__ = ["embed_problem"]
-
+__all__ = ["embed_dataset", "embed_problem", "embed_texts", "embedder_config"]
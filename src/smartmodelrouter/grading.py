@@ -0,0 +1,413 @@
+"""Grading of model responses against LiveBench reference answers.
+
+Grading is separate from generation: :func:`grade_records` re-scores stored
+run records (e.g. from :class:`smartmodelrouter.results.ResultSink`) without
+calling a model. Each dataset has a :class:`Grader`:
+
+* :class:`AnswerGrader` (default) extracts the final answer from a response
+  (``\\boxed{...}``, "the answer is ..." or the whole text), normalises it and
+  compares it with the reference, numerically when the reference is a number.
+* :class:`CodeGrader` (``"coding"``) runs the code of each response in a pool
+  of worker processes with a timeout and memory limit, against the entry's
+  ``tests`` or, without tests, by evaluating it and comparing the value with
+  the reference answer.
+"""
+
+from __future__ import annotations
+
+import ast
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Protocol
+
+import numpy as np
+
+from .datasets import _get_entry, load_dataset
+
+_BOXED = re.compile(r"\\boxed\{((?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*)\}")
+_FINAL = re.compile(
+    r"(?:final answer|answer)\s*(?:is|:|=)\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE
+)
+_MARKUP = re.compile(r"\\text\{([^{}]*)\}|[*`$]|\\[()\[\]]")
+_SPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"[-+]?(?:\d+(?:,\d{3})*(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?%?")
+_FRACTION = re.compile(r"^([-+]?\d+)\s*/\s*(\d+)$|^\\[dt]?frac\{([-+]?\d+)\}\{(\d+)\}$")
+_FENCE = re.compile(r"```[^\n`]*\n(.*?)```", re.DOTALL)
+_STRIP = " \t\n.;:!\"'"
+
+
+def normalize(text: str) -> str:
+    """Return ``text`` lower-cased, without markup, extra space or end punctuation."""
+    text = _MARKUP.sub(lambda match: match.group(1) or "", text.lower())
+    return _SPACE.sub(" ", text).strip(_STRIP)
+
+
+def extract_answer(text: str) -> str:
+    """Return the normalised final answer stated in a response.
+
+    The last ``\\boxed{...}`` wins, then the last "answer is ..." / "answer:"
+    line, then the whole response.
+    """
+    boxed = _BOXED.findall(text)
+    if boxed:
+        return normalize(boxed[-1])
+    final = _FINAL.findall(text)
+    if final:
+        return normalize(final[-1])
+    return normalize(text)
+
+
+def parse_number(text: str) -> float | None:
+    """Return the value of ``text`` if it is a single number or fraction."""
+    text = text.strip()
+    fraction = _FRACTION.match(text)
+    if fraction:
+        numerator, denominator = (int(group) for group in fraction.groups() if group)
+        return numerator / denominator if denominator else None
+    if not _NUMBER.fullmatch(text):
+        return None
+    scale = 100.0 if text.endswith("%") else 1.0
+    return float(text.rstrip("%").replace(",", "")) / scale
+
+
+def _stated_number(answer: str) -> float | None:
+    """Return the number an extracted answer states, if it is unambiguous.
+
+    That is its only number ("2 apples left"); answers naming several
+    numbers ("5 or 6", "2+2=4", "12, not 5") state none.
+    """
+    numbers = _NUMBER.findall(answer)
+    return parse_number(numbers[0]) if len(numbers) == 1 else None
+
+
+def extract_code(text: str) -> str:
+    """Return the last fenced code block of a response, or the whole response."""
+    blocks = _FENCE.findall(text)
+    return (blocks[-1] if blocks else text).strip()
+
+
+class Grader(Protocol):
+    """Decides whether responses answer their dataset entries correctly."""
+
+    def grade(self, message: str, entry: Mapping[str, Any]) -> bool:
+        """Return whether ``message`` answers ``entry``."""
+        ...
+
+    def grade_batch(
+        self, messages: Sequence[str], entries: Sequence[Mapping[str, Any]]
+    ) -> list[bool]:
+        """Return the verdict of every ``(message, entry)`` pair."""
+        ...
+
+
+class AnswerGrader:
+    """Compare extracted final answers with the reference ``answer``.
+
+    Numeric references match any response whose answer (or, failing that,
+    the only number in it) is within ``rel_tol``/``abs_tol`` of them, so
+    ``"5.0"``, ``"5"`` and ``"The answer is 5."`` are all correct for ``5``,
+    but ``"5 or 6"`` and ``"12, not 5"`` are not. Other references must equal
+    the normalised answer.
+    """
+
+    def __init__(self, rel_tol: float = 1e-6, abs_tol: float = 1e-9) -> None:
+        self.rel_tol = rel_tol
+        self.abs_tol = abs_tol
+
+    def grade(self, message: str, entry: Mapping[str, Any]) -> bool:
+        return self.grade_batch([message], [entry])[0]
+
+    def grade_batch(
+        self, messages: Sequence[str], entries: Sequence[Mapping[str, Any]]
+    ) -> list[bool]:
+        if len(messages) != len(entries):
+            raise ValueError("messages and entries must have the same length")
+        count = len(messages)
+        exact = np.zeros(count, dtype=bool)
+        predicted = np.full(count, np.nan)
+        expected = np.full(count, np.nan)
+        for position, (message, entry) in enumerate(zip(messages, entries)):
+            answer = entry.get("answer")
+            if answer is None:
+                continue
+            candidate = extract_answer(message)
+            reference = normalize(str(answer))
+            exact[position] = candidate == reference
+            target = parse_number(reference)
+            if target is None:
+                continue
+            value = parse_number(candidate)
+            predicted[position] = _stated_number(candidate) if value is None else value
+            expected[position] = target
+        # NaN (no numeric comparison) never compares close.
+        close = np.isclose(predicted, expected, rtol=self.rel_tol, atol=self.abs_tol)
+        return (exact | close).tolist()
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise TimeoutError("Code check timed out")
+
+
+def _init_worker(memory_limit: int | None) -> None:
+    """Confine a grading worker: own scratch directory and address-space cap."""
+    os.chdir(tempfile.mkdtemp(prefix="smartmodelrouter-grading-"))
+    if memory_limit is not None:
+        try:
+            import resource
+        except ImportError:  # pragma: no cover - not available on Windows
+            return
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _run(code: str, namespace: dict[str, Any], stdin: str = "") -> str:
+    """Execute ``code`` in ``namespace`` with ``stdin`` and return its output."""
+    output = io.StringIO()
+    with (
+        contextlib.redirect_stdout(output),
+        contextlib.redirect_stderr(io.StringIO()),
+        _patched_stdin(stdin),
+    ):
+        try:
+            exec(compile(code, "<response>", "exec"), namespace)
+        except SystemExit as exc:
+            # ``sys.exit()``/``sys.exit(0)`` ends a script normally.
+            if exc.code not in (None, 0):
+                raise
+    return output.getvalue()
+
+
+@contextlib.contextmanager
+def _patched_stdin(text: str) -> Iterator[None]:
+    saved = sys.stdin
+    sys.stdin = io.StringIO(text)
+    try:
+        yield
+    finally:
+        sys.stdin = saved
+
+
+def _same_output(actual: str, expected: str) -> bool:
+    return [line.rstrip() for line in actual.strip().splitlines()] == [
+        line.rstrip() for line in str(expected).strip().splitlines()
+    ]
+
+
+def _check_code(code: str, tests: Any, answer: Any) -> bool:
+    if tests:
+        for test in tests:
+            if isinstance(test, Mapping):
+                namespace = {"__name__": "__main__"}
+                output = _run(code, namespace, test.get("input", ""))
+                if not _same_output(output, test["output"]):
+                    return False
+            else:
+                namespace = {"__name__": "__solution__"}
+                _run(code, namespace)
+                _run(str(test), namespace)
+        return True
+    if answer is None:
+        return False
+    try:
+        expression = compile(code, "<response>", "eval")
+    except SyntaxError:
+        return _same_output(_run(code, {"__name__": "__main__"}), answer)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        value = eval(expression, {"__name__": "__solution__"})
+    if value is None:
+        # e.g. ``print(...)``: the answer is what it printed.
+        return _same_output(output.getvalue(), answer)
+    try:
+        return value == ast.literal_eval(str(answer))
+    except (ValueError, SyntaxError):
+        return str(value) == str(answer).strip()
+
+
+def _run_checks(code: str, tests: Any, answer: Any, timeout: float) -> bool:
+    """Worker entry point: return whether ``code`` passes within ``timeout``."""
+    timer = hasattr(signal, "setitimer")
+    if timer:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return bool(_check_code(code, tests, answer))
+    except BaseException:
+        return False
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class CodeGrader:
+    """Execute coding responses in worker processes.
+
+    The code is the last fenced block of the response (or the whole
+    response). An entry's ``tests`` may hold Python statements, typically
+    ``assert``s run after the code in its namespace, or ``{"input": ...,
+    "output": ...}`` mappings fed to the code as stdin and compared with its
+    stdout. Without ``tests`` a single expression is evaluated and compared
+    with ``answer`` (parsed as a Python literal when possible); other code
+    must print ``answer``.
+
+    Each response runs in a spawned worker process whose working directory is
+    a fresh temporary directory and whose address space is capped at
+    ``memory_limit`` bytes, and fails after ``timeout`` seconds. This isolates
+    the grader from crashes and runaway code but is not a security boundary:
+    only grade responses you would run yourself.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        max_workers: int | None = None,
+        memory_limit: int | None = 1 << 30,
+    ) -> None:
+        if timeout <= 0:
+            raise ValueError("timeout must be positive")
+        self.timeout = timeout
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.memory_limit = memory_limit
+
+    def grade(self, message: str, entry: Mapping[str, Any]) -> bool:
+        return self.grade_batch([message], [entry])[0]
+
+    def grade_batch(
+        self, messages: Sequence[str], entries: Sequence[Mapping[str, Any]]
+    ) -> list[bool]:
+        if len(messages) != len(entries):
+            raise ValueError("messages and entries must have the same length")
+        jobs = [
+            (extract_code(message), entry.get("tests"), entry.get("answer"), self.timeout)
+            for message, entry in zip(messages, entries)
+        ]
+        verdicts: list[bool] = [False] * len(jobs)
+        pending = list(range(len(jobs)))
+        serial = False
+        while pending:
+            # A response that kills its worker breaks the whole pool. The
+            # checks it took down are rerun one at a time, where the first one
+            # lost is the culprit, and then in parallel again.
+            workers = 1 if serial else min(self.max_workers, len(pending))
+            results = self._run_round([jobs[i] for i in pending], workers)
+            lost = []
+            for position, result in zip(pending, results):
+                if result is None:
+                    lost.append(position)
+                else:
+                    verdicts[position] = result
+            if serial and lost:
+                lost = lost[1:]
+            serial = bool(lost) and not serial
+            pending = lost
+        return verdicts
+
+    def _run_round(
+        self, jobs: Sequence[tuple[str, Any, Any, float]], workers: int
+    ) -> list[bool | None]:
+        """Run ``jobs`` in a fresh pool; ``None`` marks checks lost to a crash."""
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit,),
+        )
+        futures = [pool.submit(_run_checks, *job) for job in jobs]
+        # Workers enforce the timeout themselves; this deadline only catches
+        # code stuck where the alarm cannot interrupt it.
+        rounds = math.ceil(len(futures) / workers)
+        _, stuck = wait(futures, timeout=rounds * self.timeout + 30.0)
+        if stuck:
+            _terminate_workers(pool)
+        pool.shutdown(wait=not stuck, cancel_futures=True)
+        return [False if future in stuck else _verdict(future) for future in futures]
+
+
+def _terminate_workers(pool: ProcessPoolExecutor) -> None:
+    """Kill the worker processes of ``pool``, e.g. ones stuck in a check.
+
+    ``ProcessPoolExecutor`` has no public way to stop a running task, so this
+    uses its private ``_processes`` mapping. Should that ever disappear, the
+    stuck workers are left to exit on their own.
+    """
+    processes = getattr(pool, "_processes", None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+
+
+def _verdict(future: Future[bool]) -> bool | None:
+    """Return the verdict of a finished check, or ``None`` if its worker died."""
+    if future.cancelled():
+        return None
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        return None
+    return error is None and future.result()
+
+
+_default_grader = AnswerGrader()
+_graders: dict[str, Grader] = {"coding": CodeGrader()}
+
+
+def register_grader(dataset: str, grader: Grader) -> None:
+    """Use ``grader`` for ``dataset`` in :func:`get_grader`."""
+    _graders[dataset] = grader
+
+
+def get_grader(dataset: str) -> Grader:
+    """Return the grader of ``dataset`` (an :class:`AnswerGrader` by default)."""
+    return _graders.get(dataset, _default_grader)
+
+
+def answer_matches(message: str, answer: Any) -> bool:
+    """Return whether ``message`` states ``answer``, per :class:`AnswerGrader`."""
+    return _default_grader.grade(message, {"answer": answer})
+
+
+def grade_records(
+    records: Iterable[Mapping[str, Any]],
+    graders: Mapping[str, Grader] | None = None,
+) -> list[dict[str, Any]]:
+    """Return copies of run ``records`` with ``correct`` recomputed.
+
+    Records need ``dataset``, ``index`` and ``message`` keys, as written by
+    the benchmark functions. Responses are grouped by dataset and graded in
+    one batch per dataset, so :class:`CodeGrader` checks run in parallel.
+    ``graders`` overrides :func:`get_grader` per dataset.
+    """
+    records = [dict(record) for record in records]
+    by_dataset: dict[str, list[int]] = {}
+    for position, record in enumerate(records):
+        by_dataset.setdefault(record["dataset"], []).append(position)
+    for dataset, positions in by_dataset.items():
+        questions = load_dataset(dataset)
+        entries = [_get_entry(questions, dataset, records[i]["index"]) for i in positions]
+        grader = (graders or {}).get(dataset) or get_grader(dataset)
+        verdicts = grader.grade_batch([records[i]["message"] for i in positions], entries)
+        for position, verdict in zip(positions, verdicts):
+            records[position]["correct"] = bool(verdict)
+    return records
+
+
+__all__ = [
+    "AnswerGrader",
+    "CodeGrader",
+    "Grader",
+    "answer_matches",
+    "extract_answer",
+    "extract_code",
+    "get_grader",
+    "grade_records",
+    "normalize",
+    "parse_number",
+    "register_grader",
+]
@@ -0,0 +1,113 @@
+"""NumPy-only feature hashing compatible with scikit-learn's HashingVectorizer."""
+
+from __future__ import annotations
+
+import re
+import struct
+from collections.abc import Sequence
+from functools import lru_cache
+
+import numpy as np
+
+_MASK = 0xFFFFFFFF
+_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+
+def _rotl(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (32 - shift))) & _MASK
+
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Return the signed 32-bit MurmurHash3 (x86) of ``data``.
+
+    Matches :func:`sklearn.utils.murmurhash3_32` with ``positive=False``.
+    """
+    c1, c2 = 0xCC9E2D51, 0x1B873593
+    length = len(data)
+    h = seed & _MASK
+    body = length - length % 4
+    for (k,) in struct.iter_unpack("<I", data[:body]):
+        k = _rotl((k * c1) & _MASK, 15)
+        h ^= (k * c2) & _MASK
+        h = (_rotl(h, 13) * 5 + 0xE6546B64) & _MASK
+    tail = data[body:]
+    if tail:
+        k = int.from_bytes(tail, "little")
+        k = _rotl((k * c1) & _MASK, 15)
+        h ^= (k * c2) & _MASK
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _MASK
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _MASK
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token: str) -> int:
+    # Token frequencies are heavily skewed, so most lookups hit the cache and
+    # skip the pure-Python hash.
+    return murmurhash3_32(token.encode("utf-8"))
+
+
+class HashingEmbedder:
+    """Stateless bag-of-words feature hasher.
+
+    Produces the same matrix as ``HashingVectorizer(n_features=n_features,
+    alternate_sign=alternate_sign)`` with its default lowercase word
+    tokenisation and ``l2`` row normalisation, as a dense NumPy array and
+    without importing scikit-learn or SciPy.
+
+    Parameters
+    ----------
+    n_features:
+        Number of output columns.
+    alternate_sign:
+        Add each token with the sign of its hash instead of always ``+1``.
+    norm:
+        ``"l2"`` to scale every non-empty row to unit length, or ``None``.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 128,
+        alternate_sign: bool = False,
+        norm: str | None = "l2",
+    ) -> None:
+        if n_features < 1:
+            raise ValueError("n_features must be at least 1")
+        if norm not in {"l2", None}:
+            raise ValueError("norm must be 'l2' or None")
+        self.n_features = n_features
+        self.alternate_sign = alternate_sign
+        self.norm = norm
+        self._tokenize = re.compile(_TOKEN_PATTERN).findall
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the ``(len(texts), n_features)`` float64 feature matrix."""
+        rows: list[int] = []
+        hashes: list[int] = []
+        for row, text in enumerate(texts):
+            tokens = self._tokenize(text.lower())
+            rows.extend([row] * len(tokens))
+            hashes.extend(map(_token_hash, tokens))
+
+        n_rows = len(texts)
+        hashed = np.asarray(hashes, dtype=np.int64)
+        columns = np.abs(hashed) % self.n_features
+        weights = np.where(hashed < 0, -1.0, 1.0) if self.alternate_sign else None
+        flat = np.asarray(rows, dtype=np.int64) * self.n_features + columns
+        matrix = np.bincount(
+            flat, weights=weights, minlength=n_rows * self.n_features
+        ).astype(np.float64, copy=False)
+        matrix = matrix.reshape(n_rows, self.n_features)
+
+        if self.norm == "l2":
+            lengths = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+            nonzero = lengths > 0
+            matrix[nonzero] /= lengths[nonzero, None]
+        return matrix
+
+
+__all__ = ["HashingEmbedder", "murmurhash3_32"]
@@ -0,0 +1,217 @@
+"""Hedged completion requests across backup models."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+from .llm import achat_completion, aclose_clients
+
+
+class LatencyTracker:
+    """Sliding window of observed completion latencies per model."""
+
+    def __init__(self, window: int = 256) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, model: str, latency: float) -> None:
+        """Add one latency observation (in seconds) for ``model``."""
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, model: str, q: float = 95.0, min_samples: int = 20) -> float | None:
+        """Return the ``q``-th latency percentile of ``model``.
+
+        ``None`` is returned until at least ``min_samples`` observations exist.
+        """
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < min_samples:
+            return None
+        return float(np.percentile(samples, q))
+
+
+_latency_tracker = LatencyTracker()
+
+
+def _add_usage(total: dict[str, Any], usage: Any) -> None:
+    if not isinstance(usage, dict):
+        return
+    for key, value in usage.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+async def ahedged_completion(
+    prompt: str,
+    models: Sequence[str],
+    delay: float | None = None,
+    percentile: float = 95.0,
+    default_delay: float = 2.0,
+    max_tokens: int = 10_240,
+    temperature: float = 0.7,
+    tracker: LatencyTracker | None = None,
+) -> dict:
+    """Race ``prompt`` across ``models`` to cut tail latency.
+
+    The first model is asked immediately. If it has not answered after the
+    hedge delay, the prompt is also sent to the next model, and so on. A model
+    that fails triggers the next hedge right away. The first successful answer
+    wins and every other in-flight request is cancelled.
+
+    Parameters
+    ----------
+    prompt:
+        The user prompt.
+    models:
+        Primary model followed by backups, in the order they are tried.
+    delay:
+        Fixed seconds to wait before each hedge. When ``None`` the delay is the
+        ``percentile`` of the previous model's observed latency, or
+        ``default_delay`` until enough latencies have been observed.
+    tracker:
+        Latency history used for adaptive delays. Defaults to a module-level
+        tracker fed by every hedged request.
+
+    Returns
+    -------
+    dict
+        The winning :func:`~smartmodelrouter.llm.achat_completion` result with
+        an extra ``hedge`` mapping: ``winner``, ``launched`` (models asked, in
+        order), ``cancelled`` (models whose requests were cancelled),
+        ``extra_requests`` (requests beyond the winning one) and
+        ``extra_usage`` (summed usage of losing requests that completed).
+    """
+    if not models:
+        raise ValueError("At least one model is required")
+    tracker = tracker or _latency_tracker
+
+    async def ask(model: str) -> dict:
+        started = time.perf_counter()
+        result = await achat_completion(
+            prompt, model=model, max_tokens=max_tokens, temperature=temperature
+        )
+        tracker.record(model, time.perf_counter() - started)
+        return result
+
+    def hedge_delay(model: str) -> float:
+        if delay is not None:
+            return delay
+        observed = tracker.percentile(model, percentile)
+        return default_delay if observed is None else observed
+
+    tasks: dict[asyncio.Task, str] = {}
+    launched: list[str] = []
+    errors: list[BaseException] = []
+    completed: list[tuple[str, dict]] = []
+    remaining = list(models)
+
+    def launch() -> None:
+        model = remaining.pop(0)
+        launched.append(model)
+        tasks[asyncio.create_task(ask(model))] = model
+
+    launch()
+    winner: tuple[str, dict] | None = None
+    try:
+        while tasks and winner is None:
+            timeout = hedge_delay(launched[-1]) if remaining else None
+            done, _ = await asyncio.wait(
+                tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch()
+                continue
+            failures = 0
+            for task in done:
+                model = tasks.pop(task)
+                exc = task.exception()
+                if exc is not None:
+                    errors.append(exc)
+                    failures += 1
+                    continue
+                result = task.result()
+                if winner is None and result.get("message"):
+                    winner = (model, result)
+                else:
+                    completed.append((model, result))
+                    failures += not result.get("message")
+            if winner is None:
+                for _ in range(min(failures, len(remaining))):
+                    launch()
+    finally:
+        cancelled = list(tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if winner is None:
+        if errors:
+            raise RuntimeError("All hedged requests failed") from errors[-1]
+        raise RuntimeError("No hedged request returned a message")
+
+    model, result = winner
+    extra_usage: dict[str, Any] = {}
+    for _, loser in completed:
+        _add_usage(extra_usage, loser.get("usage"))
+    return {
+        **result,
+        "model": result.get("model", model),
+        "hedge": {
+            "winner": model,
+            "launched": launched,
+            "cancelled": cancelled,
+            "extra_requests": len(launched) - 1,
+            "extra_usage": extra_usage,
+        },
+    }
+
+
+def hedged_completion(
+    prompt: str,
+    models: Sequence[str],
+    delay: float | None = None,
+    percentile: float = 95.0,
+    default_delay: float = 2.0,
+    max_tokens: int = 10_240,
+    temperature: float = 0.7,
+    tracker: LatencyTracker | None = None,
+) -> dict:
+    """Synchronous wrapper around :func:`ahedged_completion`.
+
+    Each call runs on its own event loop and closes the async clients it
+    opened before returning. Must not be called from a running event loop;
+    await :func:`ahedged_completion` there instead.
+    """
+
+    async def main() -> dict:
+        try:
+            return await ahedged_completion(
+                prompt,
+                models,
+                delay=delay,
+                percentile=percentile,
+                default_delay=default_delay,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                tracker=tracker,
+            )
+        finally:
+            await aclose_clients()
+
+    return asyncio.run(main())
+
+
+__all__ = ["LatencyTracker", "ahedged_completion", "hedged_completion"]
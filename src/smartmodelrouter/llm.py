@@ -2,16 +2,51 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import time
-from json import JSONDecodeError
+import weakref
+from dataclasses import dataclass, field
 from urllib.parse import urlparse
 
 import atexit
 import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
 
-import httpx
-from openai import APIConnectionError, OpenAI
+from . import metrics as _metrics
+from .cache import ResponseCache
+from .providers import Endpoint, ProviderRegistry
+from .ratelimit import Permit, RateLimiter, estimate_tokens
+from .resilience import BreakerRegistry, CircuitBreaker, RetryPolicy, _retry_after
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+# The openai SDK takes most of a second to import, so its client classes are
+# resolved on first use. They remain patchable as module attributes, e.g.
+# ``smartmodelrouter.llm.OpenAI``.
+_LAZY_OPENAI_NAMES = frozenset(
+    {"AsyncOpenAI", "DefaultAsyncHttpxClient", "DefaultHttpxClient", "OpenAI"}
+)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_OPENAI_NAMES:
+        import openai
+
+        value = globals()[name] = getattr(openai, name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _openai(name: str) -> Any:
+    """Return the (possibly patched) openai class ``name``, importing it once."""
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
 
 MODEL_NAME = os.getenv("MODEL_NAME", "openai/gpt-5-nano")
 
@@ -31,66 +66,626 @@ def _ensure_env() -> None:
         raise RuntimeError("Missing required environment variable: OPENAI_API_KEY")
 
 
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Connection settings for the pooled OpenAI clients.
+
+    Instances are immutable and hashable; each distinct configuration gets its
+    own pooled client, shared by every thread.
+
+    Attributes
+    ----------
+    api_key:
+        API key sent to the endpoint.
+    base_url:
+        OpenAI-compatible endpoint. ``None`` uses the SDK default.
+    max_connections:
+        Maximum number of concurrent connections in the pool.
+    max_keepalive_connections:
+        Maximum number of idle connections kept open.
+    keepalive_expiry:
+        Seconds an idle connection is kept before being closed.
+    http2:
+        Negotiate HTTP/2. Requires the ``h2`` package
+        (``pip install 'httpx[http2]'``).
+    connect_timeout, read_timeout, write_timeout, pool_timeout:
+        Timeouts in seconds for establishing a connection, reading a response,
+        sending a request and waiting for a free pooled connection.
+    """
+
+    api_key: str = field(repr=False)
+    base_url: str | None = None
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    write_timeout: float = 600.0
+    pool_timeout: float = 10.0
+
+    def __post_init__(self) -> None:
+        if self.base_url:
+            parsed = urlparse(self.base_url)
+            if not parsed.scheme or not parsed.netloc:
+                raise RuntimeError(
+                    f"Invalid OPENAI_BASE_URL: {self.base_url!r}. Include scheme, e.g. 'https://api.openai.com/v1'."
+                )
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> ClientConfig:
+        """Return a configuration read from the environment.
+
+        Credentials come from ``OPENAI_API_KEY`` and ``OPENAI_BASE_URL`` (loaded
+        from ``.env`` when missing). Pool settings can be set with the
+        ``SMARTMODELROUTER_MAX_CONNECTIONS``, ``SMARTMODELROUTER_MAX_KEEPALIVE``,
+        ``SMARTMODELROUTER_KEEPALIVE_EXPIRY``, ``SMARTMODELROUTER_HTTP2``,
+        ``SMARTMODELROUTER_CONNECT_TIMEOUT`` and ``SMARTMODELROUTER_READ_TIMEOUT``
+        variables. Keyword ``overrides`` take precedence over the environment;
+        with an ``api_key`` override, ``OPENAI_API_KEY`` is not required.
+        """
+        if "api_key" not in overrides:
+            _ensure_env()
+        settings: dict[str, Any] = {
+            "api_key": os.getenv("OPENAI_API_KEY"),
+            "base_url": os.getenv("OPENAI_BASE_URL") or None,
+            "max_connections": int(_env_number("SMARTMODELROUTER_MAX_CONNECTIONS", 100)),
+            "max_keepalive_connections": int(
+                _env_number("SMARTMODELROUTER_MAX_KEEPALIVE", 20)
+            ),
+            "keepalive_expiry": _env_number("SMARTMODELROUTER_KEEPALIVE_EXPIRY", 5.0),
+            "http2": os.getenv("SMARTMODELROUTER_HTTP2", "").lower() in {"1", "true", "yes"},
+            "connect_timeout": _env_number("SMARTMODELROUTER_CONNECT_TIMEOUT", 5.0),
+            "read_timeout": _env_number("SMARTMODELROUTER_READ_TIMEOUT", 600.0),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    def limits(self) -> httpx.Limits:
+        """Return the connection pool limits."""
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        """Return the request timeouts."""
+        import httpx
+
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def client_kwargs(self, http_client: httpx.Client | httpx.AsyncClient) -> dict[str, Any]:
+        """Return constructor arguments for an OpenAI client."""
+        # Retries are handled by ``RetryPolicy`` so the SDK's own retry loop is
+        # disabled to avoid multiplying attempts.
+        kwargs: dict[str, Any] = {
+            "api_key": self.api_key,
+            "max_retries": 0,
+            "timeout": self.timeout(),
+            "http_client": http_client,
+        }
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        return kwargs
+
+
+_config_lock = threading.Lock()
+_config: ClientConfig | None = None
+_config_overrides: dict[str, Any] = {}
+
+
+def reload_config(**settings: Any) -> ClientConfig:
+    """Re-read the client configuration from the environment.
+
+    The configuration is otherwise read once, on first use, so that requests
+    don't consult the environment. Call this after changing ``OPENAI_API_KEY``
+    or ``OPENAI_BASE_URL``. Keyword ``settings`` (any :class:`ClientConfig`
+    field) are remembered and applied on top of the environment by later
+    reloads as well. Clients built for earlier configurations stay pooled and
+    are reused if their configuration becomes current again.
+    """
+    global _config
+    with _config_lock:
+        overrides = {**_config_overrides, **settings}
+        config = ClientConfig.from_env(**overrides)
+        _config_overrides.update(settings)
+        _config = config
+    return config
+
+
+def get_config() -> ClientConfig:
+    """Return the current client configuration, loading it on first use."""
+    config = _config
+    return config if config is not None else reload_config()
+
+
+def _on_response(response: httpx.Response) -> None:
+    """Timestamp response headers for the call being measured."""
+    _metrics.mark_first_byte()
+
+
+async def _aon_response(response: httpx.Response) -> None:
+    """Asynchronous counterpart of :func:`_on_response`."""
+    _metrics.mark_first_byte()
+
+
 _client_lock = threading.Lock()
-_client: OpenAI | None = None
-_client_params: tuple[str, str | None] | None = None
-_client_ctor: type[OpenAI] | None = None
-
-
-def _get_client() -> OpenAI:
-    """Return a shared OpenAI client instance."""
-    global _client, _client_params, _client_ctor
-    current_params = (os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
-    current_ctor = OpenAI
-    if (
-        _client is None
-        or _client_params != current_params
-        or _client_ctor is not current_ctor
-    ):
+_clients: dict[tuple[ClientConfig, type], OpenAI] = {}
+
+
+def _get_client(config: ClientConfig | None = None) -> OpenAI:
+    """Return the shared OpenAI client for ``config`` (default: current config).
+
+    The fast path is a single dictionary lookup; the lock is only taken the
+    first time a configuration is used.
+    """
+    config = config or _config or reload_config()
+    client_class = _openai("OpenAI")
+    key = (config, client_class)
+    client = _clients.get(key)
+    if client is None:
         with _client_lock:
-            current_params = (os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
-            current_ctor = OpenAI
-            if (
-                _client is None
-                or _client_params != current_params
-                or _client_ctor is not current_ctor
-            ):
-                _ensure_env()
-                api_key = os.environ["OPENAI_API_KEY"]
-                base_url = os.getenv("OPENAI_BASE_URL")
-                client_kwargs = {"api_key": api_key}
-                if base_url:
-                    parsed = urlparse(base_url)
-                    if not parsed.scheme or not parsed.netloc:
-                        raise RuntimeError(
-                            f"Invalid OPENAI_BASE_URL: {base_url!r}. Include scheme, e.g. 'https://api.openai.com/v1'."
-                        )
-                    client_kwargs["base_url"] = base_url
-                if _client is not None and hasattr(_client, "close"):
-                    _client.close()
-                _client = current_ctor(**client_kwargs)
-                _client_params = (api_key, base_url)
-                _client_ctor = current_ctor
-    return _client
+            client = _clients.get(key)
+            if client is None:
+                http_client = _openai("DefaultHttpxClient")(
+                    limits=config.limits(),
+                    timeout=config.timeout(),
+                    http2=config.http2,
+                    event_hooks={"response": [_on_response]},
+                )
+                client = _clients[key] = client_class(**config.client_kwargs(http_client))
+    return client
 
 
 def _close_client() -> None:
-    """Close the shared OpenAI client on interpreter shutdown."""
-    global _client
-    if _client is not None:
-        if hasattr(_client, "close"):
-            _client.close()
-        _client = None
+    """Close the shared OpenAI clients on interpreter shutdown."""
+    with _client_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        if hasattr(client, "close"):
+            client.close()
 
 
 atexit.register(_close_client)
 
 
+_async_client_lock = threading.Lock()
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[ClientConfig, type], AsyncOpenAI]
+] = weakref.WeakKeyDictionary()
+
+
+def _get_async_client(config: ClientConfig | None = None) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client for ``config`` on the running loop.
+
+    The async client's connection pool is bound to the event loop that created
+    it, so clients are pooled per loop and discarded with it.
+    """
+    config = config or _config or reload_config()
+    loop = asyncio.get_running_loop()
+    client_class = _openai("AsyncOpenAI")
+    key = (config, client_class)
+    clients = _async_clients.get(loop)
+    client = clients.get(key) if clients is not None else None
+    if client is None:
+        with _async_client_lock:
+            clients = _async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                http_client = _openai("DefaultAsyncHttpxClient")(
+                    limits=config.limits(),
+                    timeout=config.timeout(),
+                    http2=config.http2,
+                    event_hooks={"response": [_aon_response]},
+                )
+                client = clients[key] = client_class(**config.client_kwargs(http_client))
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close the shared async clients of the running event loop.
+
+    Call this before stopping a long-lived loop so its pooled upstream
+    connections are shut down cleanly.
+    """
+    with _async_client_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+_EXTRA_HEADERS = {
+    "HTTP-Referer": "https://github.com/aplassard/smartmodelrouter",
+    "X-Title": "smartmodelrouter",
+}
+
+
+def _messages(prompt: str | list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Return ``prompt`` as chat messages; a string is one user message."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return list(prompt)
+
+
+def _completion_kwargs(
+    prompt: str | list[dict[str, Any]], model: str, max_tokens: int, temperature: float
+) -> dict:
+    """Return the keyword arguments for ``chat.completions.create``."""
+    return {
+        "model": model,
+        "messages": _messages(prompt),
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "extra_body": {"max_output_tokens": max_tokens},
+        "extra_headers": dict(_EXTRA_HEADERS),
+    }
+
+
+def _usage_dict(usage) -> dict | None:
+    """Return ``usage`` as a plain dictionary when it is a pydantic model."""
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return usage
+
+
+def _completion_result(completion, message_content: str, model: str) -> dict:
+    """Return the public result mapping for a successful completion."""
+    return {
+        "model": model,
+        "message": message_content,
+        "usage": _usage_dict(getattr(completion, "usage", None)),
+        "response": completion,
+    }
+
+
+_response_cache: ResponseCache | None = None
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Set the response cache used when ``chat_completion`` gets no ``cache``."""
+    global _response_cache
+    _response_cache = cache
+
+
+def _resolve_cache(
+    cache: ResponseCache | Literal[False] | None, temperature: float
+) -> ResponseCache | None:
+    """Return the cache to use for a request, if any."""
+    if cache is False:
+        return None
+    selected = cache if cache is not None else _response_cache
+    if selected is None or not selected.should_cache(temperature):
+        return None
+    return selected
+
+
+def _cache_key(
+    cache: ResponseCache,
+    endpoint: str | None,
+    prompt: str | list[dict[str, Any]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    return cache.make_key(
+        model,
+        _messages(prompt),
+        max_tokens,
+        temperature,
+        endpoint,
+    )
+
+
+_retry_policy = RetryPolicy()
+_breakers = BreakerRegistry()
+
+
+def set_retry_policy(policy: RetryPolicy) -> None:
+    """Set the default retry policy for completion requests."""
+    global _retry_policy
+    _retry_policy = policy
+
+
+def configure_circuit_breakers(
+    failure_threshold: int = 5,
+    recovery_timeout: float = 30.0,
+    half_open_max_calls: int = 1,
+    fallbacks: dict[str, str] | None = None,
+) -> None:
+    """Replace the per-model circuit breakers with new settings.
+
+    ``fallbacks`` maps a model to the model that serves its requests while the
+    model's breaker is open.
+    """
+    global _breakers
+    _breakers = BreakerRegistry(
+        failure_threshold=failure_threshold,
+        recovery_timeout=recovery_timeout,
+        half_open_max_calls=half_open_max_calls,
+        fallbacks=fallbacks,
+    )
+
+
+def reset_circuit_breakers() -> None:
+    """Close every circuit breaker by forgetting its history."""
+    _breakers.reset()
+
+
+_rate_limiter: RateLimiter | None = None
+
+
+def set_rate_limiter(limiter: RateLimiter | None) -> None:
+    """Install a client-side :class:`~smartmodelrouter.ratelimit.RateLimiter`.
+
+    Every attempt then waits for request and token capacity of its model and
+    endpoint before it is sent. ``None`` removes the limiter.
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def _reserved_tokens(kwargs: dict) -> int:
+    """Return the tokens to reserve for a request: prompt estimate plus ``max_tokens``."""
+    prompt = "".join(str(message.get("content") or "") for message in kwargs["messages"])
+    return estimate_tokens(prompt) + kwargs["max_tokens"]
+
+
+def _admit(
+    target: _Target, endpoint: Endpoint | None, model: str, kwargs: dict, priority: int
+) -> Permit | None:
+    """Wait for rate limiter capacity for one attempt."""
+    limiter = _rate_limiter
+    if limiter is None:
+        return None
+    key = _endpoint_label(target, endpoint)
+    return limiter.acquire(model, _reserved_tokens(kwargs), key=key, priority=priority)
+
+
+async def _aadmit(
+    target: _Target, endpoint: Endpoint | None, model: str, kwargs: dict, priority: int
+) -> Permit | None:
+    """Asynchronous counterpart of :func:`_admit`."""
+    limiter = _rate_limiter
+    if limiter is None:
+        return None
+    key = _endpoint_label(target, endpoint)
+    return await limiter.aacquire(model, _reserved_tokens(kwargs), key=key, priority=priority)
+
+
+def _settle(
+    permit: Permit | None, usage: Any = None, exc: BaseException | None = None
+) -> None:
+    """Correct ``permit`` from ``usage``, or release it after a failure ``exc``.
+
+    A 429 throttles the permit's buckets; any other failure refunds the
+    reserved tokens, which the provider did not bill.
+    """
+    if permit is None:
+        return
+    if exc is not None:
+        if getattr(exc, "status_code", None) == 429:
+            permit.throttle(_retry_after(exc))
+        else:
+            permit.settle(0)
+        return
+    usage = _usage_dict(usage)
+    if isinstance(usage, dict):
+        permit.settle(usage.get("total_tokens"))
+
+
+class _EmptyCompletionError(RuntimeError):
+    """Raised when a completion carries no usable message."""
+
+
+def _message_content(completion) -> str:
+    """Return the assistant message of ``completion`` or raise if missing."""
+    if not getattr(completion, "choices", None):
+        raise _EmptyCompletionError("Completion returned no choices")
+    first = completion.choices[0]
+    message_content = getattr(getattr(first, "message", None), "content", None)
+    if message_content is None:
+        raise _EmptyCompletionError("Completion returned no message content")
+    return message_content
+
+
+def _is_transient(policy: RetryPolicy, exc: Exception) -> bool:
+    """Return whether ``exc`` is a transient failure under ``policy``."""
+    return isinstance(exc, _EmptyCompletionError) or policy.is_retryable(exc)
+
+
+def _retry_delay(
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    attempt: int,
+    exc: Exception,
+    started: float,
+) -> float:
+    """Return how long to wait before retrying after ``exc``.
+
+    Errors that are not transient are re-raised unchanged; the endpoint
+    answered, so they count as a success for the circuit breaker. Transient
+    errors count as failures and, once the policy gives up, surface as a
+    ``RuntimeError`` so callers don't see an opaque JSON decoding stack trace.
+    """
+    if not _is_transient(policy, exc):
+        breaker.record_success()
+        raise exc
+    breaker.record_failure()
+    delay = policy.next_delay(attempt, exc, started)
+    if delay is None:
+        if isinstance(exc, _EmptyCompletionError):
+            raise exc
+        raise RuntimeError("Failed to retrieve completion") from exc
+    return delay
+
+
+def _backoff(delay: float, probe: _metrics.Probe | None) -> None:
+    """Sleep before a retry, discarding ``probe`` if the wait is interrupted."""
+    try:
+        time.sleep(delay)
+    except BaseException:
+        if probe is not None:
+            probe.discard()
+        raise
+
+
+async def _abackoff(delay: float, probe: _metrics.Probe | None) -> None:
+    """Asynchronous counterpart of :func:`_backoff`."""
+    try:
+        await asyncio.sleep(delay)
+    except BaseException:
+        if probe is not None:
+            probe.discard()
+        raise
+
+
+_provider_registry: ProviderRegistry | None = None
+_endpoint_configs: dict[Endpoint, ClientConfig] = {}
+
+
+def set_provider_registry(registry: ProviderRegistry | None) -> None:
+    """Route requests through ``registry`` instead of the single configured endpoint.
+
+    With a registry, each attempt of each request is sent to the endpoint
+    chosen by :meth:`ProviderRegistry.acquire`, and ``OPENAI_API_KEY`` /
+    ``OPENAI_BASE_URL`` are not used. ``None`` restores the default endpoint.
+    """
+    global _provider_registry
+    _provider_registry = registry
+
+
+def load_provider_registry(path: str | os.PathLike[str]) -> ProviderRegistry:
+    """Load a registry with :meth:`ProviderRegistry.from_file` and install it."""
+    registry = ProviderRegistry.from_file(path)
+    set_provider_registry(registry)
+    return registry
+
+
+def _endpoint_config(endpoint: Endpoint) -> ClientConfig:
+    """Return the client configuration for a registry endpoint."""
+    config = _endpoint_configs.get(endpoint)
+    if config is None:
+        settings = {
+            key: value
+            for key, value in _config_overrides.items()
+            if key not in {"api_key", "base_url"}
+        }
+        settings.update(endpoint.client_settings)
+        config = _endpoint_configs[endpoint] = ClientConfig(
+            api_key=endpoint.api_key, base_url=endpoint.base_url, **settings
+        )
+    return config
+
+
+class _Target:
+    """Where the attempts of one request are sent.
+
+    Either the single endpoint of the current :class:`ClientConfig` or, when a
+    provider registry is installed, an endpoint chosen per attempt.
+    """
+
+    __slots__ = ("config", "registry")
+
+    def __init__(self) -> None:
+        self.registry = _provider_registry
+        self.config = get_config() if self.registry is None else None
+
+    @property
+    def endpoint_key(self) -> str | None:
+        """Return the endpoint identity used for breakers and cache keys."""
+        return self.config.base_url if self.config is not None else None
+
+    def lease(self, model: str, asynchronous: bool = False) -> tuple[Any, Endpoint | None]:
+        """Return the client for the next attempt and its registry endpoint."""
+        if self.registry is None:
+            config, endpoint = self.config, None
+        else:
+            endpoint = self.registry.acquire(model)
+            config = _endpoint_config(endpoint)
+        client = _get_async_client(config) if asynchronous else _get_client(config)
+        return client, endpoint
+
+    def finish(self, endpoint: Endpoint | None, ok: bool, sent: float) -> None:
+        """Report the outcome of an attempt started at ``sent``."""
+        if endpoint is not None:
+            self.registry.release(endpoint, ok, time.perf_counter() - sent)
+
+    def abandon(self, endpoint: Endpoint | None) -> None:
+        """Release an attempt that was cancelled before it finished."""
+        if endpoint is not None:
+            self.registry.release(endpoint, None)
+
+
+def _endpoint_label(target: _Target, endpoint: Endpoint | None) -> str | None:
+    """Return the endpoint name reported in metrics for an attempt."""
+    return endpoint.name if endpoint is not None else target.endpoint_key
+
+
+_T = TypeVar("_T")
+
+
+def call_with_retries(
+    model: str,
+    request: Callable[[OpenAI], _T],
+    retry_policy: RetryPolicy | None = None,
+) -> _T:
+    """Return ``request(client)`` for a client serving ``model``, with retries.
+
+    The client comes from the installed provider registry or the current
+    :class:`ClientConfig`, as for :func:`chat_completion`, and transient
+    failures are retried under ``retry_policy`` (default: the policy set with
+    :func:`set_retry_policy`). Unlike :func:`chat_completion`, no rate limits,
+    circuit breakers, cache or metrics apply; use it for other endpoints of
+    the API, such as embeddings.
+    """
+    policy = retry_policy or _retry_policy
+    target = _Target()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        client, endpoint = target.lease(model)
+        sent = time.perf_counter()
+        try:
+            response = request(client)
+        except Exception as exc:
+            transient = policy.is_retryable(exc)
+            target.finish(endpoint, not transient, sent)
+            delay = policy.next_delay(attempt, exc, started) if transient else None
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Interrupted: release the endpoint without judging it.
+            target.abandon(endpoint)
+            raise
+        target.finish(endpoint, True, sent)
+        return response
+
+
 def chat_completion(
-    prompt: str,
+    prompt: str | list[dict[str, Any]],
     model: str | None = None,
     max_tokens: int = 10_240,
     temperature: float = 0.7,
+    cache: ResponseCache | Literal[False] | None = None,
+    retry_policy: RetryPolicy | None = None,
+    priority: int = 0,
 ) -> dict:
     """Return the assistant message and token usage details.
 
@@ -98,53 +693,449 @@ def chat_completion(
     statistics (prompt, cache, reasoning and completion tokens) and ``cost`` for
     each token type when pricing information is available for ``model``. The
     ``temperature`` controls sampling diversity and defaults to ``0.7``.
+    ``prompt`` is sent as a single user message; pass a list of chat messages
+    (``{"role": ..., "content": ...}``) to send a whole conversation.
+
+    ``cache`` selects a :class:`~smartmodelrouter.cache.ResponseCache`; by
+    default the one installed with :func:`set_response_cache` is used, and
+    ``False`` bypasses caching. Results served through a cache include a
+    ``cached`` flag.
+
+    Transient failures are retried according to ``retry_policy`` (default: the
+    policy set with :func:`set_retry_policy`). Requests to a model whose circuit
+    breaker is open go to its configured fallback, or fail fast with
+    :class:`~smartmodelrouter.resilience.CircuitOpenError`. The ``model`` key of
+    the result names the model that actually answered.
+
+    When a provider registry is installed with :func:`set_provider_registry`,
+    every attempt is load balanced across the endpoints serving the model.
+    When a rate limiter is installed with :func:`set_rate_limiter`, every
+    attempt first waits for capacity, with lower ``priority`` values admitted
+    first.
     """
-    client = _get_client()
-    target_model = model or MODEL_NAME
-    # ``openai`` occasionally returns malformed JSON or encounters transient
-    # network issues.  These manifest as ``JSONDecodeError`` or ``httpx``
-    # exceptions bubbling out of ``client.chat.completions.create``.  Instead of
-    # failing immediately, attempt a few simple retries with exponential
-    # backoff.  If all retries fail, surface a more helpful ``RuntimeError`` so
-    # callers don't see an opaque JSON decoding stack trace.
-    completion = None
-    message_content = None
-    for attempt in range(3):
+    target = _Target()
+    target_model, breaker = _breakers.select(model or MODEL_NAME, target.endpoint_key)
+    probe = _metrics.probe(target_model)
+    policy = retry_policy or _retry_policy
+    response_cache = _resolve_cache(cache, temperature)
+    if response_cache is None:
+        return _chat_completion(
+            target, prompt, target_model, max_tokens, temperature, policy, breaker,
+            probe, priority,
+        )
+
+    called = False
+
+    def compute() -> dict:
+        nonlocal called
+        called = True
+        return _chat_completion(
+            target, prompt, target_model, max_tokens, temperature, policy, breaker,
+            probe, priority,
+        )
+
+    key = _cache_key(
+        response_cache, target.endpoint_key, prompt, target_model, max_tokens, temperature
+    )
+    try:
+        return response_cache.get_or_compute(key, compute)
+    finally:
+        if not called:
+            breaker.release()
+
+
+def _chat_completion(
+    target: _Target,
+    prompt: str | list[dict[str, Any]],
+    target_model: str,
+    max_tokens: int,
+    temperature: float,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    probe: _metrics.Probe | None = None,
+    priority: int = 0,
+) -> dict:
+    """Issue a completion request with retries and return its result."""
+    # ``openai`` occasionally returns malformed JSON, empty choices or
+    # encounters transient network issues and rate limits. Instead of failing
+    # immediately, retry according to ``policy``.
+    kwargs = _completion_kwargs(prompt, target_model, max_tokens, temperature)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        client, endpoint = target.lease(target_model)
+        permit = None
+        sent = time.perf_counter()
         try:
-            completion = client.chat.completions.create(
-                model=target_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                extra_body={"max_output_tokens": max_tokens},
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/aplassard/smartmodelrouter",
-                    "X-Title": "smartmodelrouter",
-                },
-            )
-            if not getattr(completion, "choices", None):
-                if attempt == 2:
-                    raise RuntimeError("Completion returned no choices")
-                time.sleep(2**attempt)
-                continue
-            first = completion.choices[0]
-            message_content = getattr(getattr(first, "message", None), "content", None)
-            if message_content is None:
-                if attempt == 2:
-                    raise RuntimeError("Completion returned no message content")
-                time.sleep(2**attempt)
-                continue
-            break
-        except (JSONDecodeError, httpx.HTTPError, APIConnectionError) as exc:  # pragma: no cover - network
-            if attempt == 2:
-                raise RuntimeError("Failed to retrieve completion") from exc
-            time.sleep(2**attempt)
-    assert completion is not None and message_content is not None  # for type checkers
-    usage = getattr(completion, "usage", None)
-    if hasattr(usage, "model_dump"):
-        usage = usage.model_dump()
+            permit = _admit(target, endpoint, target_model, kwargs, priority)
+            sent = time.perf_counter()
+            if probe is not None:
+                probe.attempt(_endpoint_label(target, endpoint))
+            completion = client.chat.completions.create(**kwargs)
+            message_content = _message_content(completion)
+        except Exception as exc:
+            target.finish(endpoint, not _is_transient(policy, exc), sent)
+            _settle(permit, exc=exc)
+            try:
+                delay = _retry_delay(policy, breaker, attempt, exc, started)
+            except Exception as error:
+                if probe is not None:
+                    probe.failed(error)
+                raise
+            _backoff(delay, probe)
+            attempt += 1
+            continue
+        except BaseException as exc:
+            # Cancelled, e.g. a losing hedge: the endpoint did nothing wrong,
+            # but its in-flight count, the permit and a half-open breaker
+            # trial must still be released.
+            target.abandon(endpoint)
+            _settle(permit, exc=exc)
+            breaker.release()
+            if probe is not None:
+                probe.discard()
+            raise
+        target.finish(endpoint, True, sent)
+        _settle(permit, getattr(completion, "usage", None))
+        breaker.record_success()
+        if probe is not None:
+            probe.succeeded(getattr(completion, "usage", None))
+        return _completion_result(completion, message_content, target_model)
+
+
+async def achat_completion(
+    prompt: str | list[dict[str, Any]],
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    temperature: float = 0.7,
+    cache: ResponseCache | Literal[False] | None = None,
+    retry_policy: RetryPolicy | None = None,
+    priority: int = 0,
+) -> dict:
+    """Asynchronous counterpart of :func:`chat_completion`.
+
+    Uses a shared :class:`openai.AsyncOpenAI` client and backs off with
+    ``asyncio.sleep`` so other requests on the event loop keep making progress
+    while this one waits. The returned mapping has the same shape as
+    :func:`chat_completion`.
+    """
+    target = _Target()
+    target_model, breaker = _breakers.select(model or MODEL_NAME, target.endpoint_key)
+    probe = _metrics.probe(target_model)
+    policy = retry_policy or _retry_policy
+    response_cache = _resolve_cache(cache, temperature)
+    if response_cache is None:
+        return await _achat_completion(
+            target, prompt, target_model, max_tokens, temperature, policy, breaker,
+            probe, priority,
+        )
+
+    called = False
+
+    async def compute() -> dict:
+        nonlocal called
+        called = True
+        return await _achat_completion(
+            target, prompt, target_model, max_tokens, temperature, policy, breaker,
+            probe, priority,
+        )
+
+    key = _cache_key(
+        response_cache, target.endpoint_key, prompt, target_model, max_tokens, temperature
+    )
+    try:
+        return await response_cache.aget_or_compute(key, compute)
+    finally:
+        if not called:
+            breaker.release()
+
+
+async def _achat_completion(
+    target: _Target,
+    prompt: str | list[dict[str, Any]],
+    target_model: str,
+    max_tokens: int,
+    temperature: float,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    probe: _metrics.Probe | None = None,
+    priority: int = 0,
+) -> dict:
+    """Issue an async completion request with retries and return its result."""
+    kwargs = _completion_kwargs(prompt, target_model, max_tokens, temperature)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        client, endpoint = target.lease(target_model, asynchronous=True)
+        permit = None
+        sent = time.perf_counter()
+        try:
+            permit = await _aadmit(target, endpoint, target_model, kwargs, priority)
+            sent = time.perf_counter()
+            if probe is not None:
+                probe.attempt(_endpoint_label(target, endpoint))
+            completion = await client.chat.completions.create(**kwargs)
+            message_content = _message_content(completion)
+        except Exception as exc:
+            target.finish(endpoint, not _is_transient(policy, exc), sent)
+            _settle(permit, exc=exc)
+            try:
+                delay = _retry_delay(policy, breaker, attempt, exc, started)
+            except Exception as error:
+                if probe is not None:
+                    probe.failed(error)
+                raise
+            await _abackoff(delay, probe)
+            attempt += 1
+            continue
+        except BaseException as exc:
+            # Cancelled, e.g. a losing hedge: the endpoint did nothing wrong,
+            # but its in-flight count, the permit and a half-open breaker
+            # trial must still be released.
+            target.abandon(endpoint)
+            _settle(permit, exc=exc)
+            breaker.release()
+            if probe is not None:
+                probe.discard()
+            raise
+        target.finish(endpoint, True, sent)
+        _settle(permit, getattr(completion, "usage", None))
+        breaker.record_success()
+        if probe is not None:
+            probe.succeeded(getattr(completion, "usage", None))
+        return _completion_result(completion, message_content, target_model)
+
+
+def _chunk_content(chunk) -> str | None:
+    """Return the content delta carried by a streamed chunk, if any."""
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return None
+    delta = getattr(choices[0], "delta", None)
+    return getattr(delta, "content", None)
+
+
+def _chunk_finish_reason(chunk) -> str | None:
+    """Return the finish reason carried by a streamed chunk, if any."""
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return None
+    return getattr(choices[0], "finish_reason", None)
+
+
+def _stream_summary(
+    model: str,
+    parts: list[str],
+    usage,
+    started: float,
+    first_token_at: float | None,
+    finished: float,
+    finish_reason: str | None = None,
+) -> dict:
+    """Return the final record of a streamed completion."""
+    usage = _usage_dict(usage)
+    completion_tokens = None
+    if isinstance(usage, dict):
+        completion_tokens = usage.get("completion_tokens")
+    if completion_tokens is None:
+        completion_tokens = len(parts)
+    generation_time = finished - (first_token_at if first_token_at is not None else started)
     return {
-        "message": message_content,
+        "type": "final",
+        "model": model,
+        "message": "".join(parts),
+        "finish_reason": finish_reason,
         "usage": usage,
-        "response": completion,
+        "time_to_first_token": (
+            first_token_at - started if first_token_at is not None else None
+        ),
+        "latency": finished - started,
+        "tokens_per_second": (
+            completion_tokens / generation_time if generation_time > 0 else None
+        ),
     }
+
+
+def chat_completion_stream(
+    prompt: str | list[dict[str, Any]],
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    temperature: float = 0.7,
+    retry_policy: RetryPolicy | None = None,
+    priority: int = 0,
+) -> Iterator[dict]:
+    """Stream a completion, yielding content deltas as they arrive.
+
+    Yields ``{"type": "delta", "content": str}`` records followed by one
+    ``{"type": "final", ...}`` record with the full ``message``, the upstream
+    ``finish_reason``, ``usage``, ``time_to_first_token`` and total
+    ``latency`` in seconds, and the observed ``tokens_per_second`` after the
+    first token.
+
+    Failures before the first content delta are retried like
+    :func:`chat_completion`; once content has been yielded a failure raises
+    ``RuntimeError`` because the partial output cannot be taken back.
+    """
+    target = _Target()
+    target_model, breaker = _breakers.select(model or MODEL_NAME, target.endpoint_key)
+    probe = _metrics.probe(target_model, stream=True)
+    policy = retry_policy or _retry_policy
+    kwargs = _completion_kwargs(prompt, target_model, max_tokens, temperature)
+    kwargs.update(stream=True, stream_options={"include_usage": True})
+    retry_started = time.monotonic()
+    attempt = 0
+    while True:
+        parts: list[str] = []
+        usage = None
+        finish_reason = None
+        first_token_at = None
+        client, endpoint = target.lease(target_model)
+        permit = None
+        started = time.perf_counter()
+        try:
+            permit = _admit(target, endpoint, target_model, kwargs, priority)
+            started = time.perf_counter()
+            if probe is not None:
+                probe.attempt(_endpoint_label(target, endpoint))
+            # Closing the stream releases its connection even when the
+            # consumer stops early.
+            with client.chat.completions.create(**kwargs) as stream:
+                for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    finish_reason = _chunk_finish_reason(chunk) or finish_reason
+                    content = _chunk_content(chunk)
+                    if content:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        parts.append(content)
+                        yield {"type": "delta", "content": content}
+            if not parts:
+                raise _EmptyCompletionError("Completion returned no message content")
+        except Exception as exc:
+            target.finish(endpoint, not _is_transient(policy, exc), started)
+            _settle(permit, exc=exc)
+            if parts:
+                breaker.record_failure()
+                error = RuntimeError("Completion stream interrupted")
+                if probe is not None:
+                    probe.failed(error)
+                raise error from exc
+            try:
+                delay = _retry_delay(policy, breaker, attempt, exc, retry_started)
+            except Exception as error:
+                if probe is not None:
+                    probe.failed(error)
+                raise
+            _backoff(delay, probe)
+            attempt += 1
+            continue
+        except BaseException as exc:
+            # The consumer stopped iterating; the endpoint did nothing wrong.
+            target.abandon(endpoint)
+            _settle(permit, exc=exc)
+            breaker.release()
+            if probe is not None:
+                probe.discard()
+            raise
+        target.finish(endpoint, True, started)
+        _settle(permit, usage)
+        breaker.record_success()
+        if probe is not None:
+            probe.succeeded(usage)
+        yield _stream_summary(
+            target_model,
+            parts,
+            usage,
+            started,
+            first_token_at,
+            time.perf_counter(),
+            finish_reason,
+        )
+        return
+
+
+async def achat_completion_stream(
+    prompt: str | list[dict[str, Any]],
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    temperature: float = 0.7,
+    retry_policy: RetryPolicy | None = None,
+    priority: int = 0,
+) -> AsyncIterator[dict]:
+    """Asynchronous counterpart of :func:`chat_completion_stream`."""
+    target = _Target()
+    target_model, breaker = _breakers.select(model or MODEL_NAME, target.endpoint_key)
+    probe = _metrics.probe(target_model, stream=True)
+    policy = retry_policy or _retry_policy
+    kwargs = _completion_kwargs(prompt, target_model, max_tokens, temperature)
+    kwargs.update(stream=True, stream_options={"include_usage": True})
+    retry_started = time.monotonic()
+    attempt = 0
+    while True:
+        parts: list[str] = []
+        usage = None
+        finish_reason = None
+        first_token_at = None
+        client, endpoint = target.lease(target_model, asynchronous=True)
+        permit = None
+        started = time.perf_counter()
+        try:
+            permit = await _aadmit(target, endpoint, target_model, kwargs, priority)
+            started = time.perf_counter()
+            if probe is not None:
+                probe.attempt(_endpoint_label(target, endpoint))
+            async with await client.chat.completions.create(**kwargs) as stream:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    finish_reason = _chunk_finish_reason(chunk) or finish_reason
+                    content = _chunk_content(chunk)
+                    if content:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        parts.append(content)
+                        yield {"type": "delta", "content": content}
+            if not parts:
+                raise _EmptyCompletionError("Completion returned no message content")
+        except Exception as exc:
+            target.finish(endpoint, not _is_transient(policy, exc), started)
+            _settle(permit, exc=exc)
+            if parts:
+                breaker.record_failure()
+                error = RuntimeError("Completion stream interrupted")
+                if probe is not None:
+                    probe.failed(error)
+                raise error from exc
+            try:
+                delay = _retry_delay(policy, breaker, attempt, exc, retry_started)
+            except Exception as error:
+                if probe is not None:
+                    probe.failed(error)
+                raise
+            await _abackoff(delay, probe)
+            attempt += 1
+            continue
+        except BaseException as exc:
+            # The consumer stopped iterating; the endpoint did nothing wrong.
+            target.abandon(endpoint)
+            _settle(permit, exc=exc)
+            breaker.release()
+            if probe is not None:
+                probe.discard()
+            raise
+        target.finish(endpoint, True, started)
+        _settle(permit, usage)
+        breaker.record_success()
+        if probe is not None:
+            probe.succeeded(usage)
+        yield _stream_summary(
+            target_model,
+            parts,
+            usage,
+            started,
+            first_token_at,
+            time.perf_counter(),
+            finish_reason,
+        )
+        return
@@ -0,0 +1,418 @@
+"""Per-call latency and token metrics for completion requests."""
+
+from __future__ import annotations
+
+import threading
+import time
+import warnings
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16_384, 65_536, 262_144)
+
+
+@dataclass(slots=True)
+class CallMetrics:
+    """Measurements of one completion call, passed to hooks.
+
+    Attributes
+    ----------
+    model:
+        Model that served (or last attempted) the call.
+    endpoint:
+        Base URL or registry endpoint name of the last attempt.
+    started:
+        Wall-clock (:func:`time.time`) timestamp of the call.
+    queue_time:
+        Seconds from the call until its first request was sent (client lookup,
+        circuit breaker, cache and rate limiter checks).
+    time_to_first_byte:
+        Seconds from sending the last attempt until its response headers
+        arrived, or ``None`` if unknown.
+    latency:
+        Total seconds spent in the call, including retries.
+    retries:
+        Attempts beyond the first.
+    prompt_tokens, completion_tokens, cached_tokens, reasoning_tokens:
+        Token counts reported by the API (zero when not reported).
+    error:
+        Exception type name if the call failed, otherwise ``None``.
+    stream:
+        Whether the call was a streaming completion.
+    """
+
+    model: str
+    endpoint: str | None
+    started: float
+    queue_time: float
+    time_to_first_byte: float | None
+    latency: float
+    retries: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    reasoning_tokens: int = 0
+    error: str | None = None
+    stream: bool = False
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as used by Prometheus."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add one observation (callers serialise access)."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the ``q`` quantile (0-1) by interpolating within buckets."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return count, sum, mean and estimated p50/p95/p99."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+_HISTOGRAMS: dict[str, tuple[str, tuple[float, ...], str]] = {
+    # attribute: (metric name, buckets, help)
+    "queue_time": (
+        "smartmodelrouter_queue_seconds",
+        LATENCY_BUCKETS,
+        "Seconds before the first request of a call was sent.",
+    ),
+    "time_to_first_byte": (
+        "smartmodelrouter_time_to_first_byte_seconds",
+        LATENCY_BUCKETS,
+        "Seconds until response headers arrived.",
+    ),
+    "latency": (
+        "smartmodelrouter_request_latency_seconds",
+        LATENCY_BUCKETS,
+        "Total seconds per call, including retries.",
+    ),
+    "retries": ("smartmodelrouter_retries", RETRY_BUCKETS, "Retries per call."),
+    "prompt_tokens": ("smartmodelrouter_prompt_tokens", TOKEN_BUCKETS, "Prompt tokens per call."),
+    "completion_tokens": (
+        "smartmodelrouter_completion_tokens",
+        TOKEN_BUCKETS,
+        "Completion tokens per call.",
+    ),
+    "cached_tokens": ("smartmodelrouter_cached_tokens", TOKEN_BUCKETS, "Cached prompt tokens per call."),
+    "reasoning_tokens": (
+        "smartmodelrouter_reasoning_tokens",
+        TOKEN_BUCKETS,
+        "Reasoning tokens per call.",
+    ),
+}
+
+
+class _ModelMetrics:
+    __slots__ = ("histograms", "requests", "errors")
+
+    def __init__(self) -> None:
+        self.histograms = {
+            attribute: Histogram(bounds) for attribute, (_, bounds, _) in _HISTOGRAMS.items()
+        }
+        self.requests = 0
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """Per-model histograms of :class:`CallMetrics`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: dict[str, _ModelMetrics] = {}
+
+    def record(self, call: CallMetrics) -> None:
+        """Add ``call`` to the histograms of its model."""
+        with self._lock:
+            metrics = self._models.get(call.model)
+            if metrics is None:
+                metrics = self._models[call.model] = _ModelMetrics()
+            metrics.requests += 1
+            if call.error is not None:
+                metrics.errors += 1
+            for attribute, histogram in metrics.histograms.items():
+                value = getattr(call, attribute)
+                if value is not None:
+                    histogram.observe(value)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return ``{model: {"requests", "errors", <metric>: summary}}``."""
+        with self._lock:
+            return {
+                model: {
+                    "requests": metrics.requests,
+                    "errors": metrics.errors,
+                    **{
+                        attribute: histogram.snapshot()
+                        for attribute, histogram in metrics.histograms.items()
+                    },
+                }
+                for model, metrics in self._models.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            models = sorted(self._models.items())
+            lines.append("# HELP smartmodelrouter_requests_total Completion calls.")
+            lines.append("# TYPE smartmodelrouter_requests_total counter")
+            for model, metrics in models:
+                label = _escape(model)
+                lines.append(
+                    f'smartmodelrouter_requests_total{{model="{label}",outcome="success"}} '
+                    f"{metrics.requests - metrics.errors}"
+                )
+                lines.append(
+                    f'smartmodelrouter_requests_total{{model="{label}",outcome="error"}} '
+                    f"{metrics.errors}"
+                )
+            for attribute, (name, bounds, help_text) in _HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for model, metrics in models:
+                    label = _escape(model)
+                    histogram = metrics.histograms[attribute]
+                    cumulative = 0
+                    for bound, count in zip((*bounds, "+Inf"), histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{model="{label}",le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f'{name}_sum{{model="{label}"}} {histogram.sum}')
+                    lines.append(f'{name}_count{{model="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop every recorded observation."""
+        with self._lock:
+            self._models.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+# Off by default so completions skip measurement entirely until something
+# reads the metrics.
+_enabled = False
+_hooks: tuple[Callable[[CallMetrics], None], ...] = ()
+active = False
+"""Whether calls are measured at all; ``False`` when metrics are disabled and no hook is set."""
+
+
+def _refresh() -> None:
+    global active
+    active = _enabled or bool(_hooks)
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    """Turn recording into :data:`registry` on or off (hooks still run).
+
+    Recording is off by default; without it and without hooks, completion calls
+    are not measured at all.
+    """
+    global _enabled
+    _enabled = enabled
+    _refresh()
+
+
+def add_hook(hook: Callable[[CallMetrics], None]) -> Callable[[], None]:
+    """Call ``hook`` with the :class:`CallMetrics` of every completed call.
+
+    Hooks run synchronously on the calling thread after the call finishes, so
+    they should be quick. Exceptions raised by a hook are turned into
+    warnings. Returns a function that removes the hook.
+    """
+    global _hooks
+    _hooks = (*_hooks, hook)
+    _refresh()
+    return lambda: remove_hook(hook)
+
+
+def remove_hook(hook: Callable[[CallMetrics], None]) -> None:
+    """Stop calling ``hook``."""
+    global _hooks
+    _hooks = tuple(existing for existing in _hooks if existing is not hook)
+    _refresh()
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    """Return :meth:`MetricsRegistry.snapshot` of the default registry."""
+    return registry.snapshot()
+
+
+def to_prometheus() -> str:
+    """Return :meth:`MetricsRegistry.to_prometheus` of the default registry."""
+    return registry.to_prometheus()
+
+
+def _emit(call: CallMetrics) -> None:
+    if _enabled:
+        registry.record(call)
+    for hook in _hooks:
+        try:
+            hook(call)
+        except Exception as exc:  # a broken tracer must not fail the request
+            warnings.warn(f"Metrics hook {hook!r} failed: {exc!r}", RuntimeWarning)
+
+
+_current_probe: ContextVar[Probe | None] = ContextVar("smartmodelrouter_probe", default=None)
+
+
+def mark_first_byte() -> None:
+    """Record response-header arrival for the attempt in progress, if measured."""
+    probe = _current_probe.get()
+    if probe is not None and probe.first_byte_at is None:
+        probe.first_byte_at = time.perf_counter()
+
+
+class Probe:
+    """Collects the measurements of one call while it runs."""
+
+    __slots__ = (
+        "model",
+        "endpoint",
+        "stream",
+        "started",
+        "entered",
+        "first_sent",
+        "sent",
+        "first_byte_at",
+        "attempts",
+        "_token",
+    )
+
+    def __init__(self, model: str, stream: bool = False) -> None:
+        self.model = model
+        self.endpoint: str | None = None
+        self.stream = stream
+        self.started = time.time()
+        self.entered = time.perf_counter()
+        self.first_sent: float | None = None
+        self.sent = 0.0
+        self.first_byte_at: float | None = None
+        self.attempts = 0
+        self._token = None
+
+    def attempt(self, endpoint: str | None) -> None:
+        """Mark that an attempt is being sent to ``endpoint``."""
+        self.sent = time.perf_counter()
+        if self.first_sent is None:
+            self.first_sent = self.sent
+            self._token = _current_probe.set(self)
+        self.endpoint = endpoint
+        self.first_byte_at = None
+        self.attempts += 1
+
+    def discard(self) -> None:
+        """Stop measuring without recording anything."""
+        if self._token is not None:
+            try:
+                _current_probe.reset(self._token)
+            except ValueError:  # finished in a different context
+                _current_probe.set(None)
+            self._token = None
+
+    def _finish(self, usage: Any, error: BaseException | None) -> None:
+        now = time.perf_counter()
+        self.discard()
+        call = CallMetrics(
+            model=self.model,
+            endpoint=self.endpoint,
+            started=self.started,
+            queue_time=(self.first_sent or now) - self.entered,
+            time_to_first_byte=(
+                self.first_byte_at - self.sent if self.first_byte_at is not None else None
+            ),
+            latency=now - self.entered,
+            retries=max(self.attempts - 1, 0),
+            error=type(error).__name__ if error is not None else None,
+            stream=self.stream,
+        )
+        if usage is not None:
+            call.prompt_tokens = _field(usage, "prompt_tokens")
+            call.completion_tokens = _field(usage, "completion_tokens")
+            call.cached_tokens = _field(
+                _field(usage, "prompt_tokens_details", None), "cached_tokens"
+            )
+            call.reasoning_tokens = _field(
+                _field(usage, "completion_tokens_details", None), "reasoning_tokens"
+            )
+        _emit(call)
+
+    def succeeded(self, usage: Any) -> None:
+        """Record the call as successful with ``usage`` from the response."""
+        self._finish(usage, None)
+
+    def failed(self, error: BaseException) -> None:
+        """Record the call as failed with ``error``."""
+        self._finish(None, error)
+
+
+def _field(obj: Any, name: str, default: Any = 0) -> Any:
+    if obj is None:
+        return default
+    value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+    if value is None or (default == 0 and not isinstance(value, (int, float))):
+        return default
+    return value
+
+
+def probe(model: str, stream: bool = False) -> Probe | None:
+    """Return a :class:`Probe` for a call to ``model``, or ``None`` when inactive."""
+    return Probe(model, stream) if active else None
+
+
+__all__ = [
+    "CallMetrics",
+    "Histogram",
+    "MetricsRegistry",
+    "add_hook",
+    "mark_first_byte",
+    "probe",
+    "registry",
+    "remove_hook",
+    "set_metrics_enabled",
+    "snapshot",
+    "to_prometheus",
+]
@@ -0,0 +1,499 @@
+"""Local OpenAI-compatible server for offline tests and benchmarks."""
+
+from __future__ import annotations
+
+import array
+import base64
+import email.parser
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts and adds 1s SYN retries.
+    request_queue_size = 1024
+
+
+class MockOpenAIServer:
+    """Threaded HTTP server that imitates the chat completions API.
+
+    Every response is delayed by ``latency`` seconds plus a uniform random
+    offset in ``[-jitter, jitter]``. A fraction ``error_rate`` of requests is
+    answered with ``error_status`` instead. Streaming requests
+    (``"stream": true``) receive server-sent events with one chunk per word of
+    the reply, ``token_delay`` seconds apart, followed by a chunk with the
+    finish reason and a usage chunk. Every word counts as a token: replies
+    longer than the request's ``max_tokens`` are cut off with finish reason
+    ``"length"``.
+
+    The files and batches endpoints of the Batch API are imitated as well.
+    Uploaded files are kept in memory and a batch finishes ``batch_delay``
+    seconds after it is created; each of its requests then fails with
+    probability ``error_rate`` (reported in the error file) and otherwise gets
+    the same completion as a direct request, without ``latency``.
+
+    ``/embeddings`` returns a deterministic unit vector per input, the same as
+    :meth:`embedding`, with the same latency and failures as chat requests.
+    The number of inputs of every embeddings request is appended to
+    :attr:`embedding_batches`.
+
+    Use it as a context manager; :attr:`base_url` is the value for
+    ``OPENAI_BASE_URL``::
+
+        with MockOpenAIServer(latency=0.05) as server:
+            reload_config(api_key="test", base_url=server.base_url)
+            chat_completion("2 + 2?")
+
+    Parameters
+    ----------
+    latency:
+        Base response delay in seconds.
+    jitter:
+        Maximum random deviation from ``latency`` in seconds.
+    error_rate:
+        Probability in ``[0, 1]`` that a request fails.
+    error_status:
+        HTTP status of failed requests. ``429`` responses carry
+        ``Retry-After: 0``.
+    reply:
+        Assistant message, or a callable mapping the request body to one.
+    token_delay:
+        Delay between streamed chunks in seconds.
+    seed:
+        Seed for latency jitter and error sampling.
+    batch_delay:
+        Seconds until a created batch is reported as completed.
+    embedding_dim:
+        Width of embeddings when the request does not ask for ``dimensions``.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        reply: str | Callable[[dict[str, Any]], str] = "42",
+        token_delay: float = 0.0,
+        seed: int | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        batch_delay: float = 0.0,
+        embedding_dim: int = 64,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reply = reply
+        self.token_delay = token_delay
+        self.batch_delay = batch_delay
+        self.embedding_dim = embedding_dim
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._batch_lock = threading.Lock()
+        self._address = (host, port)
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self.requests = 0
+        self.errors = 0
+        self.delays: list[float] = []
+        self.embedding_batches: list[int] = []
+        self.files: dict[str, dict[str, Any]] = {}
+        self.batches: dict[str, dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def base_url(self) -> str:
+        """Return the ``/v1`` URL of the running server."""
+        if self._server is None:
+            raise RuntimeError("Server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> MockOpenAIServer:
+        """Start serving on a background thread."""
+        if self._server is None:
+            self._server = _Server(self._address, _handler(self))
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and close its socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self) -> MockOpenAIServer:
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        """Forget request counts and recorded delays."""
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.delays = []
+            self.embedding_batches = []
+
+    def _plan(self) -> tuple[float, bool]:
+        """Return the delay and failure decision for the next request."""
+        with self._lock:
+            delay = self.latency
+            if self.jitter:
+                delay += self._random.uniform(-self.jitter, self.jitter)
+            delay = max(delay, 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            self.requests += 1
+            self.errors += fail
+            self.delays.append(delay)
+        return delay, fail
+
+    def _reply_for(self, body: dict[str, Any]) -> tuple[str, str]:
+        """Return the reply to ``body`` and its finish reason."""
+        content = self.reply(body) if callable(self.reply) else self.reply
+        limit = body.get("max_tokens")
+        words = content.split(" ")
+        if isinstance(limit, int) and len(words) > limit:
+            return " ".join(words[:limit]), "length"
+        return content, "stop"
+
+    def _completion(
+        self, body: dict[str, Any], content: str, finish_reason: str = "stop"
+    ) -> dict[str, Any]:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": finish_reason,
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+            "usage": _usage(body, content),
+        }
+
+    def embedding(self, text: str, dimensions: int | None = None) -> list[float]:
+        """Return the embedding served for ``text``."""
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest())
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions or self.embedding_dim)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _embeddings(self, body: dict[str, Any]) -> dict[str, Any]:
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        with self._lock:
+            self.embedding_batches.append(len(inputs))
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self.embedding(text, body.get("dimensions"))
+            if body.get("encoding_format") == "base64":
+                packed = array.array("f", vector).tobytes()
+                embedding: Any = base64.b64encode(packed).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(text.split()) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "mock"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _add_file(self, data: bytes, filename: str, purpose: str) -> dict[str, Any]:
+        with self._lock:
+            file_id = f"file-{next(self._ids)}"
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(data),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "content": data,
+            }
+        return self.files[file_id]
+
+    def _create_batch(self, body: dict[str, Any]) -> dict[str, Any] | None:
+        if body.get("input_file_id") not in self.files:
+            return None
+        with self._lock:
+            batch_id = f"batch-{next(self._ids)}"
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": body.get("endpoint"),
+                "input_file_id": body["input_file_id"],
+                "completion_window": body.get("completion_window", "24h"),
+                "status": "in_progress",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                "metadata": body.get("metadata"),
+                "_due": time.monotonic() + self.batch_delay,
+            }
+        return self.batches[batch_id]
+
+    def _refresh_batch(self, batch: dict[str, Any]) -> None:
+        """Run ``batch`` once its delay has passed."""
+        with self._batch_lock:
+            if batch["status"] == "in_progress" and time.monotonic() >= batch["_due"]:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: dict[str, Any]) -> None:
+        lines = self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        output: list[str] = []
+        errors: list[str] = []
+        for line in filter(str.strip, lines):
+            request = json.loads(line)
+            with self._lock:
+                fail = self.error_rate > 0 and self._random.random() < self.error_rate
+                self.requests += 1
+                self.errors += fail
+            if fail:
+                status = self.error_status
+                body: dict[str, Any] = {
+                    "error": {"message": "Injected failure", "type": "mock_error"}
+                }
+            else:
+                status = 200
+                body = self._completion(request["body"], *self._reply_for(request["body"]))
+            item = {
+                "id": f"batch_req_{len(output) + len(errors)}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": status, "request_id": "req-mock", "body": body},
+                "error": None,
+            }
+            (errors if fail else output).append(json.dumps(item))
+        for key, items in (("output_file_id", output), ("error_file_id", errors)):
+            if items:
+                data = ("\n".join(items) + "\n").encode("utf-8")
+                filename = f"{batch['id']}_{key.removesuffix('_file_id')}.jsonl"
+                batch[key] = self._add_file(data, filename, "batch_output")["id"]
+        batch["request_counts"] = {
+            "total": len(output) + len(errors),
+            "completed": len(output),
+            "failed": len(errors),
+        }
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+
+def _usage(body: dict[str, Any], content: str) -> dict[str, int]:
+    prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+    prompt_tokens = len(prompt.split())
+    completion_tokens = len(content.split())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _public(item: dict[str, Any]) -> dict[str, Any]:
+    """Return ``item`` without server-side bookkeeping fields."""
+    return {
+        key: value
+        for key, value in item.items()
+        if key != "content" and not key.startswith("_")
+    }
+
+
+def _handler(server: MockOpenAIServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without TCP_NODELAY the
+        # client's delayed ACK adds ~40ms to every response.
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(
+            self, status: int, payload: Any, headers: dict[str, str] | None = None
+        ) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_raw(self) -> bytes:
+            length = int(self.headers.get("content-length", 0))
+            return self.rfile.read(length)
+
+        def _send_bytes(self, data: bytes) -> None:
+            self.send_response(200)
+            self.send_header("content-type", "application/octet-stream")
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self) -> None:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+        def _route(self) -> list[str]:
+            parts = [part for part in self.path.split("?")[0].split("/") if part]
+            return parts[1:] if parts[:1] == ["v1"] else parts
+
+        def do_GET(self) -> None:
+            route = self._route()
+            if route == ["models"]:
+                self._send_json(200, {"object": "list", "data": []})
+            elif route[:1] == ["files"] and len(route) in (2, 3):
+                file = server.files.get(route[1])
+                if file is None or route[2:] not in ([], ["content"]):
+                    self._not_found()
+                elif route[2:]:
+                    self._send_bytes(file["content"])
+                else:
+                    self._send_json(200, _public(file))
+            elif route[:1] == ["batches"] and len(route) == 2 and route[1] in server.batches:
+                batch = server.batches[route[1]]
+                server._refresh_batch(batch)
+                self._send_json(200, _public(batch))
+            else:
+                self._not_found()
+
+        def do_POST(self) -> None:
+            raw = self._read_raw()
+            route = self._route()
+            if route == ["files"]:
+                self._upload(raw)
+            elif route == ["batches"]:
+                batch = server._create_batch(json.loads(raw or b"{}"))
+                if batch is None:
+                    self._send_json(400, {"error": {"message": "Unknown input file"}})
+                else:
+                    self._send_json(200, _public(batch))
+            elif route[:1] == ["batches"] and route[2:] == ["cancel"]:
+                batch = server.batches.get(route[1])
+                if batch is None:
+                    self._not_found()
+                    return
+                if batch["status"] == "in_progress":
+                    batch["status"] = "cancelled"
+                self._send_json(200, _public(batch))
+            elif route == ["chat", "completions"]:
+                self._chat(json.loads(raw or b"{}"))
+            elif route == ["embeddings"]:
+                if self._delay_or_fail():
+                    return
+                self._send_json(200, server._embeddings(json.loads(raw or b"{}")))
+            else:
+                self._not_found()
+
+        def _upload(self, raw: bytes) -> None:
+            header = f"content-type: {self.headers.get('content-type', '')}\r\n\r\n"
+            message = email.parser.BytesParser().parsebytes(header.encode("latin-1") + raw)
+            fields = {
+                part.get_param("name", header="content-disposition"): part
+                for part in message.get_payload()
+            }
+            if "file" not in fields:
+                self._send_json(400, {"error": {"message": "Missing file"}})
+                return
+            purpose = fields.get("purpose")
+            file = server._add_file(
+                fields["file"].get_payload(decode=True),
+                fields["file"].get_filename() or "upload",
+                purpose.get_payload(decode=True).decode("utf-8") if purpose else "",
+            )
+            self._send_json(200, _public(file))
+
+        def _delay_or_fail(self) -> bool:
+            """Apply the planned delay; answer with an error and return True if planned."""
+            delay, fail = server._plan()
+            if delay:
+                time.sleep(delay)
+            if fail:
+                headers = {"retry-after": "0"} if server.error_status == 429 else None
+                self._send_json(
+                    server.error_status,
+                    {"error": {"message": "Injected failure", "type": "mock_error"}},
+                    headers,
+                )
+            return fail
+
+        def _chat(self, body: dict[str, Any]) -> None:
+            if self._delay_or_fail():
+                return
+            content, finish_reason = server._reply_for(body)
+            if body.get("stream"):
+                self._stream(body, body.get("model", "mock"), content, finish_reason)
+                return
+            self._send_json(200, server._completion(body, content, finish_reason))
+
+        def _stream(
+            self, body: dict[str, Any], model: str, content: str, finish_reason: str
+        ) -> None:
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("transfer-encoding", "chunked")
+            self.end_headers()
+            base = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+            }
+            words = content.split(" ")
+            for position, word in enumerate(words):
+                if position and server.token_delay:
+                    time.sleep(server.token_delay)
+                piece = word if position == 0 else " " + word
+                self._event(
+                    {
+                        **base,
+                        "choices": [
+                            {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                        ],
+                    }
+                )
+            self._event(
+                {
+                    **base,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                }
+            )
+            self._event({**base, "choices": [], "usage": _usage(body, content)})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _event(self, payload: dict[str, Any]) -> None:
+            self._chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+__all__ = ["MockOpenAIServer"]
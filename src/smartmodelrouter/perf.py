@@ -0,0 +1,465 @@
+"""Offline throughput benchmarks against :class:`MockOpenAIServer`.
+
+Run from the command line and save the results for later comparison::
+
+    python -m smartmodelrouter.perf --concurrency 1 8 32 --output perf.json
+    python -m smartmodelrouter.perf --compare baseline.json perf.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from . import datasets, llm
+from .benchmark import evaluate_model
+from .embeddings import embed_problem, embed_texts
+from .mockserver import MockOpenAIServer
+from .proxy import RoutingProxy
+from .resilience import RetryPolicy
+from .routing import RoutingIndex
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+SCENARIOS = (
+    "chat_completion",
+    "achat_completion",
+    "chat_completion_stream",
+    "evaluate_model",
+    "embed_problem",
+    "proxy",
+)
+_PERCENTILES = (50, 90, 99)
+_MODEL = "mock/model"
+IMPORT_MODULES = (
+    "smartmodelrouter.llm",
+    "smartmodelrouter.embeddings",
+    "smartmodelrouter.routing",
+    "smartmodelrouter.bandit",
+    "smartmodelrouter.benchmark",
+)
+
+
+@contextmanager
+def _mock_environment(server: MockOpenAIServer) -> Iterator[None]:
+    """Point the client at ``server`` and use offline datasets, then restore."""
+    saved_config = llm._config
+    saved_policy = llm._retry_policy
+    saved_cache = llm._response_cache
+    saved_registry = llm._provider_registry
+    saved_datasets = dict(datasets._settings)
+    try:
+        llm._config = llm.ClientConfig(api_key="mock-key", base_url=server.base_url)
+        llm.set_retry_policy(RetryPolicy(max_attempts=5, base_delay=0.01, jitter=0.0))
+        llm.set_response_cache(None)
+        llm.set_provider_registry(None)
+        datasets.configure_dataset_cache(offline=True)
+        yield
+    finally:
+        llm._config = saved_config
+        llm.set_retry_policy(saved_policy)
+        llm.set_response_cache(saved_cache)
+        llm.set_provider_registry(saved_registry)
+        datasets._settings.update(saved_datasets)
+
+
+def _scenario_call(scenario: str) -> Callable[[], Any]:
+    if scenario == "chat_completion":
+        return lambda: llm.chat_completion("What is 6 * 7?", model=_MODEL, temperature=0)
+    if scenario == "chat_completion_stream":
+        return lambda: list(
+            llm.chat_completion_stream("What is 6 * 7?", model=_MODEL, temperature=0)
+        )
+    if scenario == "evaluate_model":
+        return lambda: evaluate_model(_MODEL, "math", 0, runs=1)
+    if scenario == "embed_problem":
+        return lambda: embed_problem(_MODEL, "math", 0)
+    raise ValueError(f"Unknown scenario {scenario!r}")
+
+
+def _run_threads(call: Callable[[], Any], requests: int, concurrency: int) -> list[float]:
+    def timed(_: int) -> float:
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(timed, range(requests)))
+
+
+def _run_async(requests: int, concurrency: int) -> list[float]:
+    async def main() -> list[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed() -> float:
+            async with semaphore:
+                started = time.perf_counter()
+                await llm.achat_completion("What is 6 * 7?", model=_MODEL, temperature=0)
+                return time.perf_counter() - started
+
+        return list(await asyncio.gather(*(timed() for _ in range(requests))))
+
+    return asyncio.run(main())
+
+
+async def _post(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+) -> None:
+    """Send a pre-encoded HTTP/1.1 request and read the response it gets."""
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(
+        int(line.split(b":", 1)[1])
+        for line in head.split(b"\r\n")
+        if line.lower().startswith(b"content-length:")
+    )
+    body = await reader.readexactly(length)
+    if status != 200:
+        raise RuntimeError(f"Proxy answered {status}: {body[:200]!r}")
+
+
+def _run_proxy(requests: int, concurrency: int) -> list[float]:
+    """Time requests sent through a :class:`~smartmodelrouter.proxy.RoutingProxy`.
+
+    The proxy routes every prompt with a small :class:`RoutingIndex`, so the
+    timings include embedding, routing and the extra HTTP hop. Each client
+    keeps one connection open and sends pre-encoded requests, so little of the
+    time is spent generating load.
+    """
+    prompts = ["What is 6 * 7?", "Write a haiku about the sea."]
+    index = RoutingIndex(embed_texts(prompts), [_MODEL], np.ones((len(prompts), 1)))
+    body = json.dumps(
+        {
+            "model": "auto",
+            "messages": [{"role": "user", "content": "What is 6 * 7?"}],
+            "temperature": 0,
+        }
+    ).encode()
+
+    async def main() -> list[float]:
+        async with RoutingProxy(index, max_concurrency=concurrency) as proxy:
+            request = (
+                f"POST /v1/chat/completions HTTP/1.1\r\nHost: {proxy.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode() + body
+            remaining = iter(range(requests))
+            latencies: list[float] = []
+
+            async def client() -> None:
+                reader, writer = await asyncio.open_connection(proxy.host, proxy.port)
+                try:
+                    for _ in remaining:
+                        started = time.perf_counter()
+                        await _post(reader, writer, request)
+                        latencies.append(time.perf_counter() - started)
+                finally:
+                    writer.close()
+                    await writer.wait_closed()
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return latencies
+
+    return asyncio.run(main())
+
+
+def _percentiles(values: Sequence[float]) -> dict[str, float | None]:
+    if not len(values):
+        return {f"p{q}": None for q in _PERCENTILES}
+    return {
+        f"p{q}": float(value)
+        for q, value in zip(_PERCENTILES, np.percentile(values, _PERCENTILES))
+    }
+
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure_import_time(module: str, repeat: int = 3) -> float:
+    """Return the fastest of ``repeat`` cold imports of ``module``, in seconds.
+
+    Each import runs in a fresh interpreter with ``-X importtime``, so the
+    figure covers the module and everything it imports, but not interpreter
+    startup.
+    """
+    # Give the child this process's import path so it finds the same modules.
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, sys.path))}
+    best = float("inf")
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        for line in completed.stderr.splitlines():
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == module:
+                best = min(best, int(fields[1]) / 1e6)
+    if best == float("inf"):
+        raise RuntimeError(f"No import timing reported for {module!r}")
+    return best
+
+
+def run_scenario(
+    server: MockOpenAIServer,
+    scenario: str,
+    concurrency: int,
+    requests: int,
+    trace_memory: bool = False,
+) -> dict[str, Any]:
+    """Run ``requests`` calls of ``scenario`` with ``concurrency`` in flight.
+
+    ``server`` must already be configured as the client endpoint (see
+    :func:`run_benchmark`). ``added_latency`` compares each latency percentile
+    with the same percentile of the delays the server injected, i.e. the time
+    spent in this package, the HTTP stack and the loopback connection. The
+    ``"proxy"`` scenario adds a hop through a local routing proxy; its added
+    latency minus that of ``"achat_completion"`` is the proxy's overhead per
+    request.
+    """
+    server.reset_stats()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        if scenario == "achat_completion":
+            latencies = _run_async(requests, concurrency)
+        elif scenario == "proxy":
+            latencies = _run_proxy(requests, concurrency)
+        else:
+            latencies = _run_threads(_scenario_call(scenario), requests, concurrency)
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    latency = _percentiles(latencies)
+    injected = _percentiles(server.delays) if server.delays else None
+    added = {
+        key: (
+            value - (injected[key] or 0.0) if injected is not None else value
+        )
+        for key, value in latency.items()
+    }
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "server_requests": server.requests,
+        "server_errors": server.errors,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed > 0 else None,
+        "latency": latency,
+        "added_latency": added,
+        "max_rss_mb": _max_rss_mb(),
+        "traced_peak_mb": traced_peak / (1024 * 1024) if traced_peak is not None else None,
+    }
+
+
+def run_benchmark(
+    scenarios: Sequence[str] = SCENARIOS,
+    concurrency: Sequence[int] = (1, 8, 32),
+    requests: int = 200,
+    latency: float = 0.02,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    token_delay: float = 0.0,
+    trace_memory: bool = False,
+    seed: int | None = 0,
+    imports: Sequence[str] = IMPORT_MODULES,
+) -> dict[str, Any]:
+    """Benchmark the client stack against a local mock server.
+
+    Each scenario is run at every concurrency level against one
+    :class:`~smartmodelrouter.mockserver.MockOpenAIServer`. Client, retry,
+    cache and dataset settings are restored afterwards. The cold import time
+    of every module in ``imports`` is measured as well.
+
+    Returns
+    -------
+    dict
+        ``{"meta": {...}, "results": [run_scenario(...), ...],
+        "imports": {module: seconds}}``, ready for :func:`save_results`.
+    """
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {sorted(unknown)}")
+    results = []
+    with MockOpenAIServer(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        token_delay=token_delay,
+        reply="The answer is 42",
+        seed=seed,
+    ) as server, _mock_environment(server):
+        for scenario in scenarios:
+            # Warm up connection pools and dataset caches outside the timings.
+            run_scenario(server, scenario, 1, 1)
+            for level in concurrency:
+                results.append(
+                    run_scenario(server, scenario, level, requests, trace_memory=trace_memory)
+                )
+    return {
+        "meta": {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": {
+                "latency": latency,
+                "jitter": jitter,
+                "error_rate": error_rate,
+                "token_delay": token_delay,
+            },
+        },
+        "results": results,
+        "imports": {module: measure_import_time(module) for module in imports},
+    }
+
+
+def save_results(results: Mapping[str, Any], path: str | Path) -> None:
+    """Write benchmark ``results`` to ``path`` as JSON."""
+    Path(path).write_text(json.dumps(results, indent=2, sort_keys=True))
+
+
+def compare_results(
+    baseline: Mapping[str, Any],
+    current: Mapping[str, Any],
+    tolerance: float = 0.1,
+) -> list[str]:
+    """Return descriptions of regressions of ``current`` against ``baseline``.
+
+    A run regresses when its throughput drops, or its p50/p99 added latency
+    grows, by more than ``tolerance`` (a fraction) for the same scenario and
+    concurrency. A module regresses when its import time grows by more than
+    ``tolerance``.
+    """
+    previous = {
+        (run["scenario"], run["concurrency"]): run for run in baseline.get("results", [])
+    }
+    regressions = []
+    for run in current.get("results", []):
+        key = (run["scenario"], run["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        label = f"{key[0]} @ {key[1]}"
+        old_rps, new_rps = before.get("requests_per_second"), run.get("requests_per_second")
+        if old_rps and new_rps is not None and new_rps < old_rps * (1 - tolerance):
+            regressions.append(f"{label}: {new_rps:.1f} req/s vs {old_rps:.1f}")
+        for quantile in ("p50", "p99"):
+            old = before["added_latency"].get(quantile)
+            new = run["added_latency"].get(quantile)
+            if old and new is not None and old > 0 and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{label}: added {quantile} {new * 1000:.2f}ms vs {old * 1000:.2f}ms"
+                )
+    previous_imports = baseline.get("imports", {})
+    for module, seconds in current.get("imports", {}).items():
+        old = previous_imports.get(module)
+        if old and seconds > old * (1 + tolerance):
+            regressions.append(
+                f"import {module}: {seconds * 1000:.0f}ms vs {old * 1000:.0f}ms"
+            )
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command-line entry point; returns the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument(
+        "--imports",
+        nargs="*",
+        default=list(IMPORT_MODULES),
+        help="modules whose cold import time is measured",
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        type=Path,
+        help="compare two saved result files instead of running",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        regressions = compare_results(baseline, current, args.tolerance)
+        for line in regressions:
+            print(line)
+        return 1 if regressions else 0
+
+    results = run_benchmark(
+        scenarios=args.scenarios,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        token_delay=args.token_delay,
+        trace_memory=args.trace_memory,
+        imports=args.imports,
+    )
+    for run in results["results"]:
+        added = run["added_latency"]
+        print(
+            f"{run['scenario']:<24} c={run['concurrency']:<4} "
+            f"{run['requests_per_second']:>9.1f} req/s  "
+            f"added p50={added['p50'] * 1000:.2f}ms p99={added['p99'] * 1000:.2f}ms"
+        )
+    for module, seconds in results["imports"].items():
+        print(f"import {module:<34} {seconds * 1000:>9.1f} ms")
+    if args.output:
+        save_results(results, args.output)
+    return 0
+
+
+__all__ = [
+    "IMPORT_MODULES",
+    "SCENARIOS",
+    "compare_results",
+    "main",
+    "measure_import_time",
+    "run_benchmark",
+    "run_scenario",
+    "save_results",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Registry of OpenAI-compatible endpoints with load balancing."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tomllib
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """One OpenAI-compatible endpoint and the models it serves.
+
+    Attributes
+    ----------
+    name:
+        Unique identifier of the endpoint.
+    base_url:
+        Endpoint URL, e.g. ``"https://openrouter.ai/api/v1"``.
+    api_key:
+        API key for the endpoint.
+    models:
+        Model names or glob patterns served by the endpoint.
+    weight:
+        Relative capacity; an endpoint with weight 2 receives about twice the
+        traffic of one with weight 1 at equal latency.
+    client_settings:
+        Extra :class:`~smartmodelrouter.llm.ClientConfig` fields, e.g. pool
+        limits, for this endpoint's client.
+    """
+
+    name: str
+    base_url: str
+    api_key: str = field(repr=False)
+    models: tuple[str, ...] = ("*",)
+    weight: float = 1.0
+    client_settings: Mapping[str, Any] = field(
+        default_factory=dict, hash=False, compare=False
+    )
+
+    def serves(self, model: str) -> bool:
+        """Return whether this endpoint serves ``model``."""
+        return any(fnmatchcase(model, pattern) for pattern in self.models)
+
+
+@dataclass
+class _EndpointStats:
+    inflight: int = 0
+    latency: float | None = None
+    failures: int = 0
+    ejected_until: float = 0.0
+
+
+class ProviderRegistry:
+    """Pick an endpoint per request by weighted least outstanding requests.
+
+    Each endpoint is scored as ``(in_flight + 1) * latency / weight``, where
+    ``latency`` is an exponentially weighted moving average of recent request
+    latencies, and the lowest score wins. An endpoint that fails
+    ``eject_after`` times in a row is taken out of rotation for ``cooldown``
+    seconds, doubling on every further failure up to ``max_cooldown``. If every
+    endpoint for a model is ejected, the one due back soonest is used.
+
+    Parameters
+    ----------
+    endpoints:
+        The endpoints to balance over.
+    eject_after:
+        Consecutive failures that take an endpoint out of rotation.
+    cooldown:
+        Initial ejection period in seconds.
+    max_cooldown:
+        Upper bound of the ejection period.
+    latency_alpha:
+        Smoothing factor of the latency moving average.
+    default_latency:
+        Latency assumed for endpoints without observations.
+    """
+
+    def __init__(
+        self,
+        endpoints: Iterable[Endpoint],
+        eject_after: int = 1,
+        cooldown: float = 10.0,
+        max_cooldown: float = 300.0,
+        latency_alpha: float = 0.2,
+        default_latency: float = 1.0,
+    ) -> None:
+        self.endpoints = list(endpoints)
+        if not self.endpoints:
+            raise ValueError("At least one endpoint is required")
+        names = [endpoint.name for endpoint in self.endpoints]
+        if len(set(names)) != len(names):
+            raise ValueError("Endpoint names must be unique")
+        self.eject_after = eject_after
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency_alpha = latency_alpha
+        self.default_latency = default_latency
+        self._lock = threading.Lock()
+        self._stats = {endpoint.name: _EndpointStats() for endpoint in self.endpoints}
+        self._by_model: dict[str, list[Endpoint]] = {}
+
+    @classmethod
+    def from_file(cls, path: str | os.PathLike[str]) -> ProviderRegistry:
+        """Load a registry from a TOML or JSON file.
+
+        The file holds an ``endpoints`` list and optional top-level registry
+        settings (``eject_after``, ``cooldown``, ...). Each endpoint has
+        ``name``, ``base_url``, either ``api_key`` or ``api_key_env`` (the name
+        of an environment variable holding the key), and optionally ``models``,
+        ``weight`` and ``client`` (a table of client settings)::
+
+            cooldown = 15
+
+            [[endpoints]]
+            name = "primary"
+            base_url = "https://openrouter.ai/api/v1"
+            api_key_env = "OPENROUTER_KEY_A"
+            weight = 2
+            models = ["openai/*"]
+        """
+        path = Path(path)
+        with path.open("rb") as fh:
+            if path.suffix == ".json":
+                data = json.load(fh)
+            else:
+                data = tomllib.load(fh)
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> ProviderRegistry:
+        """Build a registry from parsed configuration data."""
+        endpoints = []
+        for raw in data.get("endpoints", []):
+            api_key = raw.get("api_key")
+            if api_key is None and raw.get("api_key_env"):
+                api_key = os.getenv(raw["api_key_env"])
+            if not api_key:
+                raise RuntimeError(f"Missing API key for endpoint {raw.get('name')!r}")
+            endpoints.append(
+                Endpoint(
+                    name=raw["name"],
+                    base_url=raw["base_url"],
+                    api_key=api_key,
+                    models=tuple(raw.get("models", ("*",))),
+                    weight=float(raw.get("weight", 1.0)),
+                    client_settings=dict(raw.get("client", {})),
+                )
+            )
+        settings = {key: value for key, value in data.items() if key != "endpoints"}
+        return cls(endpoints, **settings)
+
+    def endpoints_for(self, model: str) -> list[Endpoint]:
+        """Return the endpoints serving ``model``."""
+        endpoints = self._by_model.get(model)
+        if endpoints is None:
+            endpoints = [endpoint for endpoint in self.endpoints if endpoint.serves(model)]
+            self._by_model[model] = endpoints
+        return endpoints
+
+    def acquire(self, model: str) -> Endpoint:
+        """Choose an endpoint for ``model`` and count the request as in flight.
+
+        Every :meth:`acquire` must be paired with a :meth:`release`.
+        """
+        candidates = self.endpoints_for(model)
+        if not candidates:
+            raise RuntimeError(f"No endpoint configured for model {model!r}")
+        now = time.monotonic()
+        with self._lock:
+            healthy = [
+                endpoint
+                for endpoint in candidates
+                if self._stats[endpoint.name].ejected_until <= now
+            ]
+            if healthy:
+                chosen = min(healthy, key=self._score)
+            else:
+                chosen = min(
+                    candidates, key=lambda endpoint: self._stats[endpoint.name].ejected_until
+                )
+            self._stats[chosen.name].inflight += 1
+        return chosen
+
+    def _score(self, endpoint: Endpoint) -> float:
+        stats = self._stats[endpoint.name]
+        latency = stats.latency if stats.latency is not None else self.default_latency
+        return (stats.inflight + 1) * latency / endpoint.weight
+
+    def release(
+        self, endpoint: Endpoint, ok: bool | None, latency: float | None = None
+    ) -> None:
+        """Record the outcome of a request started with :meth:`acquire`.
+
+        ``ok=None`` marks a request abandoned before it finished, e.g. a
+        cancelled hedge: it only stops counting as in flight and leaves the
+        endpoint's failures, ejection and latency alone.
+        """
+        with self._lock:
+            stats = self._stats[endpoint.name]
+            stats.inflight = max(stats.inflight - 1, 0)
+            if ok is None:
+                return
+            if ok:
+                stats.failures = 0
+                stats.ejected_until = 0.0
+                if latency is not None:
+                    if stats.latency is None:
+                        stats.latency = latency
+                    else:
+                        stats.latency += self.latency_alpha * (latency - stats.latency)
+                return
+            stats.failures += 1
+            if stats.failures >= self.eject_after:
+                exponent = stats.failures - self.eject_after
+                period = min(self.cooldown * 2**exponent, self.max_cooldown)
+                stats.ejected_until = time.monotonic() + period
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the live statistics of every endpoint."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "inflight": stats.inflight,
+                    "latency": stats.latency,
+                    "failures": stats.failures,
+                    "ejected": stats.ejected_until > now,
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+__all__ = ["Endpoint", "ProviderRegistry"]
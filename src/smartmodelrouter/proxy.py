@@ -0,0 +1,730 @@
+"""OpenAI-compatible HTTP proxy that routes each chat request to a model.
+
+Run it in front of an application that speaks the OpenAI API and point the
+application's ``OPENAI_BASE_URL`` at the proxy::
+
+    python -m smartmodelrouter.proxy --index routing-index --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from contextlib import aclosing, suppress
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any
+
+import numpy as np
+
+from . import llm
+from .bandit import OnlineRouter, RoutingDecision
+from .embeddings import embed_texts
+from .resilience import CircuitOpenError
+from .routing import RoutingIndex
+
+Router = RoutingIndex | OnlineRouter | Callable[[str], str]
+
+MODEL_HEADER = "X-SmartModelRouter-Model"
+DECISION_HEADER = "X-SmartModelRouter-Decision"
+_COMPLETION_PATHS = frozenset({"/v1/chat/completions", "/chat/completions"})
+_MODELS_PATHS = frozenset({"/v1/models", "/models"})
+_MAX_HEADER_BYTES = 64 * 1024
+
+
+class _HTTPError(Exception):
+    """An error answered with ``status`` and an OpenAI-style error body."""
+
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        kind: str = "invalid_request_error",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.kind = kind
+        self.headers = headers or {}
+
+
+@dataclass
+class _Request:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+@dataclass
+class _Route:
+    """The model chosen for a request and the reasons, sent back as headers."""
+
+    model: str
+    requested: str | None
+    router: str
+    scores: dict[str, float] | None = None
+    seconds: float = 0.0
+    decision: RoutingDecision | None = field(default=None, repr=False)
+
+    def headers(self) -> dict[str, str]:
+        summary: dict[str, Any] = {
+            "model": self.model,
+            "requested": self.requested,
+            "router": self.router,
+            "route_ms": round(self.seconds * 1000, 3),
+        }
+        if self.scores is not None:
+            summary["scores"] = {model: round(score, 4) for model, score in self.scores.items()}
+        return {
+            MODEL_HEADER: self.model,
+            DECISION_HEADER: json.dumps(summary, separators=(",", ":")),
+        }
+
+
+async def _read_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_body: int
+) -> _Request | None:
+    """Read one HTTP/1.1 request, or return ``None`` when the client hung up."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial.strip():
+            return None
+        raise _HTTPError(400, "Incomplete request headers") from exc
+    except asyncio.LimitOverrunError as exc:
+        raise _HTTPError(431, "Request headers too large") from exc
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise _HTTPError(400, "Malformed request line") from None
+    headers = {}
+    for line in header_lines:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise _HTTPError(400, "Malformed header line")
+        headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise _HTTPError(501, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise _HTTPError(400, "Invalid Content-Length") from None
+    if not 0 <= length <= max_body:
+        raise _HTTPError(413, f"Request body larger than {max_body} bytes")
+    if length and headers.get("expect", "").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    body = await reader.readexactly(length)
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        keep_alive = connection != "close"
+    else:
+        keep_alive = connection == "keep-alive"
+    return _Request(method, target.split("?", 1)[0], headers, body, keep_alive)
+
+
+def _head(status: int, headers: dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "replace")
+
+
+def _json_response(
+    status: int, payload: Any, keep_alive: bool, headers: dict[str, str] | None = None
+) -> bytes:
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    head = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **(headers or {}),
+    }
+    return _head(status, head) + body
+
+
+def _error_payload(message: str, kind: str) -> dict[str, Any]:
+    return {"error": {"message": message, "type": kind, "code": None}}
+
+
+def _upstream_error(exc: Exception) -> _HTTPError:
+    """Return the response for a request that failed upstream."""
+    if isinstance(exc, CircuitOpenError):
+        return _HTTPError(503, str(exc), "service_unavailable")
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 600:
+        return _HTTPError(status, str(exc), "upstream_error")
+    return _HTTPError(502, f"{type(exc).__name__}: {exc}", "upstream_error")
+
+
+def _prompt_text(messages: Sequence[dict[str, Any]]) -> str:
+    """Return the text of the last user message, which the request is routed by."""
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            return " ".join(
+                str(part.get("text", ""))
+                for part in content
+                if isinstance(part, dict) and part.get("type") == "text"
+            )
+        return str(content or "")
+    return ""
+
+
+def _parse_completion_request(body: bytes) -> dict[str, Any]:
+    """Validate a chat completion request body and return it."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise _HTTPError(400, "Request body is not valid JSON") from None
+    if not isinstance(payload, dict):
+        raise _HTTPError(400, "Request body must be a JSON object")
+    messages = payload.get("messages")
+    if (
+        not isinstance(messages, list)
+        or not messages
+        or not all(isinstance(message, dict) for message in messages)
+    ):
+        raise _HTTPError(400, "'messages' must be a non-empty list of objects")
+    model = payload.get("model")
+    if model is not None and (
+        not isinstance(model, str) or any(ord(char) < 32 for char in model)
+    ):
+        raise _HTTPError(400, "'model' must be a string")
+    return payload
+
+
+def _options(payload: dict[str, Any]) -> dict[str, Any]:
+    """Return the ``llm`` keyword arguments set by a request."""
+    options = {}
+    max_tokens = payload.get("max_completion_tokens", payload.get("max_tokens"))
+    if max_tokens is not None:
+        options["max_tokens"] = max_tokens
+    if payload.get("temperature") is not None:
+        options["temperature"] = payload["temperature"]
+    return options
+
+
+def _completion_body(result: dict[str, Any]) -> dict[str, Any]:
+    """Return the chat completion object for an ``achat_completion`` result."""
+    response = result.get("response")
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude_unset=True)
+    if isinstance(response, dict) and response.get("choices"):
+        return response
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": result["model"],
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": result["message"]},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": result.get("usage"),
+    }
+
+
+def _usage_tokens(usage: Any) -> int | None:
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return None
+
+
+class _ChunkWriter:
+    """Write server-sent events in chunked transfer encoding."""
+
+    def __init__(self, writer: asyncio.StreamWriter, model: str) -> None:
+        self.writer = writer
+        self.model = model
+        self.id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.created = int(time.time())
+
+    def write(self, data: str) -> None:
+        payload = f"data: {data}\n\n".encode()
+        self.writer.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+
+    def chunk(
+        self,
+        delta: dict[str, Any] | None,
+        finish_reason: str | None = None,
+        usage: Any = None,
+    ) -> None:
+        event: dict[str, Any] = {
+            "id": self.id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "choices": (
+                [] if delta is None
+                else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            ),
+        }
+        if usage is not None:
+            event["usage"] = usage
+        self.write(json.dumps(event, separators=(",", ":")))
+
+    def end(self) -> None:
+        self.write("[DONE]")
+        self.writer.write(b"0\r\n\r\n")
+
+
+class RoutingProxy:
+    """Asyncio HTTP server that routes OpenAI chat completion requests.
+
+    ``POST /v1/chat/completions`` requests, streaming or not, are answered
+    like the OpenAI API. The last user message of each request is embedded
+    with the package's embedder and passed to ``router``, and the whole
+    conversation is forwarded to the chosen model with
+    :func:`~smartmodelrouter.llm.achat_completion` or
+    :func:`~smartmodelrouter.llm.achat_completion_stream`. Retries, circuit
+    breakers, rate limits, endpoint balancing and caching therefore apply as
+    for direct calls, and upstream connections are pooled by the shared async
+    client of the proxy's event loop. Only ``messages``, ``max_tokens`` (or
+    ``max_completion_tokens``), ``temperature`` and
+    ``stream_options.include_usage`` are honoured; other parameters are
+    ignored.
+
+    Every response carries the chosen model in ``X-SmartModelRouter-Model``
+    and a JSON summary of the decision (requested model, router, scores and
+    routing time) in ``X-SmartModelRouter-Decision``. ``GET /v1/models`` lists
+    the models the proxy routes to and ``GET /health`` reports its counters.
+
+    At most ``max_concurrency`` requests are forwarded at a time. Up to
+    ``max_pending`` more wait for a slot; beyond that, requests are rejected
+    with ``503`` and ``Retry-After`` so clients back off. Streamed responses
+    are only read from upstream as fast as the client accepts them.
+
+    Use ``async with`` to serve on the running event loop, or ``with`` to
+    serve from a background thread::
+
+        with RoutingProxy(index) as proxy:
+            client = OpenAI(base_url=proxy.base_url, api_key="unused")
+
+    Parameters
+    ----------
+    router:
+        A :class:`~smartmodelrouter.routing.RoutingIndex`, an
+        :class:`~smartmodelrouter.bandit.OnlineRouter` (which is told the
+        outcome, latency and tokens of every request), or a callable mapping
+        the prompt text to a model. ``None`` sends everything to
+        ``default_model``.
+    default_model:
+        Model used without a router, or when the index has no evaluated model
+        near the prompt. Defaults to :data:`~smartmodelrouter.llm.MODEL_NAME`.
+    host, port:
+        Address to listen on. Port ``0`` picks a free port.
+    alias:
+        Model name clients send to ask for routing.
+    passthrough:
+        Forward requests naming a model other than ``alias`` to that model
+        unchanged. By default every request is routed.
+    k, cost_weight:
+        Passed to :meth:`RoutingIndex.scores
+        <smartmodelrouter.routing.RoutingIndex.scores>`.
+    max_concurrency:
+        Requests forwarded at once. Defaults to the client's
+        ``max_connections``, the size of the upstream connection pool.
+    max_pending:
+        Requests allowed to wait for a forwarding slot.
+    max_body:
+        Largest accepted request body in bytes.
+    """
+
+    def __init__(
+        self,
+        router: Router | None = None,
+        default_model: str | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        alias: str = "auto",
+        passthrough: bool = False,
+        k: int = 10,
+        cost_weight: float = 0.0,
+        max_concurrency: int | None = None,
+        max_pending: int = 1024,
+        max_body: int = 10 * 1024 * 1024,
+    ) -> None:
+        self.router = router
+        self.default_model = default_model or llm.MODEL_NAME
+        self.host = host
+        self.port = port
+        self.alias = alias
+        self.passthrough = passthrough
+        self.k = k
+        self.cost_weight = cost_weight
+        self.max_concurrency = max_concurrency or llm.get_config().max_connections
+        self.max_pending = max_pending
+        self.max_body = max_body
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self._active = 0
+        self._waiting = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to use as an OpenAI client's ``base_url``."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def models(self) -> list[str]:
+        """Return the models requests may be routed to."""
+        models = getattr(self.router, "models", None)
+        return list(models) if models else [self.default_model]
+
+    def stats(self) -> dict[str, int]:
+        """Return request counters and the current load."""
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "active": self._active,
+            "waiting": self._waiting,
+        }
+
+    # -- lifecycle -----------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start listening on the running event loop."""
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(
+            self._serve_connection, self.host, self.port, limit=_MAX_HEADER_BYTES, backlog=1024
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Start the server if needed and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop accepting connections, drop open ones and close upstream clients."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await llm.aclose_clients()
+
+    async def __aenter__(self) -> RoutingProxy:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def __enter__(self) -> RoutingProxy:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="smartmodelrouter-proxy", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._loop is not None and self._thread is not None
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+    # -- routing -------------------------------------------------------------
+
+    def route(self, payload: dict[str, Any]) -> _Route:
+        """Choose the model for a chat completion request body."""
+        started = time.perf_counter()
+        requested = payload.get("model")
+        router = self.router
+        if self.passthrough and requested and requested != self.alias:
+            route = _Route(requested, requested, "passthrough")
+        elif router is None:
+            route = _Route(self.default_model, requested, "default")
+        else:
+            prompt = _prompt_text(payload["messages"])
+            if isinstance(router, OnlineRouter):
+                decision = router.select(prompt=prompt)
+                route = _Route(decision.model, requested, "bandit", decision.scores)
+                route.decision = decision
+            elif isinstance(router, RoutingIndex):
+                embedding = embed_texts([prompt], dtype=np.float32)[0]
+                scores = router.scores(embedding, k=self.k, cost_weight=self.cost_weight)
+                model = max(scores, key=scores.__getitem__) if scores else self.default_model
+                route = _Route(model, requested, "index", scores)
+            else:
+                route = _Route(router(prompt), requested, "custom")
+        route.seconds = time.perf_counter() - started
+        return route
+
+    def _report(self, route: _Route, success: bool, latency: float, usage: Any = None) -> None:
+        if route.decision is not None:
+            assert isinstance(self.router, OnlineRouter)
+            self.router.report(
+                route.decision, float(success), latency=latency, tokens=_usage_tokens(usage)
+            )
+
+    # -- HTTP ----------------------------------------------------------------
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader, writer, self.max_body)
+                except _HTTPError as exc:
+                    writer.write(
+                        _json_response(
+                            exc.status, _error_payload(exc.message, exc.kind), keep_alive=False
+                        )
+                    )
+                    await writer.drain()
+                    break
+                if request is None or not await self._dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # :meth:`close` cancels open connections. The connection task is
+            # owned by the server, so end it quietly instead of re-raising.
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    async def _dispatch(self, request: _Request, writer: asyncio.StreamWriter) -> bool:
+        """Answer ``request`` and return whether the connection stays open."""
+        keep_alive = request.keep_alive
+        try:
+            if request.path in _COMPLETION_PATHS:
+                if request.method != "POST":
+                    raise _HTTPError(405, "Use POST for chat completions")
+                return await self._chat_completion(request, writer)
+            if request.method != "GET":
+                raise _HTTPError(405, f"Method {request.method} not allowed")
+            if request.path in _MODELS_PATHS:
+                payload: dict[str, Any] = {
+                    "object": "list",
+                    "data": [
+                        {"id": model, "object": "model", "owned_by": "smartmodelrouter"}
+                        for model in self.models()
+                    ],
+                }
+            elif request.path == "/health":
+                payload = {"status": "ok", **self.stats()}
+            else:
+                raise _HTTPError(404, f"No route for {request.path}")
+            writer.write(_json_response(200, payload, keep_alive))
+        except _HTTPError as exc:
+            writer.write(
+                _json_response(
+                    exc.status, _error_payload(exc.message, exc.kind), keep_alive, exc.headers
+                )
+            )
+        await writer.drain()
+        return keep_alive
+
+    async def _acquire(self) -> None:
+        """Wait for a forwarding slot, or reject the request when too many wait."""
+        assert self._slots is not None
+        if self._slots.locked() and self._waiting >= self.max_pending:
+            self.rejected += 1
+            raise _HTTPError(
+                503, "Proxy overloaded, retry later", "overloaded", {"Retry-After": "1"}
+            )
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+
+    def _release(self) -> None:
+        assert self._slots is not None
+        self._active -= 1
+        self._slots.release()
+
+    async def _chat_completion(self, request: _Request, writer: asyncio.StreamWriter) -> bool:
+        self.requests += 1
+        payload = _parse_completion_request(request.body)
+        try:
+            route = self.route(payload)
+        except Exception as exc:
+            self.errors += 1
+            raise _HTTPError(500, f"Routing failed: {exc}", "routing_error") from exc
+        await self._acquire()
+        try:
+            if payload.get("stream"):
+                return await self._stream(payload, route, request.keep_alive, writer)
+            started = time.perf_counter()
+            try:
+                result = await llm.achat_completion(
+                    payload["messages"], model=route.model, **_options(payload)
+                )
+            except Exception as exc:
+                self.errors += 1
+                self._report(route, False, time.perf_counter() - started)
+                error = _upstream_error(exc)
+                error.headers.update(route.headers())
+                raise error from exc
+            self._report(route, True, time.perf_counter() - started, result.get("usage"))
+            writer.write(
+                _json_response(
+                    200, _completion_body(result), request.keep_alive, route.headers()
+                )
+            )
+            await writer.drain()
+            return request.keep_alive
+        finally:
+            self._release()
+
+    async def _stream(
+        self,
+        payload: dict[str, Any],
+        route: _Route,
+        keep_alive: bool,
+        writer: asyncio.StreamWriter,
+    ) -> bool:
+        """Relay a streamed completion as server-sent events."""
+        options = payload.get("stream_options")
+        include_usage = isinstance(options, dict) and bool(options.get("include_usage"))
+        started = time.perf_counter()
+        stream = llm.achat_completion_stream(
+            payload["messages"], model=route.model, **_options(payload)
+        )
+        async with aclosing(stream):
+            # Wait for the first record so failures before any output still get
+            # a proper error status.
+            try:
+                record = await anext(stream)
+            except Exception as exc:
+                self.errors += 1
+                self._report(route, False, time.perf_counter() - started)
+                error = _upstream_error(exc)
+                error.headers.update(route.headers())
+                raise error from exc
+            headers = {
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "Transfer-Encoding": "chunked",
+                "Connection": "keep-alive" if keep_alive else "close",
+                **route.headers(),
+            }
+            writer.write(_head(200, headers))
+            events = _ChunkWriter(writer, route.model)
+            events.chunk({"role": "assistant", "content": ""})
+            try:
+                while record["type"] == "delta":
+                    events.chunk({"content": record["content"]})
+                    # Backpressure: the next chunk is only read from upstream
+                    # once the client has taken this one.
+                    await writer.drain()
+                    record = await anext(stream)
+            except (ConnectionError, asyncio.CancelledError):
+                # The client went away (or the proxy is closing) mid-stream.
+                self._report(route, False, time.perf_counter() - started)
+                raise
+            except Exception as exc:
+                self.errors += 1
+                self._report(route, False, time.perf_counter() - started)
+                error = _upstream_error(exc)
+                events.write(
+                    json.dumps(_error_payload(error.message, error.kind), separators=(",", ":"))
+                )
+                events.end()
+                await writer.drain()
+                return False
+        self._report(route, True, time.perf_counter() - started, record["usage"])
+        events.chunk({}, finish_reason=record["finish_reason"] or "stop")
+        if include_usage:
+            events.chunk(None, usage=record["usage"])
+        events.end()
+        await writer.drain()
+        return keep_alive
+
+
+def _load_router(args: argparse.Namespace) -> Router | None:
+    if args.index:
+        return RoutingIndex.load(args.index)
+    if args.bandit:
+        return OnlineRouter.load(args.bandit)
+    return None
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command-line entry point; serves until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    routers = parser.add_mutually_exclusive_group()
+    routers.add_argument("--index", help="directory of a saved RoutingIndex")
+    routers.add_argument("--bandit", help="file of a saved OnlineRouter")
+    parser.add_argument("--default-model", help="model used without a router")
+    parser.add_argument("--alias", default="auto")
+    parser.add_argument("--passthrough", action="store_true")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cost-weight", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    proxy = RoutingProxy(
+        _load_router(args),
+        default_model=args.default_model,
+        host=args.host,
+        port=args.port,
+        alias=args.alias,
+        passthrough=args.passthrough,
+        k=args.k,
+        cost_weight=args.cost_weight,
+        max_concurrency=args.max_concurrency,
+        max_pending=args.max_pending,
+    )
+
+    async def serve() -> None:
+        await proxy.start()
+        print(f"Serving on {proxy.base_url}", flush=True)
+        await proxy.serve_forever()
+
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve())
+    return 0
+
+
+__all__ = ["DECISION_HEADER", "MODEL_HEADER", "Router", "RoutingProxy", "main"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
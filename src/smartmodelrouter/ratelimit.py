@@ -0,0 +1,303 @@
+"""Client-side request and token rate limiting."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a rough token count of ``text`` (about four characters per token)."""
+    return max((len(text) + 3) // 4, 1)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Requests and tokens allowed per minute; ``None`` means unlimited."""
+
+    rpm: float | None = None
+    tpm: float | None = None
+
+    def __post_init__(self) -> None:
+        for name in ("rpm", "tpm"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive")
+
+
+class TokenBucket:
+    """Bucket holding up to ``per_minute`` units, refilled continuously.
+
+    The level may go negative when a request needs more than the bucket holds
+    or when a reservation is corrected upwards; later requests then wait until
+    the debt is repaid. Not thread-safe: :class:`RateLimiter` serialises
+    access.
+    """
+
+    __slots__ = ("capacity", "rate", "level", "updated", "paused_until")
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = now
+        self.paused_until = now
+
+    def _refill(self, now: float) -> None:
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.level = min(self.capacity, self.level + (now - start) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Return the seconds until ``amount`` units (at most a full bucket) are available."""
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            return 0.0
+        return max(self.paused_until - now, 0.0) + (need - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Remove ``amount`` units."""
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        """Return ``amount`` units, up to the capacity."""
+        self.level = min(self.capacity, self.level + amount)
+
+    def pause(self, now: float, delay: float) -> None:
+        """Empty the bucket and stop refilling it for ``delay`` seconds."""
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+        self.paused_until = max(self.paused_until, now + delay)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    needs: list[tuple[TokenBucket, float]] = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    wake: Callable[[], None] | None = field(default=None, compare=False)
+
+
+class Permit:
+    """Capacity reserved by :meth:`RateLimiter.acquire` for one request."""
+
+    __slots__ = ("limiter", "requests", "tokens", "reserved")
+
+    def __init__(
+        self,
+        limiter: RateLimiter | None,
+        requests: list[TokenBucket],
+        tokens: list[TokenBucket],
+        reserved: int,
+    ) -> None:
+        self.limiter = limiter
+        self.requests = requests
+        self.tokens = tokens
+        self.reserved = reserved
+
+    def settle(self, used_tokens: int | None) -> None:
+        """Correct the token buckets with the tokens the request really used.
+
+        ``None`` (usage unknown) keeps the reservation.
+        """
+        if self.limiter is None or used_tokens is None or not self.tokens:
+            return
+        delta = self.reserved - used_tokens
+        self.reserved = used_tokens
+        with self.limiter._lock:
+            for bucket in self.tokens:
+                if delta > 0:
+                    bucket.give(delta)
+                else:
+                    bucket.take(-delta)
+            self.limiter._dispatch()
+
+    def throttle(self, delay: float | None = None) -> None:
+        """Report that the provider rejected the request as rate limited.
+
+        Empties every bucket of the permit and pauses them for ``delay``
+        seconds (e.g. a ``Retry-After`` value), holding back other requests
+        to the same model and key instead of letting them fail as well.
+        """
+        if self.limiter is None:
+            return
+        with self.limiter._lock:
+            now = self.limiter._clock()
+            for bucket in (*self.requests, *self.tokens):
+                bucket.pause(now, delay or 0.0)
+
+
+_UNLIMITED = Permit(None, [], [], 0)
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, with priority admission.
+
+    Every request needs one unit from the requests-per-minute bucket and its
+    estimated tokens from the tokens-per-minute bucket of its ``(key, model)``
+    pair, and likewise from the buckets of ``key`` alone when
+    ``key_limits`` covers it. ``key`` identifies an API key or endpoint.
+    Waiting requests are admitted strictly by ``priority`` (lower first, then
+    arrival order) among those that share a bucket; requests for unrelated
+    buckets do not wait for each other. Synchronous and asynchronous callers
+    share the same buckets.
+
+    Parameters
+    ----------
+    limits:
+        :class:`RateLimit` per model.
+    default:
+        Limit for models missing from ``limits``; ``None`` leaves them
+        unlimited.
+    key_limits:
+        :class:`RateLimit` shared by every model of an API key or endpoint.
+    clock:
+        Monotonic time source in seconds.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, RateLimit] | None = None,
+        default: RateLimit | None = None,
+        key_limits: Mapping[str, RateLimit] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limits = dict(limits or {})
+        self.default = default
+        self.key_limits = dict(key_limits or {})
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._buckets: dict[tuple[Any, ...], TokenBucket] = {}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _bucket(self, scope: tuple[Any, ...], per_minute: float) -> TokenBucket:
+        bucket = self._buckets.get(scope)
+        if bucket is None:
+            bucket = self._buckets[scope] = TokenBucket(per_minute, self._clock())
+        return bucket
+
+    def _permit(self, model: str, tokens: int, key: str | None) -> Permit:
+        scopes = [(("model", key, model), self.limits.get(model, self.default))]
+        if key is not None:
+            scopes.append((("key", key), self.key_limits.get(key)))
+        requests: list[TokenBucket] = []
+        token_buckets: list[TokenBucket] = []
+        for scope, limit in scopes:
+            if limit is None:
+                continue
+            if limit.rpm is not None:
+                requests.append(self._bucket((*scope, "rpm"), limit.rpm))
+            if limit.tpm is not None:
+                token_buckets.append(self._bucket((*scope, "tpm"), limit.tpm))
+        if not requests and not token_buckets:
+            return _UNLIMITED
+        return Permit(self, requests, token_buckets, tokens)
+
+    def _enqueue(self, permit: Permit, priority: int) -> _Waiter:
+        needs = [(bucket, 1.0) for bucket in permit.requests]
+        needs += [(bucket, float(permit.reserved)) for bucket in permit.tokens]
+        waiter = _Waiter(priority, next(self._seq), needs)
+        heapq.heappush(self._waiters, waiter)
+        return waiter
+
+    def _dispatch(self) -> float | None:
+        """Admit every waiter that can go; return the seconds until the next may."""
+        now = self._clock()
+        blocked: set[int] = set()
+        delay: float | None = None
+        granted = False
+        for waiter in sorted(self._waiters):
+            ids = {id(bucket) for bucket, _ in waiter.needs}
+            if ids & blocked:
+                blocked |= ids
+                continue
+            wait = max(bucket.wait_time(amount, now) for bucket, amount in waiter.needs)
+            if wait > 0:
+                blocked |= ids
+                delay = wait if delay is None else min(delay, wait)
+                continue
+            for bucket, amount in waiter.needs:
+                bucket.take(amount)
+            waiter.granted = granted = True
+            if waiter.wake is not None:
+                waiter.wake()
+        if granted:
+            self._waiters = [waiter for waiter in self._waiters if not waiter.granted]
+            heapq.heapify(self._waiters)
+            self._cond.notify_all()
+        return delay
+
+    def _abandon(self, waiter: _Waiter, permit: Permit) -> None:
+        """Withdraw ``waiter``, returning its capacity if it was already admitted."""
+        if waiter.granted:
+            for bucket, amount in waiter.needs:
+                bucket.give(amount)
+        else:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+        self._dispatch()
+
+    def acquire(
+        self, model: str, tokens: int, key: str | None = None, priority: int = 0
+    ) -> Permit:
+        """Block until a request of ``tokens`` estimated tokens may be sent."""
+        with self._cond:
+            permit = self._permit(model, tokens, key)
+            if permit is _UNLIMITED:
+                return permit
+            waiter = self._enqueue(permit, priority)
+            try:
+                while True:
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        return permit
+                    self._cond.wait(delay)
+            except BaseException:
+                self._abandon(waiter, permit)
+                raise
+
+    async def aacquire(
+        self, model: str, tokens: int, key: str | None = None, priority: int = 0
+    ) -> Permit:
+        """Asynchronous counterpart of :meth:`acquire`."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            permit = self._permit(model, tokens, key)
+            if permit is _UNLIMITED:
+                return permit
+            waiter = self._enqueue(permit, priority)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        return permit
+                    admitted = loop.create_future()
+                    waiter.wake = lambda: loop.call_soon_threadsafe(_resolve, admitted)
+                try:
+                    await asyncio.wait_for(admitted, delay)
+                except TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                self._abandon(waiter, permit)
+            raise
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+__all__ = ["Permit", "RateLimit", "RateLimiter", "TokenBucket", "estimate_tokens"]
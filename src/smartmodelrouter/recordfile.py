@@ -0,0 +1,258 @@
+"""Streaming and random-access reading of large JSON and JSON Lines files."""
+
+from __future__ import annotations
+
+import codecs
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any, overload
+
+from .atomicfile import atomic_writer
+
+_CHUNK_SIZE = 1 << 20
+_SKIP = re.compile(r"[ \t\r\n]*").match
+_INDEX_MAGIC = b"SMRIDX01"
+# Native byte order: the index is a local cache, rebuilt whenever it does not
+# match the data file.
+_INDEX_HEADER = struct.Struct("=8sQQQ")
+
+
+def _array_spans(fh: Any, chunk_size: int) -> Iterator[tuple[int, int, Any]]:
+    """Yield ``(start, end, value)`` for each element of a JSON array."""
+    decode = json.JSONDecoder().raw_decode
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0  # cursor into ``buffer``
+    offset = 0  # byte offset of ``buffer[position]`` in the file
+    eof = False
+
+    def fill() -> bool:
+        # Drop the consumed prefix and append the next chunk. Entries larger
+        # than a chunk double the read size, so re-decoding stays linear.
+        nonlocal buffer, position, eof
+        if eof:
+            return False
+        chunk = fh.read(max(chunk_size, len(buffer) - position))
+        eof = not chunk
+        buffer = buffer[position:] + utf8.decode(chunk, final=eof)
+        position = 0
+        return True
+
+    def advance(end: int) -> None:
+        nonlocal position, offset
+        consumed = buffer[position:end]
+        offset += len(consumed) if consumed.isascii() else len(consumed.encode("utf-8"))
+        position = end
+
+    def peek() -> str:
+        # Skip whitespace and return the next character, or "" at the end.
+        while True:
+            advance(_SKIP(buffer, position).end())
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ""
+
+    if peek() != "[":
+        raise ValueError("expected a JSON array")
+    advance(position + 1)
+    if peek() == "]":
+        return
+    while True:
+        while True:
+            try:
+                value, end = decode(buffer, position)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # Only a following separator proves the value is complete: a number
+            # cut at the end of a chunk also decodes.
+            after = _SKIP(buffer, end).end()
+            if buffer[after : after + 1] in (",", "]") or not fill():
+                break
+        start = offset
+        advance(end)
+        yield start, offset, value
+        separator = peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"expected ',' or ']' at byte {offset}")
+        advance(position + 1)
+        peek()
+
+
+def _line_spans(fh: Any) -> Iterator[tuple[int, int, Any]]:
+    """Yield ``(start, end, value)`` for each non-blank line of a JSONL file."""
+    offset = 0
+    for line in fh:
+        start, offset = offset, offset + len(line)
+        stripped = line.strip()
+        if stripped:
+            yield start, start + len(line.rstrip(b"\r\n")), json.loads(stripped)
+
+
+def _spans(path: Path, chunk_size: int = _CHUNK_SIZE) -> Iterator[tuple[int, int, Any]]:
+    with path.open("rb") as fh:
+        head = fh.read(64).lstrip()
+        fh.seek(0)
+        if head.startswith(b"["):
+            yield from _array_spans(fh, chunk_size)
+        else:
+            yield from _line_spans(fh)
+
+
+def iter_records(path: str | os.PathLike[str]) -> Iterator[Any]:
+    """Yield the entries of a JSON array or JSON Lines file one at a time.
+
+    The file is read in chunks, so memory use is bounded by the largest entry
+    rather than the size of the file.
+    """
+    for _, _, value in _spans(Path(path)):
+        yield value
+
+
+def index_path(path: str | os.PathLike[str]) -> Path:
+    """Return the sidecar index file used for the records at ``path``."""
+    path = Path(path)
+    return path.with_name(f"{path.name}.idx")
+
+
+def _scan_offsets(path: Path) -> array:
+    offsets = array("Q")
+    for start, end, _ in _spans(path):
+        offsets.extend((start, end))
+    return offsets
+
+
+def build_index(
+    path: str | os.PathLike[str], index: str | os.PathLike[str] | None = None
+) -> Path:
+    """Scan ``path`` once and write the byte range of every entry to ``index``.
+
+    The index records the size and modification time of ``path``, so it is
+    rebuilt by :class:`RecordFile` when the data changes.
+    """
+    path = Path(path)
+    index = Path(index) if index is not None else index_path(path)
+    stat = path.stat()
+    offsets = _scan_offsets(path)
+    header = _INDEX_HEADER.pack(_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets) // 2)
+    with atomic_writer(index) as fh:
+        fh.write(header + offsets.tobytes())
+    return index
+
+
+class RecordFile(Sequence[dict[str, Any]]):
+    """Read-only sequence over the entries of a JSON array or JSON Lines file.
+
+    ``records[i]`` seeks straight to entry ``i`` through a memory map of the
+    file and parses only that entry, using a sidecar index of byte offsets
+    (see :func:`build_index`). The index is built on first open and whenever
+    the file's size or modification time no longer match it. If it cannot be
+    written, the offsets are kept in memory instead.
+
+    Parameters
+    ----------
+    path:
+        Data file. Files starting with ``[`` are read as one JSON array,
+        anything else as JSON Lines.
+    index:
+        Sidecar index file. Defaults to :func:`index_path`.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        index: str | os.PathLike[str] | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.index = Path(index) if index is not None else index_path(self.path)
+        stat = self.path.stat()
+        offsets = self._read_index(stat)
+        if offsets is None:
+            try:
+                build_index(self.path, self.index)
+            except OSError:
+                pass
+            offsets = self._read_index(stat)
+        if offsets is None:
+            # The index could not be written, or the file changed while it was
+            # scanned: keep the offsets in memory for this handle only.
+            offsets = memoryview(_scan_offsets(self.path))
+        self._offsets = offsets
+        self._mmap: mmap.mmap | None = None
+        if stat.st_size:
+            with self.path.open("rb") as fh:
+                self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_index(self, stat: os.stat_result) -> memoryview | None:
+        try:
+            data = self.index.read_bytes()
+        except OSError:
+            return None
+        if len(data) < _INDEX_HEADER.size:
+            return None
+        magic, size, mtime_ns, count = _INDEX_HEADER.unpack_from(data)
+        expected = _INDEX_HEADER.size + 16 * count
+        if (magic, size, mtime_ns, len(data)) != (
+            _INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, expected
+        ):
+            return None
+        return memoryview(data)[_INDEX_HEADER.size :].cast("Q")
+
+    def __len__(self) -> int:
+        return len(self._offsets) // 2
+
+    def raw(self, index: int) -> bytes:
+        """Return the undecoded bytes of entry ``index``."""
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"record index {index} out of range")
+        if self._mmap is None:
+            raise ValueError(f"{self.path} is closed")
+        return self._mmap[self._offsets[2 * index] : self._offsets[2 * index + 1]]
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[dict[str, Any]]: ...
+
+    def __getitem__(self, index: int | slice) -> dict[str, Any] | list[dict[str, Any]]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        return json.loads(self.raw(index))
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def close(self) -> None:
+        """Release the memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> RecordFile:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def is_record_file(name: str) -> bool:
+    """Return whether ``name`` is the path of an existing JSON or JSONL file."""
+    return name.endswith((".json", ".jsonl", ".ndjson")) and os.path.isfile(name)
+
+
+__all__ = ["RecordFile", "build_index", "index_path", "is_record_file", "iter_records"]
@@ -0,0 +1,247 @@
+"""Retry policies and circuit breakers for completion requests."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from json import JSONDecodeError
+
+_RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a request is rejected because its circuit breaker is open."""
+
+    def __init__(self, model: str, endpoint: str | None, retry_in: float) -> None:
+        super().__init__(
+            f"Circuit open for model {model!r} at {endpoint or 'default endpoint'}; "
+            f"retry in {retry_in:.1f}s"
+        )
+        self.model = model
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """Return the delay requested by a ``Retry-After`` header on ``exc``."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff that honours ``Retry-After``.
+
+    Attempt ``n`` (zero-based) waits ``base_delay * multiplier**n`` seconds,
+    capped at ``max_delay`` and scaled by a random factor in
+    ``[1 - jitter, 1 + jitter]``. A ``Retry-After`` (or ``retry-after-ms``)
+    header on the error raises the wait to at least the requested delay. No
+    retry is scheduled if it would end after ``deadline`` seconds from the
+    first attempt.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 30.0
+    jitter: float = 0.1
+    deadline: float | None = None
+    retry_statuses: frozenset[int] = field(default=_RETRYABLE_STATUS)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        """Return whether ``exc`` is a transient failure worth retrying."""
+        # Imported here so that importing this module stays cheap.
+        import httpx
+        from openai import APIConnectionError, APIStatusError
+
+        if isinstance(exc, APIStatusError):
+            return exc.status_code in self.retry_statuses
+        return isinstance(exc, (JSONDecodeError, httpx.HTTPError, APIConnectionError))
+
+    def next_delay(
+        self, attempt: int, exc: BaseException | None, started: float
+    ) -> float | None:
+        """Return the wait before retrying after failed ``attempt``, or ``None``.
+
+        ``started`` is the :func:`time.monotonic` timestamp of the first
+        attempt. ``None`` means the request should not be retried.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = min(self.base_delay * self.multiplier**attempt, self.max_delay)
+        if self.jitter:
+            delay *= random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        if exc is not None:
+            requested = _retry_after(exc)
+            if requested is not None:
+                delay = max(delay, requested)
+        if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive failures and
+    rejects calls for ``recovery_timeout`` seconds. It then lets up to
+    ``half_open_max_calls`` trial calls through: a success closes it again and
+    a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    @property
+    def state(self) -> str:
+        """Return the current state, moving from open to half-open if due."""
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._trials = 0
+
+    def retry_in(self) -> float:
+        """Return the seconds until an open breaker admits a trial call."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.recovery_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed, reserving a half-open trial."""
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        """Return a half-open trial reserved by :meth:`allow` but never used."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trials = 0
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trials = 0
+
+
+class BreakerRegistry:
+    """Circuit breakers keyed by ``(model, endpoint)``.
+
+    ``fallbacks`` maps a model to the model that should receive its traffic
+    while its breaker is open.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        fallbacks: dict[str, str] | None = None,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.fallbacks = dict(fallbacks or {})
+        self._lock = threading.Lock()
+        self._breakers: dict[tuple[str, str | None], CircuitBreaker] = {}
+
+    def get(self, model: str, endpoint: str | None = None) -> CircuitBreaker:
+        """Return the breaker for ``model`` at ``endpoint``, creating it if needed."""
+        key = (model, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    key,
+                    CircuitBreaker(
+                        self.failure_threshold,
+                        self.recovery_timeout,
+                        self.half_open_max_calls,
+                    ),
+                )
+        return breaker
+
+    def select(self, model: str, endpoint: str | None = None) -> tuple[str, CircuitBreaker]:
+        """Return the first model in ``model``'s fallback chain that is available.
+
+        Raises :class:`CircuitOpenError` when every breaker in the chain is open.
+        """
+        seen: set[str] = set()
+        current: str | None = model
+        while current is not None and current not in seen:
+            seen.add(current)
+            breaker = self.get(current, endpoint)
+            if breaker.allow():
+                return current, breaker
+            current = self.fallbacks.get(current)
+        raise CircuitOpenError(model, endpoint, self.get(model, endpoint).retry_in())
+
+    def reset(self) -> None:
+        """Forget every breaker."""
+        with self._lock:
+            self._breakers.clear()
+
+
+__all__ = ["BreakerRegistry", "CircuitBreaker", "CircuitOpenError", "RetryPolicy"]
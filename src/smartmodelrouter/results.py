@@ -0,0 +1,213 @@
+"""Append-only, resumable storage of evaluation run results."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+RunKey = tuple[str, str, int, int]
+"""``(model, dataset, index, run)`` identifying one evaluation run."""
+
+_FIELDS = ("model", "dataset", "index", "run", "message", "usage", "latency", "correct")
+
+
+def run_key(record: dict[str, Any]) -> RunKey:
+    """Return the :data:`RunKey` of a run ``record``."""
+    return (record["model"], record["dataset"], int(record["index"]), int(record["run"]))
+
+
+class ResultSink:
+    """JSON Lines checkpoint of completed evaluation runs.
+
+    Each run is appended as one line as soon as it finishes and flushed, so a
+    crashed sweep loses at most the run being written. Opening an existing file
+    indexes the byte offset of every run without keeping the records in memory;
+    a truncated final line left by a crash is discarded.
+
+    Pass a sink to :func:`~smartmodelrouter.benchmark.evaluate_model`,
+    :func:`~smartmodelrouter.benchmark.aevaluate_model`,
+    :func:`~smartmodelrouter.benchmark.iter_suite` or
+    :func:`~smartmodelrouter.benchmark.evaluate_suite` to persist their runs
+    and skip the runs already recorded.
+
+    Parameters
+    ----------
+    path:
+        JSONL file; created if missing.
+    fsync:
+        Also ``fsync`` after every run, surviving power loss at the cost of
+        throughput.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], fsync: bool = False) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._offsets: dict[RunKey, int] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+        self._scan()
+        self._writer = self.path.open("ab")
+        self._reader = self.path.open("rb")
+
+    def _scan(self) -> None:
+        offset = 0
+        valid_end = 0
+        with self.path.open("rb") as fh:
+            for line in fh:
+                start, offset = offset, offset + len(line)
+                if not line.endswith(b"\n"):
+                    break  # partial write from a crash
+                valid_end = offset
+                try:
+                    record = json.loads(line)
+                    self._offsets[run_key(record)] = start
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if valid_end < offset:
+            with self.path.open("r+b") as fh:
+                fh.truncate(valid_end)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, key: RunKey) -> bool:
+        return key in self._offsets
+
+    def completed(self) -> set[RunKey]:
+        """Return the keys of every recorded run."""
+        with self._lock:
+            return set(self._offsets)
+
+    def get(self, key: RunKey) -> dict[str, Any] | None:
+        """Return the recorded run for ``key``, or ``None``."""
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                return None
+            self._writer.flush()
+            self._reader.seek(offset)
+            return json.loads(self._reader.readline())
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Append one run ``record`` and flush it to disk."""
+        line = json.dumps(
+            {field: record.get(field) for field in _FIELDS},
+            separators=(",", ":"),
+            default=str,
+        ).encode("utf-8") + b"\n"
+        key = run_key(record)
+        with self._lock:
+            offset = self._writer.seek(0, os.SEEK_END)
+            self._writer.write(line)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            self._offsets[key] = offset
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        """Yield the latest record of every run, streaming from disk."""
+        with self._lock:
+            self._writer.flush()
+            offsets = sorted(self._offsets.values())
+        with self.path.open("rb") as fh:
+            for offset in offsets:
+                fh.seek(offset)
+                yield json.loads(fh.readline())
+
+    def to_arrow(self) -> Any:
+        """Return the recorded runs as a :class:`pyarrow.Table`.
+
+        Token counts are split into ``prompt_tokens``, ``completion_tokens``
+        and ``total_tokens`` columns; the full ``usage`` mapping is kept as a
+        JSON string. Requires the ``parquet`` extra.
+        """
+        pa = _pyarrow()
+        return pa.Table.from_pylist(
+            [_columnar(record) for record in self.records()], schema=_schema(pa)
+        )
+
+    def to_parquet(self, path: str | os.PathLike[str], batch_size: int = 10_000) -> None:
+        """Write the recorded runs to a Parquet file in batches.
+
+        Requires the ``parquet`` extra.
+        """
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+
+        schema = _schema(pa)
+        with pq.ParquetWriter(str(path), schema) as writer:
+            batch: list[dict[str, Any]] = []
+            for record in self.records():
+                batch.append(_columnar(record))
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch or not len(self):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+    def close(self) -> None:
+        """Close the underlying files."""
+        with self._lock:
+            self._writer.close()
+            self._reader.close()
+
+    def __enter__(self) -> ResultSink:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError(
+            "pyarrow is required for Arrow/Parquet export; "
+            "install smartmodelrouter[parquet]"
+        ) from exc
+    return pyarrow
+
+
+def _schema(pa: Any) -> Any:
+    return pa.schema(
+        [
+            ("model", pa.string()),
+            ("dataset", pa.string()),
+            ("index", pa.int64()),
+            ("run", pa.int64()),
+            ("message", pa.string()),
+            ("correct", pa.bool_()),
+            ("latency", pa.float64()),
+            ("prompt_tokens", pa.int64()),
+            ("completion_tokens", pa.int64()),
+            ("total_tokens", pa.int64()),
+            ("usage", pa.string()),
+        ]
+    )
+
+
+def _columnar(record: dict[str, Any]) -> dict[str, Any]:
+    usage = record.get("usage")
+    tokens = usage if isinstance(usage, dict) else {}
+    return {
+        "model": record["model"],
+        "dataset": record["dataset"],
+        "index": record["index"],
+        "run": record["run"],
+        "message": record.get("message"),
+        "correct": record.get("correct"),
+        "latency": record.get("latency"),
+        "prompt_tokens": tokens.get("prompt_tokens"),
+        "completion_tokens": tokens.get("completion_tokens"),
+        "total_tokens": tokens.get("total_tokens"),
+        "usage": json.dumps(usage) if usage is not None else None,
+    }
+
+
+__all__ = ["ResultSink", "RunKey", "run_key"]
@@ -0,0 +1,337 @@
+"""Nearest-neighbour routing over benchmark problem embeddings."""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .embeddings import embed_dataset, embed_texts
+
+if TYPE_CHECKING:
+    from .embedding_store import EmbeddingStore
+
+_FORMAT_VERSION = 1
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return ``matrix`` as a contiguous float32 array with unit-length rows."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _code_weights(n_bits: int) -> np.ndarray:
+    return np.left_shift(np.uint64(1), np.arange(n_bits, dtype=np.uint64))
+
+
+def _hash_vectors(planes: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Return the ``(n_tables, n_vectors)`` bucket codes of ``vectors``."""
+    bits = np.einsum("tbd,nd->tnb", planes, vectors) > 0
+    return bits.astype(np.uint64) @ _code_weights(planes.shape[1])
+
+
+class _LSHTables:
+    """Random-projection LSH over unit vectors for approximate cosine search."""
+
+    def __init__(self, planes: np.ndarray, codes: np.ndarray) -> None:
+        # planes: (n_tables, n_bits, dim); codes: (n_tables, n_rows)
+        self.planes = planes
+        self.codes = codes
+        self._buckets = [self._group(table) for table in codes]
+
+    @classmethod
+    def build(
+        cls, embeddings: np.ndarray, n_bits: int, n_tables: int, seed: int
+    ) -> _LSHTables:
+        if not 1 <= n_bits <= 63:
+            raise ValueError("n_bits must be between 1 and 63")
+        if n_tables < 1:
+            raise ValueError("n_tables must be at least 1")
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_tables, n_bits, embeddings.shape[1])).astype(
+            np.float32
+        )
+        return cls(planes, _hash_vectors(planes, embeddings))
+
+    @staticmethod
+    def _group(codes: np.ndarray) -> dict[int, np.ndarray]:
+        order = np.argsort(codes, kind="stable")
+        unique, starts = np.unique(codes[order], return_index=True)
+        return {
+            int(code): rows
+            for code, rows in zip(unique, np.split(order, starts[1:]))
+        }
+
+    def candidates(self, vector: np.ndarray) -> np.ndarray:
+        """Return the rows sharing a bucket with ``vector`` in any table."""
+        codes = _hash_vectors(self.planes, vector[None, :])[:, 0]
+        hits = [
+            self._buckets[table].get(int(code))
+            for table, code in enumerate(codes)
+        ]
+        hits = [rows for rows in hits if rows is not None]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
+
+
+class RoutingIndex:
+    """Index of benchmark problems joined with per-model accuracy and cost.
+
+    Each row holds one problem's embedding together with every model's measured
+    accuracy and cost on that problem. :meth:`route` embeds a new prompt, finds
+    the ``k`` most similar problems by cosine similarity and picks the model
+    with the best similarity-weighted score.
+
+    Parameters
+    ----------
+    embeddings:
+        ``(n_problems, dim)`` matrix of problem embeddings.
+    models:
+        Model identifiers, one per column of ``accuracy`` and ``cost``.
+    accuracy:
+        ``(n_problems, n_models)`` matrix of accuracies in ``[0, 1]``. ``NaN``
+        marks a model that was not evaluated on a problem.
+    cost:
+        Optional ``(n_problems, n_models)`` matrix of costs per request.
+        Defaults to zeros.
+    keys:
+        Optional identifier for each row, e.g. ``"math/0"``.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        models: Sequence[str],
+        accuracy: np.ndarray,
+        cost: np.ndarray | None = None,
+        keys: Sequence[str] | None = None,
+    ) -> None:
+        self.embeddings = _normalize_rows(embeddings)
+        self.models = list(models)
+        self.accuracy = np.ascontiguousarray(accuracy, dtype=np.float32)
+        if cost is None:
+            cost = np.zeros_like(self.accuracy)
+        self.cost = np.ascontiguousarray(cost, dtype=np.float32)
+        self.keys = list(keys) if keys is not None else [str(i) for i in range(len(self))]
+        expected = (self.embeddings.shape[0], len(self.models))
+        if self.accuracy.shape != expected or self.cost.shape != expected:
+            raise ValueError(
+                f"accuracy and cost must have shape {expected}, got "
+                f"{self.accuracy.shape} and {self.cost.shape}"
+            )
+        if len(self.keys) != expected[0]:
+            raise ValueError("keys must have one entry per embedding row")
+        self._lsh: _LSHTables | None = None
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @classmethod
+    def from_suite(
+        cls,
+        suite: Mapping[str, Any],
+        model_costs: Mapping[str, float] | None = None,
+        store: EmbeddingStore | None = None,
+    ) -> RoutingIndex:
+        """Build an index from the return value of :func:`evaluate_suite`.
+
+        Problems are embedded with :func:`embed_dataset`, reusing and extending
+        ``store`` when given. ``model_costs`` gives an optional cost per
+        request for each model.
+        """
+        results = suite["results"]
+        models = list(results)
+        problems = sorted(
+            {
+                (dataset, index)
+                for per_dataset in results.values()
+                for dataset, per_index in per_dataset.items()
+                for index in per_index
+            }
+        )
+        row_of = {problem: row for row, problem in enumerate(problems)}
+        accuracy = np.full((len(problems), len(models)), np.nan, dtype=np.float32)
+        for column, model in enumerate(models):
+            for dataset, per_index in results[model].items():
+                for index, result in per_index.items():
+                    if result["runs"]:
+                        accuracy[row_of[(dataset, index)], column] = (
+                            result["correct"] / result["runs"]
+                        )
+
+        cost = np.zeros_like(accuracy)
+        if model_costs:
+            for column, model in enumerate(models):
+                cost[:, column] = model_costs.get(model, 0.0)
+
+        by_dataset: dict[str, list[int]] = {}
+        for dataset, index in problems:
+            by_dataset.setdefault(dataset, []).append(index)
+        blocks = [
+            embed_dataset(dataset, indices=indices, dtype=np.float32, store=store)
+            for dataset, indices in by_dataset.items()
+        ]
+        # ``problems`` is sorted by dataset, so the blocks stack in row order.
+        embeddings = np.vstack(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+
+        keys = [f"{dataset}/{index}" for dataset, index in problems]
+        return cls(embeddings, models, accuracy, cost, keys)
+
+    def enable_lsh(self, n_bits: int = 16, n_tables: int = 8, seed: int = 0) -> None:
+        """Enable approximate search with random-projection LSH.
+
+        Useful for indexes with millions of rows. Queries whose buckets contain
+        fewer than ``k`` rows fall back to the exact search.
+        """
+        self._lsh = _LSHTables.build(self.embeddings, n_bits, n_tables, seed)
+
+    def disable_lsh(self) -> None:
+        """Return to exact search."""
+        self._lsh = None
+
+    def nearest(
+        self, embedding: np.ndarray, k: int = 10, approximate: bool | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the rows and cosine similarities of the ``k`` nearest problems.
+
+        Results are sorted by decreasing similarity. ``approximate`` defaults to
+        whether LSH has been enabled.
+        """
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        use_lsh = self._lsh is not None if approximate is None else approximate
+        if use_lsh:
+            if self._lsh is None:
+                raise RuntimeError("Approximate search requires enable_lsh()")
+            rows = self._lsh.candidates(query)
+            if rows.size >= k:
+                sims = self.embeddings[rows] @ query
+                top = np.argpartition(-sims, k - 1)[:k]
+                order = top[np.argsort(-sims[top])]
+                return rows[order], sims[order]
+
+        sims = self.embeddings @ query
+        top = np.argpartition(-sims, k - 1)[:k]
+        order = top[np.argsort(-sims[top])]
+        return order, sims[order]
+
+    def scores(
+        self,
+        embedding: np.ndarray,
+        k: int = 10,
+        cost_weight: float = 0.0,
+        approximate: bool | None = None,
+    ) -> dict[str, float]:
+        """Return each model's similarity-weighted score for ``embedding``.
+
+        The score is the weighted mean accuracy over the ``k`` nearest problems
+        minus ``cost_weight`` times the weighted mean cost. Similarities are
+        clipped at zero and missing accuracies are ignored.
+        """
+        rows, sims = self.nearest(embedding, k=k, approximate=approximate)
+        weights = np.clip(sims, 0.0, None)
+        if not weights.any():
+            weights = np.ones_like(sims)
+        accuracy = self.accuracy[rows]
+        observed = ~np.isnan(accuracy)
+        mask = weights[:, None] * observed
+        totals = mask.sum(axis=0)
+        totals[totals == 0] = np.nan
+        mean_accuracy = (np.nan_to_num(accuracy) * mask).sum(axis=0) / totals
+        mean_cost = (self.cost[rows] * mask).sum(axis=0) / totals
+        score = mean_accuracy - cost_weight * mean_cost
+        return {
+            model: float(value)
+            for model, value in zip(self.models, score)
+            if not np.isnan(value)
+        }
+
+    def route_embedding(
+        self,
+        embedding: np.ndarray,
+        k: int = 10,
+        cost_weight: float = 0.0,
+        approximate: bool | None = None,
+    ) -> str:
+        """Return the best model for a pre-computed prompt embedding."""
+        scores = self.scores(
+            embedding, k=k, cost_weight=cost_weight, approximate=approximate
+        )
+        if not scores:
+            raise RuntimeError("No evaluated models among the nearest problems")
+        return max(scores, key=scores.__getitem__)
+
+    def route(
+        self,
+        prompt: str,
+        k: int = 10,
+        cost_weight: float = 0.0,
+        approximate: bool | None = None,
+    ) -> str:
+        """Return the best model for ``prompt``."""
+        embedding = embed_texts([prompt], dtype=np.float32)[0]
+        return self.route_embedding(
+            embedding, k=k, cost_weight=cost_weight, approximate=approximate
+        )
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the index to directory ``path`` as ``.npy`` arrays and metadata."""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "embeddings.npy", self.embeddings)
+        np.save(directory / "accuracy.npy", self.accuracy)
+        np.save(directory / "cost.npy", self.cost)
+        meta: dict[str, Any] = {
+            "version": _FORMAT_VERSION,
+            "models": self.models,
+            "keys": self.keys,
+            "lsh": self._lsh is not None,
+        }
+        if self._lsh is not None:
+            np.save(directory / "lsh_planes.npy", self._lsh.planes)
+            np.save(directory / "lsh_codes.npy", self._lsh.codes)
+        with (directory / "meta.json").open("w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str], mmap: bool = True) -> RoutingIndex:
+        """Load an index written by :meth:`save`.
+
+        With ``mmap`` the arrays are memory-mapped read-only, so loading is
+        near-instant and pages are shared between processes.
+        """
+        directory = Path(path)
+        with (directory / "meta.json").open("r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != _FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported routing index version: {meta.get('version')!r}")
+        mmap_mode = "r" if mmap else None
+        index = cls.__new__(cls)
+        index.embeddings = np.load(directory / "embeddings.npy", mmap_mode=mmap_mode)
+        index.accuracy = np.load(directory / "accuracy.npy", mmap_mode=mmap_mode)
+        index.cost = np.load(directory / "cost.npy", mmap_mode=mmap_mode)
+        index.models = list(meta["models"])
+        index.keys = list(meta["keys"])
+        index._lsh = None
+        if meta.get("lsh"):
+            index._lsh = _LSHTables(
+                np.load(directory / "lsh_planes.npy"),
+                np.load(directory / "lsh_codes.npy"),
+            )
+        return index
+
+
+__all__ = ["RoutingIndex"]
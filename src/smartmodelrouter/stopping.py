@@ -0,0 +1,112 @@
+"""Sequential stopping rules for repeated evaluation runs."""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Literal
+
+
+def wilson_interval(correct: int, runs: int, confidence: float = 0.95) -> tuple[float, float]:
+    """Return the Wilson score interval for ``correct`` successes in ``runs``."""
+    if runs == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = correct / runs
+    denominator = 1 + z * z / runs
+    center = (p + z * z / (2 * runs)) / denominator
+    half = z * math.sqrt(p * (1 - p) / runs + z * z / (4 * runs * runs)) / denominator
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+def sprt_log_likelihood_ratio(correct: int, runs: int, p0: float, p1: float) -> float:
+    """Return the log-likelihood ratio of accuracy ``p1`` against ``p0``."""
+    return correct * math.log(p1 / p0) + (runs - correct) * math.log((1 - p1) / (1 - p0))
+
+
+@dataclass
+class EarlyStopping:
+    """When to stop sampling a problem before all requested runs are made.
+
+    Two independent checks run after every run:
+
+    * **Identical responses.** If the first ``identical_runs`` responses are
+      all the same, the remaining runs are assumed to repeat them (typical at
+      ``temperature=0``) and are not requested.
+    * **Settled estimate.** Once ``min_runs`` runs are done, with
+      ``method="wilson"`` sampling stops when the Wilson interval of the
+      accuracy at ``confidence`` is at most ``max_width`` wide. With
+      ``method="sprt"`` a sequential probability ratio test of accuracy
+      ``target - margin`` against ``target + margin`` stops as soon as either
+      is accepted at error rates ``alpha`` / ``beta``.
+
+    Attributes
+    ----------
+    min_runs:
+        Runs made before the estimate is considered settled.
+    identical_runs:
+        Number of identical leading responses that collapse the rest; ``None``
+        disables the check.
+    method:
+        ``"wilson"``, ``"sprt"`` or ``None`` to rely on identical responses
+        only.
+    """
+
+    min_runs: int = 3
+    identical_runs: int | None = 3
+    method: Literal["wilson", "sprt"] | None = "wilson"
+    confidence: float = 0.95
+    max_width: float = 0.3
+    target: float = 0.5
+    margin: float = 0.1
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    def __post_init__(self) -> None:
+        if self.min_runs < 1:
+            raise ValueError("min_runs must be at least 1")
+        if self.identical_runs is not None and self.identical_runs < 2:
+            raise ValueError("identical_runs must be at least 2")
+        if self.method not in {"wilson", "sprt", None}:
+            raise ValueError("method must be 'wilson', 'sprt' or None")
+
+    @property
+    def first_check(self) -> int:
+        """Number of runs after which a check can first fire."""
+        if self.identical_runs is None:
+            return self.min_runs
+        return min(self.min_runs, self.identical_runs)
+
+    def check(self, responses: Sequence[str], correct: int) -> str | None:
+        """Return why sampling should stop after ``responses``, or ``None``.
+
+        ``correct`` is the number of correct ``responses``. The reason is
+        ``"identical"``, ``"wilson"`` or ``"sprt"``.
+        """
+        runs = len(responses)
+        if (
+            self.identical_runs is not None
+            and runs == self.identical_runs
+            and len(set(responses)) == 1
+        ):
+            return "identical"
+        if runs < self.min_runs:
+            return None
+        if self.method == "wilson":
+            low, high = wilson_interval(correct, runs, self.confidence)
+            if high - low <= self.max_width:
+                return "wilson"
+        elif self.method == "sprt":
+            p0 = min(max(self.target - self.margin, 1e-6), 1 - 1e-6)
+            p1 = min(max(self.target + self.margin, 1e-6), 1 - 1e-6)
+            ratio = sprt_log_likelihood_ratio(correct, runs, p0, p1)
+            if ratio >= math.log((1 - self.beta) / self.alpha) or ratio <= math.log(
+                self.beta / (1 - self.alpha)
+            ):
+                return "sprt"
+        return None
+
+
+__all__ = ["EarlyStopping", "sprt_log_likelihood_ratio", "wilson_interval"]
@@ -0,0 +1,468 @@
+"""Durable work queue for running evaluations across processes and hosts.
+
+Every ``(model, dataset, index, run)`` of a sweep becomes a task in a SQLite
+database. Workers, in any number of processes on one machine or on several
+machines sharing the file, claim tasks under a lease, run them and store
+their records. A task whose lease expires, e.g. because its worker crashed,
+is handed to the next worker that asks. :func:`collect_suite` merges the
+stored records into the result of :func:`~smartmodelrouter.benchmark.evaluate_suite`.
+
+Run workers on other hosts with::
+
+    python -m smartmodelrouter.workqueue /shared/queue.sqlite --processes 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from . import benchmark as _benchmark
+from .datasets import _get_entry
+from .results import RunKey
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue:
+    """SQLite-backed queue of evaluation runs with leases.
+
+    Leases are compared against the wall clock, so hosts sharing a queue need
+    synchronised clocks, and the file system must support the POSIX locks
+    SQLite relies on.
+
+    Parameters
+    ----------
+    path:
+        Database file; created if missing.
+    max_attempts:
+        Failed attempts after which a task is marked ``failed`` instead of
+        being re-queued.
+    timeout:
+        Seconds to wait for another process's write lock.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        max_attempts: int = 3,
+        timeout: float = 30.0,
+    ) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path), timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " model TEXT NOT NULL,"
+            " dataset TEXT NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " run INTEGER NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " record TEXT,"
+            " PRIMARY KEY (model, dataset, idx, run))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> WorkQueue:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def enqueue(self, keys: Iterable[RunKey]) -> int:
+        """Add tasks for ``keys`` and return how many were new."""
+        rows = [(model, dataset, int(index), int(run)) for model, dataset, index, run in keys]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO tasks (model, dataset, idx, run) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def claim(self, worker: str, limit: int = 1, lease: float = 300.0) -> list[RunKey]:
+        """Lease up to ``limit`` tasks to ``worker`` for ``lease`` seconds.
+
+        Pending tasks are handed out first, then tasks whose lease expired.
+        A task whose lease expired ``max_attempts`` times, e.g. because it
+        crashes every worker that runs it, is marked ``failed`` instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE tasks SET state = 'failed', error = 'lease expired'"
+                    " WHERE state = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                    (now, self.max_attempts),
+                )
+                rows = self._db.execute(
+                    "SELECT model, dataset, idx, run FROM tasks"
+                    " WHERE state = 'pending' OR (state = 'leased' AND lease_expires <= ?)"
+                    " ORDER BY state = 'leased', rowid LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE tasks SET state = 'leased', worker = ?, lease_expires = ?,"
+                    " attempts = attempts + 1"
+                    " WHERE model = ? AND dataset = ? AND idx = ? AND run = ?",
+                    [(worker, now + lease, *row) for row in rows],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return [tuple(row) for row in rows]
+
+    def renew(self, worker: str, lease: float = 300.0) -> int:
+        """Extend every lease held by ``worker`` and return how many there are."""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE worker = ? AND state = 'leased'",
+                (time.time() + lease, worker),
+            ).rowcount
+
+    def complete(self, key: RunKey, record: Mapping[str, Any]) -> bool:
+        """Store the ``record`` of a task; ``False`` if it was already done."""
+        with self._lock:
+            return bool(
+                self._db.execute(
+                    "UPDATE tasks SET state = 'done', record = ?, lease_expires = NULL,"
+                    " error = NULL"
+                    " WHERE model = ? AND dataset = ? AND idx = ? AND run = ?"
+                    " AND state != 'done'",
+                    (json.dumps(record, default=str), *key),
+                ).rowcount
+            )
+
+    def fail(self, key: RunKey, error: str) -> None:
+        """Release a task after a failed attempt.
+
+        It is re-queued unless it has been attempted ``max_attempts`` times.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET error = ?, lease_expires = NULL,"
+                " state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+                " WHERE model = ? AND dataset = ? AND idx = ? AND run = ?"
+                " AND state = 'leased'",
+                (error, self.max_attempts, *key),
+            )
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of tasks in each state."""
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state")
+            counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+            counts.update(rows.fetchall())
+        return counts
+
+    def finished(self) -> bool:
+        """Return whether no task is pending or leased."""
+        counts = self.counts()
+        return not counts[PENDING] and not counts[LEASED]
+
+    def failures(self) -> list[tuple[RunKey, str]]:
+        """Return the key and last error of every failed task."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT model, dataset, idx, run, error FROM tasks WHERE state = 'failed'"
+            ).fetchall()
+        return [(tuple(row[:4]), row[4]) for row in rows]
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        """Yield the record of every completed task."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT record FROM tasks WHERE state = 'done' ORDER BY rowid"
+            ).fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+
+def enqueue_suite(
+    queue: WorkQueue,
+    models: Sequence[str],
+    datasets: Sequence[str],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None = None,
+    runs: int = 10,
+) -> int:
+    """Add every run of a :func:`~smartmodelrouter.benchmark.evaluate_suite` sweep.
+
+    ``indices`` selects problems as for
+    :func:`~smartmodelrouter.benchmark.iter_suite`. Returns the number of new
+    tasks; runs already in the queue are kept as they are.
+    """
+    keys = []
+    for dataset in datasets:
+        questions = _benchmark._load_dataset(dataset)
+        for index in _benchmark._resolve_indices(dataset, questions, indices):
+            _get_entry(questions, dataset, index)
+            keys.extend(
+                (model, dataset, index, run) for model in models for run in range(runs)
+            )
+    return queue.enqueue(keys)
+
+
+def _run_task(key: RunKey) -> dict[str, Any]:
+    model, dataset, index, run = key
+    entry = _get_entry(_benchmark._load_dataset(dataset), dataset, index)
+    started = time.perf_counter()
+    result = _benchmark.chat_completion(
+        entry["question"], model=model, max_tokens=1024, temperature=0
+    )
+    latency = time.perf_counter() - started
+    return _benchmark._run_record(model, dataset, index, run, entry, result, latency)
+
+
+def run_worker(
+    path: str | os.PathLike[str],
+    worker: str | None = None,
+    threads: int = 4,
+    lease: float = 300.0,
+    poll_interval: float = 1.0,
+    max_attempts: int = 3,
+) -> int:
+    """Claim and run tasks from the queue at ``path`` until none are left.
+
+    ``threads`` tasks run at a time. Leases of running tasks are renewed every
+    ``lease / 3`` seconds; a worker that dies stops renewing, so its tasks are
+    handed out again once ``lease`` seconds have passed. While other workers
+    hold the remaining tasks, the worker polls every ``poll_interval`` seconds
+    in case their leases expire.
+
+    Returns
+    -------
+    int
+        Number of tasks this worker completed.
+    """
+    if threads < 1:
+        raise ValueError("threads must be at least 1")
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    queue = WorkQueue(path, max_attempts=max_attempts)
+    stop = threading.Event()
+    completed = 0
+    count_lock = threading.Lock()
+
+    def heartbeat() -> None:
+        while not stop.wait(lease / 3):
+            queue.renew(worker, lease)
+
+    def loop() -> None:
+        nonlocal completed
+        while not stop.is_set():
+            keys = queue.claim(worker, 1, lease)
+            if not keys:
+                if queue.finished():
+                    return
+                time.sleep(poll_interval)
+                continue
+            key = keys[0]
+            try:
+                record = _run_task(key)
+            except Exception as exc:
+                queue.fail(key, f"{type(exc).__name__}: {exc}")
+                continue
+            if queue.complete(key, record):
+                with count_lock:
+                    completed += 1
+
+    renewer = threading.Thread(target=heartbeat, daemon=True)
+    renewer.start()
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    try:
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    finally:
+        stop.set()
+        renewer.join()
+        queue.close()
+    return completed
+
+
+def collect_suite(
+    queue: WorkQueue,
+    models: Sequence[str] | None = None,
+    runs: int | None = None,
+    datasets: Sequence[str] | None = None,
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None = None,
+) -> dict[str, Any]:
+    """Merge the completed tasks into the result of ``evaluate_suite``.
+
+    ``models`` and ``runs`` default to every model in the queue and to the
+    highest run number plus one. Only records of ``models``, of ``datasets``
+    (default: all), of the problems selected by ``indices`` (as for
+    :func:`~smartmodelrouter.benchmark.iter_suite`; default: all) and of runs
+    below ``runs`` are merged, so a queue shared with other sweeps can be
+    collected. Runs that have not completed are reported as ``None``
+    responses, and ``calls`` counts the completed ones.
+    """
+    records = list(queue.records())
+    if models is None:
+        models = list(dict.fromkeys(record["model"] for record in records))
+    if runs is None:
+        runs = max((record["run"] for record in records), default=-1) + 1
+    wanted = set(models)
+
+    def selected(record: dict[str, Any]) -> bool:
+        dataset = record["dataset"]
+        if datasets is not None and dataset not in datasets:
+            return False
+        problems = indices.get(dataset) if isinstance(indices, Mapping) else indices
+        if problems is not None and record["index"] not in problems:
+            return False
+        return record["model"] in wanted and 0 <= record["run"] < runs
+
+    outcomes = ((record, True) for record in records if selected(record))
+    return _benchmark._summarize_suite(models, outcomes, runs)
+
+
+def evaluate_distributed(
+    path: str | os.PathLike[str],
+    models: Sequence[str],
+    datasets: Sequence[str],
+    indices: Sequence[int] | Mapping[str, Sequence[int]] | None = None,
+    runs: int = 10,
+    processes: int = 4,
+    threads: int = 4,
+    lease: float = 300.0,
+    max_attempts: int = 3,
+) -> dict[str, Any]:
+    """Run a sweep through the queue at ``path`` with local worker processes.
+
+    The runs are enqueued, ``processes`` workers (:func:`run_worker`) run
+    them, and the result has the shape of
+    :func:`~smartmodelrouter.benchmark.evaluate_suite`. Workers started on
+    other hosts against the same file share the work. Re-running with an
+    existing queue only runs the tasks that are not done yet.
+
+    The workers are spawned, not forked: they do not inherit the client
+    configuration set with :func:`~smartmodelrouter.llm.reload_config`, the
+    provider registry, response cache, retry policy or rate limiter installed
+    in this process, and configure their clients from the environment
+    instead.
+
+    Raises
+    ------
+    RuntimeError
+        If any run failed ``max_attempts`` times, a worker process exited
+        with an error, or tasks are left unfinished, e.g. held by workers
+        on other hosts.
+    """
+    with WorkQueue(path, max_attempts=max_attempts) as queue:
+        enqueue_suite(queue, models, datasets, indices, runs)
+    _run_processes(path, processes, threads, lease, max_attempts)
+    with WorkQueue(path, max_attempts=max_attempts) as queue:
+        if not queue.finished():
+            counts = queue.counts()
+            raise RuntimeError(
+                f"Queue {path} is not finished: {counts[PENDING]} pending, "
+                f"{counts[LEASED]} leased"
+            )
+        failures = queue.failures()
+        if failures:
+            (model, dataset, index, run), error = failures[0]
+            raise RuntimeError(
+                f"{len(failures)} runs failed, e.g. run {run} of {model} on "
+                f"{dataset}/{index}: {error}"
+            )
+        return collect_suite(queue, models, runs, datasets, indices)
+
+
+def _run_processes(
+    path: str | os.PathLike[str],
+    processes: int,
+    threads: int,
+    lease: float,
+    max_attempts: int,
+) -> None:
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=run_worker,
+            kwargs={
+                "path": str(path),
+                "threads": threads,
+                "lease": lease,
+                "max_attempts": max_attempts,
+            },
+        )
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    exitcodes = [process.exitcode for process in workers if process.exitcode]
+    if exitcodes:
+        raise RuntimeError(
+            f"{len(exitcodes)} of {len(workers)} worker processes failed "
+            f"(exit codes {exitcodes})"
+        )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command-line entry point: run workers against a queue file."""
+    parser = argparse.ArgumentParser(description="Run evaluation workers on a work queue.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--lease", type=float, default=300.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.processes == 1:
+        run_worker(
+            args.path, threads=args.threads, lease=args.lease, max_attempts=args.max_attempts
+        )
+    else:
+        _run_processes(args.path, args.processes, args.threads, args.lease, args.max_attempts)
+    with WorkQueue(args.path) as queue:
+        print(json.dumps(queue.counts()))
+    return 0
+
+
+__all__ = [
+    "WorkQueue",
+    "collect_suite",
+    "enqueue_suite",
+    "evaluate_distributed",
+    "run_worker",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+import pytest
+
+from smartmodelrouter.datasets import reset_dataset_cache_config
+from smartmodelrouter.llm import configure_circuit_breakers
+
+
+@pytest.fixture(autouse=True)
+def isolated_dataset_cache(monkeypatch, tmp_path):
+    """Keep every test's dataset cache in memory and on disk separate."""
+    monkeypatch.setenv("SMARTMODELROUTER_CACHE_DIR", str(tmp_path / "dataset-cache"))
+    monkeypatch.delenv("SMARTMODELROUTER_OFFLINE", raising=False)
+    monkeypatch.delenv("SMARTMODELROUTER_DATASET_TTL", raising=False)
+    reset_dataset_cache_config()
+    yield
+    reset_dataset_cache_config()
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit_breakers():
+    """Start every test with default, closed circuit breakers."""
+    configure_circuit_breakers()
+    yield
+    configure_circuit_breakers()
+
+
+@pytest.fixture(autouse=True)
+def fresh_client_config(monkeypatch):
+    """Make each test read the client configuration from its own environment."""
+    monkeypatch.setattr("smartmodelrouter.llm._config", None)
+    monkeypatch.setattr("smartmodelrouter.llm._config_overrides", {})
+    monkeypatch.setattr("smartmodelrouter.llm._provider_registry", None)
+    monkeypatch.setattr("smartmodelrouter.llm._rate_limiter", None)
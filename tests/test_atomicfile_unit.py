@@ -0,0 +1,18 @@
+import pytest
+
+from smartmodelrouter.atomicfile import atomic_writer
+
+
+def test_replaces_the_file_only_on_success(tmp_path):
+    path = tmp_path / "state.bin"
+    path.write_bytes(b"old")
+    with atomic_writer(path) as fh:
+        fh.write(b"new")
+    assert path.read_bytes() == b"new"
+
+    with pytest.raises(RuntimeError):
+        with atomic_writer(path) as fh:
+            fh.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert path.read_bytes() == b"new"
+    assert [child.name for child in tmp_path.iterdir()] == ["state.bin"]
@@ -0,0 +1,140 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from smartmodelrouter import batch as batch_module
+from smartmodelrouter.batch import (
+    BatchError,
+    BatchSettings,
+    fetch_results,
+    iter_batch,
+    request_line,
+    run_batch,
+    wait_for_batch,
+)
+from smartmodelrouter.benchmark import evaluate_model, evaluate_suite
+from smartmodelrouter.llm import reload_config
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.results import ResultSink
+from smartmodelrouter.stopping import EarlyStopping
+
+FAST = BatchSettings(poll_interval=0.01, max_poll_interval=0.05)
+
+
+@pytest.fixture
+def server():
+    with MockOpenAIServer(reply=lambda body: body["messages"][0]["content"][-1]) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        yield server
+
+
+@pytest.fixture
+def problems(monkeypatch):
+    monkeypatch.setattr(
+        "smartmodelrouter.benchmark._load_dataset",
+        lambda dataset: [
+            {"question": "Say 4", "answer": "4"},
+            {"question": "Say 7", "answer": "8"},
+        ],
+    )
+
+
+def test_run_batch_maps_results_by_custom_id(server):
+    lines = [request_line(f"req-{i}", f"Echo {i}", model="m") for i in range(5)]
+    results = run_batch(lines, FAST)
+    assert {key: value["message"] for key, value in results.items()} == {
+        f"req-{i}": str(i) for i in range(5)
+    }
+    assert results["req-0"]["usage"]["completion_tokens"] == 1
+    assert results["req-0"]["model"] == "m"
+    uploaded = next(iter(server.files.values()))
+    assert uploaded["purpose"] == "batch"
+    assert json.loads(uploaded["content"].splitlines()[0])["url"] == "/v1/chat/completions"
+
+
+def test_large_workloads_are_split(server):
+    lines = [request_line(f"req-{i}", f"Echo {i}") for i in range(7)]
+    settings = BatchSettings(poll_interval=0.01, max_poll_interval=0.05, max_requests=3)
+    assert len(run_batch(lines, settings)) == 7
+    assert len(server.batches) == 3
+
+
+def test_failed_requests_are_resubmitted(server):
+    server.error_rate = 0.5
+    server._random.seed(3)
+    lines = [request_line(f"req-{i}", f"Echo {i}") for i in range(8)]
+    settings = BatchSettings(poll_interval=0.01, max_poll_interval=0.05, retries=10)
+    assert len(run_batch(lines, settings)) == 8
+    assert server.errors > 0
+    assert len(server.batches) > 1
+
+
+def test_exhausted_retries_raise_after_yielding_successes(server):
+    server.error_rate = 1.0
+    lines = [request_line("req-0", "Echo 0")]
+    settings = BatchSettings(poll_interval=0.01, max_poll_interval=0.05, retries=1)
+    with pytest.raises(BatchError) as info:
+        list(iter_batch(lines, settings))
+    assert info.value.failed == {"req-0": "Injected failure"}
+    assert len(server.batches) == 2
+
+
+def test_polling_backs_off_until_timeout(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch_module.time, "sleep", sleeps.append)
+    client = SimpleNamespace(
+        batches=SimpleNamespace(retrieve=lambda batch_id: SimpleNamespace(status="in_progress"))
+    )
+    clock = iter(range(100))
+    monkeypatch.setattr(batch_module.time, "monotonic", lambda: next(clock))
+    settings = BatchSettings(poll_interval=1, max_poll_interval=4, timeout=5)
+    with pytest.raises(TimeoutError):
+        wait_for_batch("batch-1", settings, client)
+    assert sleeps == [1, 2, 2, 1]
+
+
+def test_unfinished_batch_requests_are_reported(server, monkeypatch):
+    server.batch_delay = 60
+    submit = batch_module.submit_batch
+
+    def submit_and_cancel(lines, settings, client):
+        batch_id = submit(lines, settings, client)
+        client.batches.cancel(batch_id)
+        return batch_id
+
+    monkeypatch.setattr(batch_module, "submit_batch", submit_and_cancel)
+    settings = BatchSettings(poll_interval=0.01, max_poll_interval=0.05, retries=0)
+    with pytest.raises(BatchError) as info:
+        run_batch([request_line("req-0", "Echo 0")], settings)
+    batch_id = next(iter(server.batches))
+    assert info.value.failed == {"req-0": f"Batch {batch_id} cancelled"}
+
+    batch = batch_module._get_client().batches.retrieve(batch_id)
+    assert fetch_results(batch) == ({}, {})
+
+
+def test_evaluate_model_batch_backend(server, problems, tmp_path):
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        result = evaluate_model("m", "math", 0, runs=3, sink=sink, batch=FAST)
+        assert len(sink) == 3
+        assert sink.get(("m", "math", 0, 2))["latency"] is None
+        again = evaluate_model("m", "math", 0, runs=4, sink=sink, batch=FAST)
+    assert result["responses"] == ["4", "4", "4"]
+    assert result["correct"] == 3
+    assert result["calls"] == 3
+    assert again["calls"] == 1 and again["runs"] == 4
+    assert server.requests == 4
+
+
+def test_evaluate_model_rejects_stopping_with_batch(problems):
+    with pytest.raises(ValueError, match="batch"):
+        evaluate_model("m", "math", 0, stopping=EarlyStopping(), batch=FAST)
+
+
+def test_evaluate_suite_batch_backend(server, problems):
+    suite = evaluate_suite(["a", "b"], ["math"], runs=2, batch=FAST)
+    assert suite["accuracy"] == {"a": {"math": 0.5}, "b": {"math": 0.5}}
+    assert suite["results"]["b"]["math"][1]["responses"] == ["7", "7"]
+    assert len(server.batches) == 1
+    assert server.requests == 8
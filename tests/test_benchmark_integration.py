@@ -17,7 +17,7 @@ def test_evaluate_model_integration(monkeypatch):
     def fail_get(*_args, **_kwargs):
         raise httpx.HTTPError("boom")
 
-    monkeypatch.setattr("smartmodelrouter.benchmark.httpx.get", fail_get)
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", fail_get)
 
     result = evaluate_model("qwen/qwen3-30b-a3b", "math", 0, runs=1)
     assert result["model"] == "qwen/qwen3-30b-a3b"
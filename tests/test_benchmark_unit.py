@@ -1,7 +1,17 @@
+import asyncio
+import threading
+import time
+
 import httpx
 import pytest
 
-from smartmodelrouter.benchmark import _load_dataset, evaluate_model
+from smartmodelrouter.benchmark import (
+    _load_dataset,
+    aevaluate_model,
+    evaluate_model,
+    evaluate_suite,
+    iter_suite,
+)
 
 
 def test_load_dataset_local_fallback(monkeypatch):
@@ -35,3 +45,94 @@ def test_evaluate_model_counts_correct_responses(monkeypatch):
     assert result["correct"] == 2
     assert result["responses"] == responses
     assert result["problem"] == "What is 2+2?"
+
+
+def test_aevaluate_model_runs_concurrently(monkeypatch):
+    def fake_load(dataset):
+        return [{"question": "What is 2+2?", "answer": "4"}]
+
+    monkeypatch.setattr("smartmodelrouter.benchmark._load_dataset", fake_load)
+
+    state = {"in_flight": 0, "peak": 0, "calls": 0}
+
+    async def fake_achat(prompt, model, max_tokens=1024, temperature=0):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        return {"message": "4" if state["calls"] % 2 else "3", "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.achat_completion", fake_achat)
+
+    result = asyncio.run(aevaluate_model("model", "math", 0, runs=6, concurrency=3))
+    assert result["model"] == "model"
+    assert result["runs"] == 6
+    assert len(result["responses"]) == 6
+    assert result["correct"] == 3
+    assert state["peak"] == 3
+
+
+def test_evaluate_suite_aggregates_and_limits_concurrency(monkeypatch):
+    datasets = {
+        "math": [{"question": "What is 2+2?", "answer": "4"}],
+        "reasoning": [
+            {"question": "What is 1+1?", "answer": "2"},
+            {"question": "What is 3+3?", "answer": "6"},
+        ],
+    }
+    monkeypatch.setattr("smartmodelrouter.benchmark._load_dataset", datasets.__getitem__)
+
+    lock = threading.Lock()
+    state = {"in_flight": {}, "peak": {}}
+
+    def fake_chat(prompt, model, max_tokens=1024, temperature=0):
+        with lock:
+            state["in_flight"][model] = state["in_flight"].get(model, 0) + 1
+            state["peak"][model] = max(state["peak"].get(model, 0), state["in_flight"][model])
+        time.sleep(0.01)
+        with lock:
+            state["in_flight"][model] -= 1
+        # "good" answers everything correctly, "bad" only the math problem.
+        answer = {"What is 2+2?": "4", "What is 1+1?": "2", "What is 3+3?": "6"}[prompt]
+        return {"message": answer if model == "good" or "2+2" in prompt else "0", "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.chat_completion", fake_chat)
+
+    streamed = []
+    result = evaluate_suite(
+        ["good", "bad"],
+        ["math", "reasoning"],
+        runs=3,
+        max_workers=8,
+        model_concurrency={"good": 3, "bad": 2},
+        on_result=streamed.append,
+    )
+
+    assert len(streamed) == 2 * 3 * 3
+    assert state["peak"] == {"good": 3, "bad": 2}
+    assert result["accuracy"] == {
+        "good": {"math": 1.0, "reasoning": 1.0},
+        "bad": {"math": 1.0, "reasoning": 0.0},
+    }
+    assert result["overall"] == {"good": 1.0, "bad": 1 / 3}
+    problem = result["results"]["good"]["reasoning"][1]
+    assert problem["runs"] == 3
+    assert problem["correct"] == 3
+    assert problem["responses"] == ["6", "6", "6"]
+    assert problem["problem"] == "What is 3+3?"
+
+
+def test_iter_suite_accepts_per_dataset_indices(monkeypatch):
+    questions = [{"question": f"q{i}", "answer": "a"} for i in range(3)]
+    monkeypatch.setattr("smartmodelrouter.benchmark._load_dataset", lambda dataset: questions)
+
+    def fake_chat(prompt, model, max_tokens=1024, temperature=0):
+        return {"message": "a", "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.chat_completion", fake_chat)
+
+    records = list(iter_suite(["m"], ["math", "coding"], indices={"math": [2]}, runs=1))
+    seen = sorted((record["dataset"], record["index"]) for record in records)
+    assert seen == [("coding", 0), ("coding", 1), ("coding", 2), ("math", 2)]
+    assert all(record["correct"] for record in records)
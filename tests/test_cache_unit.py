@@ -0,0 +1,245 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from smartmodelrouter.cache import ResponseCache
+from smartmodelrouter.llm import chat_completion, set_response_cache
+
+
+def _result(message="hi"):
+    return {"message": message, "usage": {"prompt_tokens": 1}, "response": {"id": "x"}}
+
+
+def _counting_client(calls):
+    class DummyClient:
+        base_url = "https://example.com/v1/"
+
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                def create(self, **kwargs):
+                    calls.append(kwargs)
+
+                    class Msg:
+                        content = f"answer {len(calls)}"
+
+                    class Choice:
+                        message = Msg()
+
+                    class Completion:
+                        choices = [Choice()]
+                        usage = {"prompt_tokens": 3}
+
+                    return Completion()
+
+    return DummyClient
+
+
+def test_key_covers_request_parameters():
+    messages = [{"role": "user", "content": "hi"}]
+    key = ResponseCache.make_key("m", messages, 10, 0, "https://a")
+    assert key == ResponseCache.make_key("m", messages, 10, 0.0, "https://a")
+    assert key != ResponseCache.make_key("m2", messages, 10, 0, "https://a")
+    assert key != ResponseCache.make_key("m", messages, 11, 0, "https://a")
+    assert key != ResponseCache.make_key("m", messages, 10, 0.5, "https://a")
+    assert key != ResponseCache.make_key("m", messages, 10, 0, "https://b")
+
+
+def test_memory_tier_is_lru_with_ttl(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl=10)
+    cache.set("a", _result("a"))
+    cache.set("b", _result("b"))
+    assert cache.get("a")["message"] == "a"
+    cache.set("c", _result("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") == {**_result("a"), "cached": True}
+
+    now = time.time()
+    monkeypatch.setattr("smartmodelrouter.cache.time.time", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_persists_and_evicts(tmp_path):
+    path = tmp_path / "responses.sqlite"
+    cache = ResponseCache(path, max_entries=0, max_disk_entries=2)
+    for key in "abc":
+        cache.set(key, _result(key))
+        time.sleep(0.001)
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get("a") is None
+    assert reopened.get("c")["message"] == "c"
+    assert reopened.get("c")["cached"] is True
+
+
+def test_hits_return_the_same_result_as_the_miss(tmp_path):
+    path = tmp_path / "responses.sqlite"
+    cache = ResponseCache(path)
+    computed = {**_result(), "model": "m"}
+    miss = cache.get_or_compute("k", lambda: dict(computed))
+    hit = cache.get_or_compute("k", lambda: pytest.fail("must not recompute"))
+    cache.close()
+    reopened = ResponseCache(path)
+    disk_hit = reopened.get_or_compute("k", lambda: pytest.fail("must not recompute"))
+    reopened.close()
+
+    assert miss == {**computed, "cached": False}
+    assert hit == disk_hit == {**computed, "cached": True}
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    cache = ResponseCache()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return _result()
+
+    results = []
+
+    def worker():
+        results.append(cache.get_or_compute("k", compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(result["cached"] for result in results) == [False, True, True, True, True]
+    assert all(result["message"] == "hi" for result in results)
+
+
+def test_async_requests_are_coalesced():
+    cache = ResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return _result()
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_compute("k", compute) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result["cached"] for result in results].count(False) == 1
+
+
+def test_failed_compute_is_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", _result)["cached"] is False
+
+
+def test_failed_store_releases_waiters(monkeypatch):
+    cache = ResponseCache()
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        time.sleep(0.05)
+        return _result()
+
+    def broken_set(key, result):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache, "set", broken_set)
+    errors = []
+
+    def waiter():
+        try:
+            cache.get_or_compute("k", compute)
+        except OSError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=waiter, daemon=True)
+    owner = threading.Thread(target=waiter)
+    owner.start()
+    started.wait()
+    thread.start()
+    owner.join()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert len(errors) == 2
+    assert cache._inflight == {}
+
+
+def test_result_stored_after_the_first_lookup_is_reused(monkeypatch):
+    cache = ResponseCache()
+    cache.set("k", _result("stored"))
+    lookups = []
+    original = cache.get
+
+    def racing_get(key):
+        # The first lookup misses just before another caller stores the result.
+        lookups.append(key)
+        return None if len(lookups) == 1 else original(key)
+
+    monkeypatch.setattr(cache, "get", racing_get)
+    result = cache.get_or_compute("k", lambda: pytest.fail("must not recompute"))
+    assert result["message"] == "stored"
+    assert result["cached"] is True
+
+
+def test_chat_completion_uses_cache_for_deterministic_requests(monkeypatch):
+    calls = []
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com/v1")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _counting_client(calls))
+    cache = ResponseCache()
+
+    first = chat_completion("hi", model="m", max_tokens=16, temperature=0, cache=cache)
+    second = chat_completion("hi", model="m", max_tokens=16, temperature=0, cache=cache)
+    assert len(calls) == 1
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["message"] == first["message"]
+    assert second["model"] == first["model"] == "m"
+    assert second["usage"] == {"prompt_tokens": 3}
+    assert "response" in second
+
+    chat_completion("hi", model="m", max_tokens=16, temperature=0.7, cache=cache)
+    chat_completion("hi", model="m", max_tokens=16, temperature=0.7, cache=cache)
+    assert len(calls) == 3
+
+    sampled = ResponseCache(cache_sampled=True)
+    chat_completion("hi", model="m", max_tokens=16, temperature=0.7, cache=sampled)
+    chat_completion("hi", model="m", max_tokens=16, temperature=0.7, cache=sampled)
+    assert len(calls) == 4
+
+
+def test_chat_completion_uses_installed_default_cache(monkeypatch):
+    calls = []
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com/v1")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _counting_client(calls))
+    set_response_cache(ResponseCache())
+    try:
+        chat_completion("hi", model="m", temperature=0)
+        assert chat_completion("hi", model="m", temperature=0)["cached"] is True
+        assert "cached" not in chat_completion("hi", model="m", temperature=0, cache=False)
+    finally:
+        set_response_cache(None)
+    assert len(calls) == 2
@@ -0,0 +1,119 @@
+import json
+
+import httpx
+import pytest
+
+from smartmodelrouter.datasets import (
+    cache_dir,
+    clear_dataset_cache,
+    configure_dataset_cache,
+    load_dataset,
+)
+from smartmodelrouter.recordfile import RecordFile
+
+REMOTE = [{"question": "Remote question?", "answer": "yes"}]
+
+
+class FakeServer:
+    """Stand-in for ``httpx.get`` that supports conditional requests."""
+
+    def __init__(self, etag='"v1"'):
+        self.etag = etag
+        self.requests: list[dict] = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        request = httpx.Request("GET", url)
+        if headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, request=request)
+        return httpx.Response(
+            200,
+            content=json.dumps(REMOTE).encode(),
+            headers={"ETag": self.etag, "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"},
+            request=request,
+        )
+
+
+def test_load_dataset_memoizes_parsed_dataset(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", server.get)
+
+    first = load_dataset("math")
+    second = load_dataset("math")
+
+    assert isinstance(first, RecordFile)
+    assert list(first) == REMOTE
+    assert second is first
+    assert len(server.requests) == 1
+    assert (cache_dir() / "math.json").exists()
+
+
+def test_load_dataset_revalidates_disk_cache_with_etag(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", server.get)
+    configure_dataset_cache(ttl=0)
+
+    load_dataset("math")
+    clear_dataset_cache()
+    data = load_dataset("math")
+
+    assert list(data) == REMOTE
+    assert len(server.requests) == 2
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert server.requests[1]["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+def test_load_dataset_uses_fresh_disk_cache_without_network(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", server.get)
+
+    load_dataset("math")
+    clear_dataset_cache()
+    assert list(load_dataset("math")) == REMOTE
+    assert len(server.requests) == 1
+
+
+def test_load_dataset_serves_stale_disk_copy_when_network_fails(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", server.get)
+    configure_dataset_cache(ttl=0)
+    load_dataset("math")
+    clear_dataset_cache()
+
+    def fail_get(*args, **kwargs):
+        raise httpx.HTTPError("boom")
+
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", fail_get)
+    assert list(load_dataset("math")) == REMOTE
+
+
+def test_refreshed_download_replaces_and_closes_the_old_file(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", server.get)
+    first = load_dataset("math")
+    REMOTE.append({"question": "Another?", "answer": "no"})
+    server.etag = '"v2"'
+    try:
+        second = load_dataset("math", refresh=True)
+    finally:
+        REMOTE.pop()
+
+    assert len(second) == 2
+    with pytest.raises(ValueError, match="closed"):
+        first[0]
+
+
+@pytest.mark.parametrize("via_env", [False, True])
+def test_load_dataset_offline_never_touches_network(monkeypatch, via_env):
+    def fail_get(*args, **kwargs):  # pragma: no cover - asserted not called
+        raise AssertionError("network access in offline mode")
+
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", fail_get)
+    if via_env:
+        monkeypatch.setenv("SMARTMODELROUTER_OFFLINE", "1")
+    else:
+        configure_dataset_cache(offline=True)
+
+    data = load_dataset("math")
+    assert data[0]["question"].startswith("What is 15")
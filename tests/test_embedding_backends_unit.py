@@ -0,0 +1,138 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from smartmodelrouter import embedding_backends
+from smartmodelrouter.embedding_backends import (
+    HashingBackend,
+    OpenAIEmbeddingBackend,
+    get_backend,
+    register_backend,
+)
+from smartmodelrouter.embedding_store import EmbeddingStore
+from smartmodelrouter.embeddings import embed_dataset, embed_problem, embed_texts
+from smartmodelrouter import llm
+from smartmodelrouter.llm import reload_config, set_provider_registry
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.providers import Endpoint, ProviderRegistry
+from smartmodelrouter.resilience import RetryPolicy
+
+
+@pytest.fixture
+def server():
+    with MockOpenAIServer(embedding_dim=8) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(embedding_backends, "_backends", {})
+
+
+def test_embed_dedupes_and_keeps_input_order(server):
+    backend = OpenAIEmbeddingBackend("mock-embed", max_batch_inputs=2)
+    texts = ["a", "b", "a", "c", "b", "d", "e"]
+    matrix = backend.embed(texts)
+    assert matrix.shape == (7, 8)
+    assert matrix.dtype == np.float64
+    expected = [server.embedding(text) for text in texts]
+    np.testing.assert_allclose(matrix, expected, rtol=1e-6)
+    assert sorted(server.embedding_batches) == [1, 2, 2]
+    assert backend.dim == 8
+
+
+def test_batches_respect_input_and_token_limits():
+    backend = OpenAIEmbeddingBackend("m", max_batch_inputs=3, max_batch_tokens=10)
+    texts = ["x" * 8] * 5 + ["y" * 100] + ["z" * 4] * 2
+    # Two tokens each, except the long text, which is sent on its own.
+    assert backend.batches(texts) == [(0, 3), (3, 5), (5, 6), (6, 8)]
+    assert backend.batches([]) == []
+
+
+def test_requests_run_concurrently_up_to_the_limit(server):
+    server.latency = 0.1
+    in_flight = peak = 0
+    lock = threading.Lock()
+    original = OpenAIEmbeddingBackend._create
+
+    def tracked(self, inputs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        try:
+            return original(self, inputs)
+        finally:
+            with lock:
+                in_flight -= 1
+
+    backend = OpenAIEmbeddingBackend("mock-embed", max_batch_inputs=1, concurrency=3)
+    backend._create = tracked.__get__(backend)
+    started = time.perf_counter()
+    backend.embed([f"text {i}" for i in range(6)])
+    elapsed = time.perf_counter() - started
+    assert peak == 3
+    assert 0.2 <= elapsed < 0.5
+
+
+def test_transient_failures_are_retried():
+    with MockOpenAIServer(error_rate=0.5, seed=3) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        policy = RetryPolicy(max_attempts=20, base_delay=0.0, jitter=0.0)
+        backend = OpenAIEmbeddingBackend(
+            "mock-embed", dimensions=4, max_batch_inputs=1, retry_policy=policy
+        )
+        matrix = backend.embed(["p", "q", "r", "s"], dtype=np.float32)
+    assert server.errors > 0
+    np.testing.assert_allclose(
+        matrix, [server.embedding(text, 4) for text in "pqrs"], rtol=1e-6
+    )
+
+
+def test_interrupted_request_releases_its_endpoint(monkeypatch):
+    def interrupt(**kwargs):
+        raise KeyboardInterrupt
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=interrupt))
+    monkeypatch.setattr(llm, "_get_client", lambda config=None: client)
+    registry = ProviderRegistry([Endpoint("a", "https://a.example.com/v1", "k")])
+    set_provider_registry(registry)
+
+    with pytest.raises(KeyboardInterrupt):
+        OpenAIEmbeddingBackend("mock-embed").embed(["p"])
+    assert registry.snapshot()["a"] == {
+        "inflight": 0,
+        "latency": None,
+        "failures": 0,
+        "ejected": False,
+    }
+
+
+def test_registered_backend_is_used_by_model_name(server, monkeypatch, tmp_path):
+    questions = [{"question": f"What is {i} plus {i}?"} for i in range(3)]
+    monkeypatch.setattr("smartmodelrouter.embeddings._load_dataset", lambda dataset: questions)
+    backend = OpenAIEmbeddingBackend("mock-embed")
+    register_backend("mock-embed", backend)
+    assert get_backend("mock-embed") is backend
+    assert isinstance(get_backend("unregistered"), HashingBackend)
+
+    result = embed_problem("mock-embed", "math", 1)
+    np.testing.assert_allclose(
+        result["embedding"], server.embedding(questions[1]["question"]), rtol=1e-6
+    )
+    # Unregistered names keep using the local embedder.
+    local = embed_problem("other", "math", 1)["embedding"]
+    np.testing.assert_allclose(local, embed_texts([questions[1]["question"]])[0])
+
+    store = EmbeddingStore(tmp_path, dim=8, config=backend.config)
+    embed_dataset("math", model="mock-embed", store=store)
+    server.reset_stats()
+    matrix = embed_dataset("math", model="mock-embed", store=store, dtype=np.float32)
+    assert server.requests == 0
+    assert matrix.shape == (3, 8)
+    with pytest.raises(ValueError):
+        embed_dataset("math", model="mock-embed", sparse=True)
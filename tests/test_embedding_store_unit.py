@@ -0,0 +1,129 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from smartmodelrouter.embedding_store import EmbeddingStore, content_key
+from smartmodelrouter.embeddings import embed_dataset, embed_texts, embedder_config
+
+
+def _counting_embedder(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return embed_texts(texts, dtype=np.float32)
+
+    return embed
+
+
+def test_embed_only_computes_unseen_texts(tmp_path):
+    store = EmbeddingStore(tmp_path / "store", dim=128, config=embedder_config())
+    calls = []
+    first = store.embed(["a cat", "a dog", "a cat"], _counting_embedder(calls))
+    assert calls == [["a cat", "a dog"]]
+    assert len(store) == 2
+    np.testing.assert_allclose(first, embed_texts(["a cat", "a dog", "a cat"]), rtol=1e-6)
+
+    second = store.embed(["a dog", "a bird"], _counting_embedder(calls))
+    assert calls[-1] == ["a bird"]
+    assert len(store) == 3
+    np.testing.assert_array_equal(second[0], first[1])
+    assert store.rows(["a bird", "a fish"]).tolist() == [2, -1]
+    assert "a cat" in store and "a fish" not in store
+
+
+def test_reopened_and_readonly_stores_share_rows(tmp_path):
+    path = tmp_path / "store"
+    writer = EmbeddingStore(path, dim=4, config="m")
+    writer.add(["x", "y"], np.arange(8).reshape(2, 4))
+
+    reader = EmbeddingStore(path, config="m", readonly=True)
+    assert reader.dim == 4
+    assert isinstance(reader.vectors, np.memmap)
+    np.testing.assert_array_equal(reader.get(["y"]), [[4, 5, 6, 7]])
+    with pytest.raises(PermissionError):
+        reader.add(["z"], np.zeros((1, 4)))
+    with pytest.raises(KeyError):
+        reader.get(["z"])
+
+    writer.add(["z"], np.ones((1, 4)))
+    assert len(reader) == 2
+    assert reader.refresh() == 3
+    np.testing.assert_array_equal(reader.get(["z"]), [[1, 1, 1, 1]])
+
+    # The config is part of the key, so another embedder starts fresh.
+    other = EmbeddingStore(path, config="other")
+    assert "x" not in other
+    with pytest.raises(ValueError):
+        EmbeddingStore(path, dim=8)
+
+
+def test_appends_do_not_rewrite_existing_rows(tmp_path):
+    store = EmbeddingStore(tmp_path, dim=2)
+    store.add(["a"], [[1.0, 2.0]])
+    vectors = store.path / "vectors.f32"
+    inode = vectors.stat().st_ino
+    before = vectors.read_bytes()
+    store.add(["b"], [[3.0, 4.0]])
+    assert vectors.stat().st_ino == inode
+    assert vectors.read_bytes()[: len(before)] == before
+
+
+def test_partial_rows_from_a_crash_are_ignored_and_dropped(tmp_path):
+    store = EmbeddingStore(tmp_path, dim=2)
+    store.add(["a"], [[1.0, 2.0]])
+    # A writer died after writing its vector but before its key.
+    with (tmp_path / "vectors.f32").open("ab") as fh:
+        fh.write(np.array([9.0, 9.0], dtype=np.float32).tobytes())
+    with (tmp_path / "keys.bin").open("ab") as fh:
+        fh.write(content_key("lost")[:5])
+
+    reopened = EmbeddingStore(tmp_path)
+    assert len(reopened) == 1
+    reopened.add(["b"], [[3.0, 4.0]])
+    np.testing.assert_array_equal(reopened.get(["a", "b"]), [[1, 2], [3, 4]])
+    assert (tmp_path / "vectors.f32").stat().st_size == 2 * 2 * 4
+    assert (tmp_path / "keys.bin").stat().st_size == 2 * 16
+
+
+def _add_range(path, start):
+    store = EmbeddingStore(path, dim=3)
+    texts = [f"text {i}" for i in range(start, start + 50)]
+    for text in texts:
+        store.add([text], [[float(text.split()[1])] * 3])
+
+
+def test_concurrent_writer_processes(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    EmbeddingStore(tmp_path, dim=3)
+    workers = [context.Process(target=_add_range, args=(tmp_path, start)) for start in (0, 25)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0, 0]
+
+    store = EmbeddingStore(tmp_path)
+    assert len(store) == 75
+    texts = [f"text {i}" for i in range(75)]
+    np.testing.assert_array_equal(store.get(texts)[:, 0], np.arange(75))
+
+
+def test_embed_dataset_reuses_store(monkeypatch, tmp_path):
+    questions = [{"question": f"What is {i} plus {i}?"} for i in range(4)]
+    monkeypatch.setattr("smartmodelrouter.embeddings._load_dataset", lambda dataset: questions)
+    store = EmbeddingStore(tmp_path, dim=128, config=embedder_config())
+
+    embedded = embed_dataset("math", indices=[0, 1], store=store)
+    assert len(store) == 2
+    calls = []
+    monkeypatch.setattr(
+        "smartmodelrouter.embeddings.embed_texts",
+        lambda texts, **kwargs: calls.append(texts) or embed_texts(texts, **kwargs),
+    )
+    matrix = embed_dataset("math", store=store)
+    assert calls == [[questions[2]["question"], questions[3]["question"]]]
+    assert matrix.dtype == np.float64
+    np.testing.assert_allclose(matrix[:2], embedded)
+    np.testing.assert_allclose(matrix, embed_dataset("math"), rtol=1e-6)
+    with pytest.raises(ValueError):
+        embed_dataset("math", store=store, sparse=True)
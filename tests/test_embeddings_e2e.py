@@ -7,7 +7,7 @@ def test_embed_problem_end_to_end(monkeypatch):
     def fail_get(*args, **kwargs):
         raise httpx.HTTPError("no network")
 
-    monkeypatch.setattr("smartmodelrouter.benchmark.httpx.get", fail_get)
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", fail_get)
 
     captured = {}
 
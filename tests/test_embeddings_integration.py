@@ -9,7 +9,7 @@ def test_embed_problem_integration(monkeypatch):
     def fail_get(*_args, **_kwargs):
         raise httpx.HTTPError("boom")
 
-    monkeypatch.setattr("smartmodelrouter.benchmark.httpx.get", fail_get)
+    monkeypatch.setattr("smartmodelrouter.datasets.httpx.get", fail_get)
 
     result = embed_problem("hashing-embed", "math", 0)
 
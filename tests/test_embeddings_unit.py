@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
+from scipy import sparse as sp
 
-from smartmodelrouter.embeddings import embed_problem
+from smartmodelrouter.embeddings import embed_dataset, embed_problem
 
 
 def test_embed_problem_returns_embedding(monkeypatch):
@@ -29,3 +31,37 @@ def test_embed_problem_returns_embedding(monkeypatch):
     assert result["index"] == 0
     assert result["embedding"] == [0.1, 0.2]
     assert result["response"] == {"embedding": [0.1, 0.2]}
+
+
+def test_embed_dataset_loads_once_and_matches_single_embeddings(monkeypatch):
+    questions = [{"question": f"What is {i} plus {i}?"} for i in range(5)]
+    loads = []
+
+    def fake_load(dataset):
+        loads.append(dataset)
+        return questions
+
+    monkeypatch.setattr("smartmodelrouter.embeddings._load_dataset", fake_load)
+
+    matrix = embed_dataset("math", batch_size=2)
+    assert isinstance(matrix, np.ndarray)
+    assert matrix.shape == (5, 128)
+    assert loads == ["math"]
+
+    for index in range(5):
+        single = embed_problem("emb-model", "math", index)["embedding"]
+        np.testing.assert_allclose(matrix[index], single)
+
+
+def test_embed_dataset_sparse_and_streaming(monkeypatch):
+    questions = [{"question": f"question number {i}"} for i in range(5)]
+    monkeypatch.setattr("smartmodelrouter.embeddings._load_dataset", lambda dataset: questions)
+
+    dense = embed_dataset("math", indices=[4, 0, 2])
+    matrix = embed_dataset("math", indices=[4, 0, 2], sparse=True)
+    assert sp.isspmatrix_csr(matrix) or isinstance(matrix, sp.csr_array)
+    np.testing.assert_allclose(matrix.toarray(), dense)
+
+    chunks = list(embed_dataset("math", batch_size=2, stream=True))
+    assert [indices for indices, _ in chunks] == [[0, 1], [2, 3], [4]]
+    np.testing.assert_allclose(np.vstack([chunk for _, chunk in chunks]), embed_dataset("math"))
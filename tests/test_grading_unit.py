@@ -0,0 +1,138 @@
+import pytest
+
+from smartmodelrouter import grading
+from smartmodelrouter.grading import (
+    AnswerGrader,
+    CodeGrader,
+    extract_answer,
+    extract_code,
+    grade_records,
+    parse_number,
+)
+
+
+@pytest.mark.parametrize(
+    ("message", "answer", "expected"),
+    [
+        ("5", "5", True),
+        ("5.0", "5", True),
+        ("The answer is 5.", "5", True),
+        ("We divide 15 by 3.\n**Final answer:** $5$", "5", True),
+        ("so \\boxed{\\frac{1}{2}}", "0.5", True),
+        ("1,000", "1000", True),
+        ("50%", "0.5", True),
+        ("Alice has 2 apples left.", "2", True),
+        ("6", "5", False),
+        ("The answer is 12, not 5", "5", False),
+        ("Between 4 and 5", "5", False),
+        ("Not 7. It could be 2 or 5", "5", False),
+        ("The answer is 5 apples.", "5", True),
+        ("5 or 6", "5", False),
+        ("2+2=4", "2", False),
+        ("1. First compute x. 2. Then the result is 9", "1", False),
+        ("3 apples plus 2 apples gives 5 apples", "3", False),
+        ("Paris.", "paris", True),
+        ("`[1, 2, 3]`", "[1, 2, 3]", True),
+        ("London", "paris", False),
+        ("anything", None, False),
+    ],
+)
+def test_answer_grader(message, answer, expected):
+    assert AnswerGrader().grade(message, {"answer": answer}) is expected
+
+
+def test_answer_grader_batch_matches_single_grades():
+    messages = ["5", "The answer is 4", "x", "3/4"] * 250
+    entries = [{"answer": "5"}, {"answer": "4"}, {"answer": "y"}, {"answer": "0.75"}] * 250
+    assert AnswerGrader().grade_batch(messages, entries) == [True, True, False, True] * 250
+    with pytest.raises(ValueError):
+        AnswerGrader().grade_batch(["5"], [])
+
+
+def test_extraction_helpers():
+    assert extract_answer("x \\boxed{a{b}c} then \\boxed{42}") == "42"
+    assert extract_answer("Answer: \\text{Blue}") == "blue"
+    assert parse_number("-1.5e3") == -1500.0
+    assert parse_number("3 apples") is None
+    assert parse_number("1/0") is None
+    assert extract_code("Here:\n```python\nx = 1\n```\nand\n```py\nprint(2)\n```") == "print(2)"
+    assert extract_code("list(range(1, 4))") == "list(range(1, 4))"
+
+
+@pytest.fixture(scope="module")
+def code_grader():
+    return CodeGrader(timeout=2.0, max_workers=2)
+
+
+def test_code_grader_checks_expressions_tests_and_io(code_grader):
+    entries = [
+        {"answer": "[1, 2, 3]"},
+        {"answer": "[1, 2, 3]"},
+        {"tests": ["assert add(2, 3) == 5", "assert add(-1, 1) == 0"]},
+        {"tests": ["assert add(2, 3) == 5"]},
+        {"tests": [{"input": "3\n4\n", "output": "7"}, {"input": "1\n1\n", "output": "2"}]},
+        {"answer": "hello"},
+    ]
+    messages = [
+        "```python\nlist(range(1, 4))\n```",
+        "[1, 2]",
+        "def add(a, b):\n    return a + b",
+        "def add(a, b):\n    return a - b",
+        "```python\na = int(input())\nb = int(input())\nprint(a + b)\n```",
+        "print('hello')",
+    ]
+    assert code_grader.grade_batch(messages, entries) == [True, False, True, False, True, True]
+
+
+def test_code_grader_accepts_clean_exits(code_grader):
+    entry = {"tests": [{"input": "3\n", "output": "6"}]}
+    messages = [
+        "import sys\nprint(2 * int(input()))\nsys.exit(0)",
+        "import sys\nprint(2 * int(input()))\nsys.exit()",
+        "import sys\nprint(2 * int(input()))\nsys.exit(1)",
+    ]
+    assert code_grader.grade_batch(messages, [entry] * 3) == [True, True, False]
+
+
+def test_code_grader_survives_hangs_crashes_and_exits(code_grader):
+    entry = {"answer": "1"}
+    messages = [
+        "while True:\n    pass",
+        "import os\nos._exit(1)",
+        "raise SystemExit(0)",
+        "1",
+    ]
+    assert code_grader.grade_batch(messages, [entry] * 4) == [False, False, False, True]
+
+
+def test_grade_records_rescores_without_model_calls(monkeypatch):
+    monkeypatch.setattr(
+        grading,
+        "load_dataset",
+        lambda dataset: {
+            "math": [{"question": "15 / 3?", "answer": "5"}],
+            "coding": [{"question": "1..3", "answer": "[1, 2, 3]"}],
+        }[dataset],
+    )
+    records = [
+        {"dataset": "math", "index": 0, "message": "5.0", "correct": False},
+        {"dataset": "math", "index": 0, "message": "4", "correct": True},
+        {"dataset": "coding", "index": 0, "message": "[1, 2, 3]", "correct": False},
+    ]
+    graded = grade_records(records, graders={"coding": CodeGrader(max_workers=1)})
+    assert [record["correct"] for record in graded] == [True, False, True]
+    assert records[0]["correct"] is False
+
+
+def test_graders_are_pluggable(monkeypatch):
+    class Always:
+        def grade(self, message, entry):
+            return True
+
+        def grade_batch(self, messages, entries):
+            return [True] * len(messages)
+
+    monkeypatch.setattr(grading, "_graders", {})
+    grading.register_grader("math", Always())
+    assert isinstance(grading.get_grader("reasoning"), AnswerGrader)
+    assert isinstance(grading.get_grader("math"), Always)
@@ -0,0 +1,76 @@
+import random
+import string
+
+import numpy as np
+import pytest
+
+from smartmodelrouter.hashing import HashingEmbedder, murmurhash3_32
+
+TEXTS = [
+    "What is 2+2?",
+    "",
+    "a",
+    "The QUICK brown fox, the lazy dog; 123 4567 _under_score",
+    "Ünïcödé straße ΑΒΓ дом 日本語のテキスト",
+    "repeat repeat repeat once",
+]
+
+
+def _random_texts(count=200, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "éü_-., "
+    return [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 120)))
+        for _ in range(count)
+    ]
+
+
+def test_murmurhash3_known_values():
+    # Reference values from sklearn.utils.murmurhash3_32.
+    assert murmurhash3_32(b"") == 0
+    assert murmurhash3_32(b"hello") == 613153351
+    assert murmurhash3_32(b"hello", seed=1) == -1152729939
+    assert murmurhash3_32(b"The quick brown fox") == 1621279277
+
+
+@pytest.mark.parametrize("alternate_sign", [False, True])
+def test_matches_sklearn_hashing_vectorizer(alternate_sign):
+    text = pytest.importorskip("sklearn.feature_extraction.text")
+    texts = TEXTS + _random_texts()
+    expected = text.HashingVectorizer(
+        n_features=128, alternate_sign=alternate_sign
+    ).transform(texts)
+    actual = HashingEmbedder(n_features=128, alternate_sign=alternate_sign).transform(texts)
+    assert actual.dtype == np.float64
+    np.testing.assert_allclose(actual, expected.toarray(), atol=1e-12)
+
+
+def test_murmurhash3_matches_sklearn():
+    utils = pytest.importorskip("sklearn.utils")
+    for token in ["", "a", "ab", "abc", "abcd", "abcde", "日本語", "x" * 37]:
+        assert murmurhash3_32(token.encode("utf-8")) == utils.murmurhash3_32(token)
+        assert murmurhash3_32(token.encode("utf-8"), seed=42) == utils.murmurhash3_32(
+            token, seed=42
+        )
+
+
+def test_rows_are_unit_length_and_counts_accumulate():
+    matrix = HashingEmbedder(n_features=16, norm=None).transform(["aa aa bb", ""])
+    assert matrix.shape == (2, 16)
+    assert sorted(matrix[0][matrix[0] > 0]) == [1.0, 2.0]
+    assert not matrix[1].any()
+
+    normed = HashingEmbedder(n_features=16).transform(["aa aa bb", ""])
+    assert np.linalg.norm(normed[0]) == pytest.approx(1.0)
+    assert not normed[1].any()
+
+
+def test_empty_batch():
+    assert HashingEmbedder().transform([]).shape == (0, 128)
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        HashingEmbedder(n_features=0)
+    with pytest.raises(ValueError):
+        HashingEmbedder(norm="l1")
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from smartmodelrouter import llm
+from smartmodelrouter.hedging import LatencyTracker, ahedged_completion, hedged_completion
+from smartmodelrouter.mockserver import MockOpenAIServer
+
+
+def _fake_achat(latencies, log, failures=()):
+    async def fake_achat(prompt, model, max_tokens=10_240, temperature=0.7):
+        log.append(("start", model))
+        try:
+            await asyncio.sleep(latencies[model])
+        except asyncio.CancelledError:
+            log.append(("cancelled", model))
+            raise
+        if model in failures:
+            raise RuntimeError(f"{model} failed")
+        return {"model": model, "message": f"from {model}", "usage": {"completion_tokens": 5}}
+
+    return fake_achat
+
+
+def test_backup_wins_when_primary_is_slow(monkeypatch):
+    log = []
+    monkeypatch.setattr(
+        "smartmodelrouter.hedging.achat_completion",
+        _fake_achat({"primary": 1.0, "backup": 0.01}, log),
+    )
+
+    result = hedged_completion("hi", ["primary", "backup"], delay=0.02, tracker=LatencyTracker())
+    assert result["message"] == "from backup"
+    assert result["model"] == "backup"
+    assert result["hedge"]["winner"] == "backup"
+    assert result["hedge"]["launched"] == ["primary", "backup"]
+    assert result["hedge"]["cancelled"] == ["primary"]
+    assert result["hedge"]["extra_requests"] == 1
+    assert ("cancelled", "primary") in log
+
+
+def test_no_hedge_when_primary_answers_in_time(monkeypatch):
+    log = []
+    monkeypatch.setattr(
+        "smartmodelrouter.hedging.achat_completion",
+        _fake_achat({"primary": 0.01, "backup": 0.01}, log),
+    )
+
+    result = hedged_completion("hi", ["primary", "backup"], delay=0.5, tracker=LatencyTracker())
+    assert result["hedge"]["launched"] == ["primary"]
+    assert result["hedge"]["extra_requests"] == 0
+    assert log == [("start", "primary")]
+
+
+def test_failure_triggers_next_hedge_immediately(monkeypatch):
+    log = []
+    monkeypatch.setattr(
+        "smartmodelrouter.hedging.achat_completion",
+        _fake_achat({"primary": 0.0, "backup": 0.01}, log, failures={"primary"}),
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await ahedged_completion(
+            "hi", ["primary", "backup"], delay=5.0, tracker=LatencyTracker()
+        )
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result["model"] == "backup"
+    assert elapsed < 1.0
+
+
+def test_all_failures_raise(monkeypatch):
+    monkeypatch.setattr(
+        "smartmodelrouter.hedging.achat_completion",
+        _fake_achat({"a": 0.0, "b": 0.0}, [], failures={"a", "b"}),
+    )
+    with pytest.raises(RuntimeError, match="All hedged requests failed"):
+        hedged_completion("hi", ["a", "b"], delay=0.01, tracker=LatencyTracker())
+
+
+def test_adaptive_delay_uses_observed_percentile(monkeypatch):
+    log = []
+    monkeypatch.setattr(
+        "smartmodelrouter.hedging.achat_completion",
+        _fake_achat({"primary": 0.2, "backup": 0.01}, log),
+    )
+    tracker = LatencyTracker()
+    for _ in range(20):
+        tracker.record("primary", 0.01)
+    assert tracker.percentile("primary") == pytest.approx(0.01)
+
+    result = hedged_completion("hi", ["primary", "backup"], default_delay=10.0, tracker=tracker)
+    assert result["model"] == "backup"
+    assert tracker.percentile("backup", min_samples=1) is not None
+
+
+def test_sync_wrapper_closes_its_clients(monkeypatch):
+    clients = []
+    get_async_client = llm._get_async_client
+
+    def tracked(*args, **kwargs):
+        client = get_async_client(*args, **kwargs)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(llm, "_get_async_client", tracked)
+    with MockOpenAIServer() as server:
+        llm.reload_config(api_key="test", base_url=server.base_url)
+        for _ in range(2):
+            result = hedged_completion("hi", ["a"], delay=1.0, tracker=LatencyTracker())
+            assert result["hedge"]["winner"] == "a"
+    assert clients and all(client.is_closed() for client in clients)
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ("openai", "httpx", "sklearn", "scipy")
+
+
+def _loaded_after_import(module):
+    """Return the heavy dependencies loaded by importing ``module`` in a fresh interpreter."""
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([name for name in {HEAVY!r} if name in sys.modules]))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, sys.path))}
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+    )
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "smartmodelrouter.llm",
+        "smartmodelrouter.embeddings",
+        "smartmodelrouter.embedding_backends",
+        "smartmodelrouter.routing",
+        "smartmodelrouter.bandit",
+        "smartmodelrouter.benchmark",
+        "smartmodelrouter.datasets",
+        "smartmodelrouter.proxy",
+    ],
+)
+def test_import_defers_heavy_dependencies(module):
+    assert _loaded_after_import(module) == []
+
+
+def test_lazy_openai_names_resolve_and_stay_patchable(monkeypatch):
+    import openai
+
+    from smartmodelrouter import llm
+
+    assert llm.OpenAI is openai.OpenAI
+    assert llm.AsyncOpenAI is openai.AsyncOpenAI
+    sentinel = object()
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", sentinel)
+    assert llm._openai("OpenAI") is sentinel
+    with pytest.raises(AttributeError):
+        llm.NotAThing
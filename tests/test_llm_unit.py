@@ -1,11 +1,24 @@
+import asyncio
 import os
+import threading
+import time
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 from openai import APIConnectionError
 import httpx
 
-from smartmodelrouter.llm import _ensure_env, chat_completion
+from smartmodelrouter.llm import (
+    ClientConfig,
+    _ensure_env,
+    _get_client,
+    achat_completion,
+    achat_completion_stream,
+    chat_completion,
+    chat_completion_stream,
+    reload_config,
+)
 
 
 def test_ensure_env_loads_dotenv(monkeypatch, tmp_path: Path) -> None:
@@ -143,3 +156,390 @@ def test_chat_completion_api_error_retries(monkeypatch) -> None:
     result = chat_completion("hi", model="openai/gpt-5-nano", max_tokens=1024)
     assert result["message"] == "hi"
     assert calls["count"] == 3
+
+
+def test_achat_completion_parses_response(monkeypatch) -> None:
+    """achat_completion awaits the async client and returns the same shape."""
+
+    captured: dict | None = None
+
+    class DummyAsyncClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                async def create(self, **kwargs):
+                    nonlocal captured
+                    captured = kwargs
+
+                    class Msg:
+                        content = "hi"
+
+                    class Choice:
+                        message = Msg()
+
+                    class Completion:
+                        choices = [Choice()]
+                        usage = {"prompt_tokens": 1}
+
+                    return Completion()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.AsyncOpenAI", DummyAsyncClient)
+
+    result = asyncio.run(achat_completion("hi", model="openai/gpt-5-nano", max_tokens=1024))
+    assert result["message"] == "hi"
+    assert result["usage"] == {"prompt_tokens": 1}
+    assert "response" in result
+    assert captured is not None
+    assert captured["model"] == "openai/gpt-5-nano"
+    assert captured["extra_headers"]["X-Title"] == "smartmodelrouter"
+
+
+def test_achat_completion_retries_with_async_sleep(monkeypatch) -> None:
+    """achat_completion backs off with asyncio.sleep instead of time.sleep."""
+
+    calls = {"count": 0}
+    sleeps: list[float] = []
+
+    class DummyAsyncClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                async def create(self, **kwargs):
+                    calls["count"] += 1
+                    if calls["count"] < 3:
+                        raise APIConnectionError(request=httpx.Request("POST", "https://example.com"))
+
+                    class Msg:
+                        content = "hi"
+
+                    class Choice:
+                        message = Msg()
+
+                    class Completion:
+                        choices = [Choice()]
+                        usage = {}
+
+                    return Completion()
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    def fail_sleep(delay):  # pragma: no cover - asserted not called
+        raise AssertionError("time.sleep must not be used by achat_completion")
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.AsyncOpenAI", DummyAsyncClient)
+    monkeypatch.setattr("smartmodelrouter.llm.asyncio.sleep", fake_sleep)
+    monkeypatch.setattr("smartmodelrouter.llm.time.sleep", fail_sleep)
+
+    result = asyncio.run(achat_completion("hi", model="openai/gpt-5-nano", max_tokens=1024))
+    assert result["message"] == "hi"
+    assert calls["count"] == 3
+    assert sleeps == [pytest.approx(1, rel=0.1), pytest.approx(2, rel=0.1)]
+
+
+def _chunk(content=None, usage=None, finish_reason=None):
+    choices = (
+        []
+        if content is None and finish_reason is None
+        else [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+    )
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _Stream:
+    """Iterable, closable stand-in for the SDK's ``Stream``."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self):
+        return self._chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+class _AsyncStream:
+    """Asynchronous counterpart of :class:`_Stream`."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+
+def test_chat_completion_stream_yields_deltas_and_final_record(monkeypatch) -> None:
+    """chat_completion_stream yields deltas then a final usage/latency record."""
+
+    captured: dict = {}
+    calls = {"count": 0}
+
+    class DummyClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                def create(self, **kwargs):
+                    calls["count"] += 1
+                    captured.update(kwargs)
+                    if calls["count"] == 1:
+                        raise APIConnectionError(request=httpx.Request("POST", "https://example.com"))
+                    return _Stream(
+                        [
+                            _chunk("hel"),
+                            _chunk("lo"),
+                            _chunk(finish_reason="length"),
+                            _chunk(usage={"completion_tokens": 2, "prompt_tokens": 5}),
+                        ]
+                    )
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", DummyClient)
+    monkeypatch.setattr("smartmodelrouter.llm.time.sleep", lambda delay: None)
+
+    events = list(chat_completion_stream("hi", model="openai/gpt-5-nano", max_tokens=16))
+    assert calls["count"] == 2
+    assert captured["stream"] is True
+    assert captured["stream_options"] == {"include_usage": True}
+    assert events[:2] == [
+        {"type": "delta", "content": "hel"},
+        {"type": "delta", "content": "lo"},
+    ]
+    final = events[-1]
+    assert final["type"] == "final"
+    assert final["message"] == "hello"
+    assert final["finish_reason"] == "length"
+    assert final["usage"] == {"completion_tokens": 2, "prompt_tokens": 5}
+    assert final["time_to_first_token"] is not None
+    assert final["latency"] >= final["time_to_first_token"]
+
+
+def test_chat_completion_stream_does_not_retry_after_first_delta(monkeypatch) -> None:
+    """Failures after content was yielded surface instead of being retried."""
+
+    calls = {"count": 0}
+
+    class DummyClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                def create(self, **kwargs):
+                    calls["count"] += 1
+
+                    def chunks():
+                        yield _chunk("partial")
+                        raise httpx.ReadError("connection reset")
+
+                    return _Stream(chunks())
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", DummyClient)
+
+    stream = chat_completion_stream("hi", model="openai/gpt-5-nano", max_tokens=16)
+    assert next(stream) == {"type": "delta", "content": "partial"}
+    with pytest.raises(RuntimeError, match="interrupted"):
+        next(stream)
+    assert calls["count"] == 1
+
+
+def test_achat_completion_stream_yields_deltas(monkeypatch) -> None:
+    """achat_completion_stream iterates the async stream."""
+
+    class DummyAsyncClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                async def create(self, **kwargs):
+                    return _AsyncStream(
+                        [_chunk(piece) for piece in "abc"] + [_chunk(usage={"completion_tokens": 3})]
+                    )
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.AsyncOpenAI", DummyAsyncClient)
+
+    async def collect():
+        return [event async for event in achat_completion_stream("hi", model="m")]
+
+    events = asyncio.run(collect())
+    assert [event["content"] for event in events[:-1]] == ["a", "b", "c"]
+    assert events[-1]["message"] == "abc"
+    assert events[-1]["usage"] == {"completion_tokens": 3}
+
+
+def test_streams_are_closed_when_the_consumer_stops_early(monkeypatch) -> None:
+    """Breaking out of a stream closes the upstream response."""
+
+    streams = []
+
+    class Completions:
+        def create(self, **kwargs):
+            streams.append(_Stream([_chunk("a"), _chunk("b")]))
+            return streams[-1]
+
+    class AsyncCompletions:
+        async def create(self, **kwargs):
+            streams.append(_AsyncStream([_chunk("a"), _chunk("b")]))
+            return streams[-1]
+
+    def client(completions):
+        return lambda *args, **kwargs: SimpleNamespace(
+            chat=SimpleNamespace(completions=completions())
+        )
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", client(Completions))
+    monkeypatch.setattr("smartmodelrouter.llm.AsyncOpenAI", client(AsyncCompletions))
+
+    stream = chat_completion_stream("hi", model="m")
+    assert next(stream)["content"] == "a"
+    stream.close()
+
+    async def consume():
+        stream = achat_completion_stream("hi", model="m")
+        assert (await anext(stream))["content"] == "a"
+        await stream.aclose()
+
+    asyncio.run(consume())
+    assert len(streams) == 2
+    assert all(stream.closed for stream in streams)
+
+
+def test_client_config_is_read_once_until_reload(monkeypatch) -> None:
+    """_get_client does not consult the environment until reload_config()."""
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://one.example.com/v1")
+    first = _get_client()
+    assert str(first.base_url).startswith("https://one.example.com/v1")
+
+    def fail_getenv(*args, **kwargs):  # pragma: no cover - asserted not called
+        raise AssertionError("environment read on the request path")
+
+    with monkeypatch.context() as patched:
+        patched.setattr("smartmodelrouter.llm.os.getenv", fail_getenv)
+        assert _get_client() is first
+
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://two.example.com/v1")
+    assert _get_client() is first
+    config = reload_config()
+    second = _get_client()
+    assert config.base_url == "https://two.example.com/v1"
+    assert second is not first
+    assert str(second.base_url).startswith("https://two.example.com/v1")
+
+
+def test_client_config_controls_pool_and_timeouts(monkeypatch) -> None:
+    """Pool limits and timeouts from ClientConfig reach the HTTP client."""
+
+    captured: dict = {}
+
+    class DummyClient:
+        def __init__(self, *args, **kwargs):
+            captured.update(kwargs)
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com/v1")
+    monkeypatch.setenv("SMARTMODELROUTER_MAX_CONNECTIONS", "7")
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", DummyClient)
+    config = reload_config(keepalive_expiry=30.0, connect_timeout=1.5, read_timeout=42.0)
+
+    assert config.max_connections == 7
+    _get_client()
+    assert captured["max_retries"] == 0
+    assert captured["timeout"].connect == 1.5
+    assert captured["timeout"].read == 42.0
+    pool = captured["http_client"]._transport._pool
+    assert pool._max_connections == 7
+    assert pool._keepalive_expiry == 30.0
+
+    # Remembered settings survive a plain reload.
+    assert reload_config().read_timeout == 42.0
+
+
+def test_one_pooled_client_per_config_across_threads(monkeypatch) -> None:
+    """Concurrent first use builds a single client per distinct config."""
+
+    created = []
+
+    class DummyClient:
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.01)
+            created.append(kwargs["base_url"])
+
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", DummyClient)
+    configs = [
+        ClientConfig(api_key="a", base_url="https://a.example.com/v1"),
+        ClientConfig(api_key="b", base_url="https://b.example.com/v1"),
+    ]
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda c=config: results.append(_get_client(c)))
+        for config in configs * 8
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(created) == ["https://a.example.com/v1", "https://b.example.com/v1"]
+    assert len({id(client) for client in results}) == 2
+
+
+def test_client_config_rejects_invalid_base_url() -> None:
+    """ClientConfig validates the base URL when it is created."""
+
+    with pytest.raises(RuntimeError, match="Invalid OPENAI_BASE_URL"):
+        ClientConfig(api_key="key", base_url="example.com")
+
+
+def test_client_config_repr_hides_api_key() -> None:
+    """The API key stays out of reprs, e.g. in logs and tracebacks."""
+
+    config = ClientConfig(api_key="sk-secret", base_url="https://api.example.com/v1")
+    assert "sk-secret" not in repr(config)
+    assert "https://api.example.com/v1" in repr(config)
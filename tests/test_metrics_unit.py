@@ -0,0 +1,184 @@
+import json
+
+import pytest
+
+from smartmodelrouter import metrics
+from smartmodelrouter.llm import chat_completion
+from smartmodelrouter.resilience import RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.registry.reset()
+    metrics.set_metrics_enabled(True)
+    yield
+    metrics.set_metrics_enabled(False)
+    metrics.registry.reset()
+
+
+def _client(outcomes):
+    """Return a client class whose ``create`` returns or raises ``outcomes`` in order."""
+
+    class DummyClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                def create(self, **kwargs):
+                    outcome = outcomes.pop(0)
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+
+                    class Msg:
+                        content = outcome
+
+                    class Choice:
+                        message = Msg()
+
+                    class Completion:
+                        choices = [Choice()]
+                        usage = {
+                            "prompt_tokens": 12,
+                            "completion_tokens": 30,
+                            "prompt_tokens_details": {"cached_tokens": 8},
+                            "completion_tokens_details": {"reasoning_tokens": 20},
+                        }
+
+                    return Completion()
+
+    return DummyClient
+
+
+@pytest.fixture
+def client_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com")
+
+    def install(outcomes):
+        monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _client(outcomes))
+
+    return install
+
+
+def test_chat_completion_records_latency_and_tokens(client_env):
+    client_env(["a", "b"])
+    chat_completion("hi", model="m")
+    chat_completion("hi", model="m")
+
+    stats = metrics.snapshot()["m"]
+    assert stats["requests"] == 2 and stats["errors"] == 0
+    assert stats["latency"]["count"] == 2
+    assert stats["queue_time"]["count"] == 2
+    assert stats["retries"]["sum"] == 0
+    assert stats["prompt_tokens"]["sum"] == 24
+    assert stats["completion_tokens"]["sum"] == 60
+    assert stats["cached_tokens"]["sum"] == 16
+    assert stats["reasoning_tokens"]["sum"] == 40
+
+
+def test_retries_and_failures_are_counted(client_env):
+    policy = RetryPolicy(max_attempts=2, base_delay=0, jitter=0)
+    client_env([json.JSONDecodeError("bad", "", 0), "ok", ValueError("bad")])
+    chat_completion("hi", model="m", retry_policy=policy)
+    with pytest.raises(ValueError):
+        chat_completion("hi", model="m", retry_policy=RetryPolicy(max_attempts=1))
+
+    stats = metrics.snapshot()["m"]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    assert stats["retries"]["sum"] == 1
+
+
+def test_hooks_receive_call_metrics(client_env):
+    client_env(["a", "b"])
+    seen = []
+    remove = metrics.add_hook(seen.append)
+    try:
+        chat_completion("hi", model="m")
+    finally:
+        remove()
+    chat_completion("hi", model="m")
+
+    assert len(seen) == 1
+    call = seen[0]
+    assert call.model == "m"
+    assert call.endpoint == "https://example.com"
+    assert call.error is None
+    assert call.prompt_tokens == 12
+    assert call.latency >= call.queue_time >= 0
+
+
+def test_failing_hook_warns_without_failing_request(client_env):
+    client_env(["a"])
+
+    def broken(call):
+        raise RuntimeError("tracer down")
+
+    metrics.add_hook(broken)
+    try:
+        with pytest.warns(RuntimeWarning, match="tracer down"):
+            assert chat_completion("hi", model="m")["message"] == "a"
+    finally:
+        metrics.remove_hook(broken)
+
+
+def test_disabled_metrics_without_hooks_skip_measurement(client_env):
+    metrics.set_metrics_enabled(False)
+    assert metrics.probe("m") is None
+    remove = metrics.add_hook(lambda call: None)
+    assert metrics.probe("m") is not None
+    remove()
+    assert metrics.probe("m") is None
+    client_env(["a"])
+    chat_completion("hi", model="m")
+    assert metrics.snapshot() == {}
+
+
+def test_interrupted_call_discards_its_probe(client_env):
+    class Interrupted(BaseException):
+        pass
+
+    client_env([Interrupted()])
+    with pytest.raises(Interrupted):
+        chat_completion("hi", model="m")
+    assert metrics._current_probe.get() is None
+    assert metrics.snapshot() == {}
+
+
+def test_probe_measures_time_to_first_byte():
+    seen = []
+    remove = metrics.add_hook(seen.append)
+    try:
+        probe = metrics.probe("m")
+        probe.attempt("endpoint")
+        metrics.mark_first_byte()
+        probe.succeeded(None)
+        metrics.mark_first_byte()  # no call in progress: ignored
+    finally:
+        remove()
+    assert seen[0].time_to_first_byte is not None
+    assert seen[0].time_to_first_byte <= seen[0].latency
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = metrics.Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == pytest.approx(4.0)
+    assert metrics.Histogram((1.0,)).quantile(0.5) is None
+
+
+def test_prometheus_export(client_env):
+    client_env(["a"])
+    chat_completion("hi", model='m"1')
+    text = metrics.to_prometheus()
+    assert "# TYPE smartmodelrouter_request_latency_seconds histogram" in text
+    assert 'smartmodelrouter_requests_total{model="m\\"1",outcome="success"} 1' in text
+    assert 'smartmodelrouter_prompt_tokens_bucket{model="m\\"1",le="16"} 1' in text
+    assert 'smartmodelrouter_prompt_tokens_bucket{model="m\\"1",le="+Inf"} 1' in text
+    assert 'smartmodelrouter_prompt_tokens_sum{model="m\\"1"} 12' in text
@@ -0,0 +1,61 @@
+import pytest
+
+from smartmodelrouter.llm import chat_completion, chat_completion_stream, reload_config
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.resilience import RetryPolicy
+
+
+def test_reload_config_with_api_key_needs_no_environment(monkeypatch) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("dotenv.load_dotenv", lambda *args, **kwargs: False)
+    with MockOpenAIServer() as server:
+        config = reload_config(api_key="test", base_url=server.base_url)
+        assert config.api_key == "test"
+
+
+def test_chat_completion_against_mock_server(monkeypatch) -> None:
+    with MockOpenAIServer(reply="four", latency=0.01) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        result = chat_completion("what is two plus two", model="mock/model")
+
+    assert result["message"] == "four"
+    assert result["usage"]["prompt_tokens"] == 5
+    assert result["usage"]["completion_tokens"] == 1
+    assert server.requests == 1
+    assert server.delays == [0.01]
+
+
+def test_streaming_chunks_and_usage() -> None:
+    with MockOpenAIServer(reply="the answer is 42") as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        records = list(chat_completion_stream("q", model="mock/model"))
+
+    deltas = [record["content"] for record in records if record["type"] == "delta"]
+    assert deltas == ["the", " answer", " is", " 42"]
+    final = records[-1]
+    assert final["message"] == "the answer is 42"
+    assert final["usage"]["completion_tokens"] == 4
+
+
+def test_injected_errors_are_retried() -> None:
+    with MockOpenAIServer(error_rate=0.5, error_status=429, seed=3) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        policy = RetryPolicy(max_attempts=10, base_delay=0, jitter=0)
+        for _ in range(5):
+            assert chat_completion("q", model="m", retry_policy=policy)["message"] == "42"
+
+    assert server.errors > 0
+    assert server.requests == 5 + server.errors
+
+
+def test_jitter_is_bounded_and_seeded() -> None:
+    first = MockOpenAIServer(latency=0.1, jitter=0.05, seed=1)
+    second = MockOpenAIServer(latency=0.1, jitter=0.05, seed=1)
+    delays = [first._plan()[0] for _ in range(20)]
+    assert delays == [second._plan()[0] for _ in range(20)]
+    assert all(0.05 <= delay <= 0.15 for delay in delays)
+
+
+def test_base_url_requires_running_server() -> None:
+    with pytest.raises(RuntimeError, match="not running"):
+        MockOpenAIServer().base_url
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from smartmodelrouter import llm, perf
+
+
+def test_run_benchmark_reports_every_scenario_and_level(monkeypatch) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    policy = llm._retry_policy
+
+    results = perf.run_benchmark(
+        concurrency=(1, 4),
+        requests=8,
+        latency=0.005,
+        jitter=0.002,
+        trace_memory=True,
+        imports=(),
+    )
+
+    runs = results["results"]
+    assert [(run["scenario"], run["concurrency"]) for run in runs] == [
+        (scenario, level) for scenario in perf.SCENARIOS for level in (1, 4)
+    ]
+    for run in runs:
+        assert run["requests_per_second"] > 0
+        assert set(run["latency"]) == {"p50", "p90", "p99"}
+        assert run["traced_peak_mb"] is not None
+    chat = runs[0]
+    assert chat["server_requests"] == 8
+    assert chat["added_latency"]["p50"] < chat["latency"]["p50"]
+    embed = next(run for run in runs if run["scenario"] == "embed_problem")
+    assert embed["server_requests"] == 0
+    assert results["meta"]["server"]["latency"] == 0.005
+    # Client settings are restored afterwards.
+    assert llm._config is None
+    assert llm._retry_policy is policy
+
+
+def test_unknown_scenario_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown scenarios"):
+        perf.run_benchmark(scenarios=["nope"])
+
+
+def _result(rps, p50, p99):
+    return {
+        "results": [
+            {
+                "scenario": "chat_completion",
+                "concurrency": 8,
+                "requests_per_second": rps,
+                "added_latency": {"p50": p50, "p90": p50, "p99": p99},
+            }
+        ]
+    }
+
+
+def test_compare_results_flags_regressions() -> None:
+    baseline = _result(100.0, 0.002, 0.010)
+    assert perf.compare_results(baseline, _result(95.0, 0.0021, 0.0105)) == []
+    regressions = perf.compare_results(baseline, _result(80.0, 0.003, 0.010))
+    assert len(regressions) == 2
+    assert "req/s" in regressions[0] and "p50" in regressions[1]
+
+    fast_import = {**baseline, "imports": {"smartmodelrouter.llm": 0.1}}
+    slow_import = {**baseline, "imports": {"smartmodelrouter.llm": 0.9}}
+    regressions = perf.compare_results(fast_import, slow_import)
+    assert regressions == ["import smartmodelrouter.llm: 900ms vs 100ms"]
+
+
+def test_cli_saves_and_compares(tmp_path, monkeypatch, capsys) -> None:
+    output = tmp_path / "perf.json"
+    args = ["--scenarios", "chat_completion", "--concurrency", "2", "--requests", "4"]
+    imports = ["--imports", "smartmodelrouter.metrics"]
+    assert perf.main([*args, *imports, "--latency", "0", "--output", str(output)]) == 0
+    saved = json.loads(output.read_text())
+    assert saved["results"][0]["scenario"] == "chat_completion"
+    assert 0 < saved["imports"]["smartmodelrouter.metrics"] < 5
+
+    slower = tmp_path / "slower.json"
+    saved["results"][0]["requests_per_second"] /= 2
+    slower.write_text(json.dumps(saved))
+    assert perf.main(["--compare", str(output), str(slower)]) == 1
+    assert "req/s" in capsys.readouterr().out
@@ -0,0 +1,203 @@
+import asyncio
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from smartmodelrouter.llm import achat_completion, chat_completion, set_provider_registry
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.providers import Endpoint, ProviderRegistry
+from smartmodelrouter.resilience import RetryPolicy
+
+
+def _endpoint(name, server, **kwargs):
+    return Endpoint(name, server.base_url, "test-key", **kwargs)
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = MockOpenAIServer(reply="hi", **kwargs).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def test_endpoint_repr_hides_api_key():
+    endpoint = Endpoint("primary", "https://api.example.com/v1", "sk-secret")
+    assert "sk-secret" not in repr(endpoint)
+    assert "primary" in repr(endpoint)
+
+
+def test_acquire_prefers_least_outstanding():
+    a = Endpoint("a", "https://a.example.com/v1", "k")
+    b = Endpoint("b", "https://b.example.com/v1", "k")
+    registry = ProviderRegistry([a, b])
+
+    first = registry.acquire("m")
+    second = registry.acquire("m")
+    assert {first, second} == {a, b}
+    registry.release(first, ok=True, latency=0.1)
+    assert registry.acquire("m") == first
+
+
+def test_weight_and_latency_shape_choice():
+    fast = Endpoint("fast", "https://a.example.com/v1", "k")
+    slow = Endpoint("slow", "https://b.example.com/v1", "k", weight=2.0)
+    registry = ProviderRegistry([fast, slow])
+    registry.release(registry.acquire("m"), ok=True, latency=1.0)
+    registry.release(registry.acquire("m"), ok=True, latency=1.0)
+    # Equal latency: the endpoint with twice the weight scores lower.
+    assert registry.acquire("m") == slow
+
+
+def test_models_filter_endpoints():
+    a = Endpoint("a", "https://a.example.com/v1", "k", models=("openai/*",))
+    b = Endpoint("b", "https://b.example.com/v1", "k", models=("anthropic/*",))
+    registry = ProviderRegistry([a, b])
+    assert registry.endpoints_for("openai/gpt-4o") == [a]
+    with pytest.raises(RuntimeError, match="No endpoint"):
+        registry.acquire("mistral/large")
+
+
+def test_failed_endpoint_is_ejected_with_growing_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("smartmodelrouter.providers.time.monotonic", lambda: now[0])
+    a = Endpoint("a", "https://a.example.com/v1", "k")
+    b = Endpoint("b", "https://b.example.com/v1", "k")
+    registry = ProviderRegistry([a, b], cooldown=10.0)
+
+    registry.release(registry.acquire("m"), ok=False)
+    assert registry.snapshot()["a"]["ejected"]
+    for _ in range(3):
+        endpoint = registry.acquire("m")
+        assert endpoint == b
+        registry.release(endpoint, ok=True, latency=0.1)
+
+    now[0] += 11.0
+    assert not registry.snapshot()["a"]["ejected"]
+    registry.release(a, ok=False)
+    now[0] += 11.0
+    assert registry.snapshot()["a"]["ejected"]  # second failure doubled the cooldown
+    now[0] += 10.0
+    assert not registry.snapshot()["a"]["ejected"]
+
+
+def test_abandoned_request_keeps_the_ejection():
+    registry = ProviderRegistry([Endpoint("a", "https://a.example.com/v1", "k")], eject_after=1)
+    endpoint = registry.acquire("m")
+    registry.release(endpoint, False, 0.5)
+    endpoint = registry.acquire("m")
+    registry.release(endpoint, None)
+    assert registry.snapshot()["a"] == {
+        "inflight": 0,
+        "latency": None,
+        "failures": 1,
+        "ejected": True,
+    }
+
+
+def test_all_ejected_uses_soonest_recovery(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("smartmodelrouter.providers.time.monotonic", lambda: now[0])
+    a = Endpoint("a", "https://a.example.com/v1", "k")
+    b = Endpoint("b", "https://b.example.com/v1", "k")
+    registry = ProviderRegistry([a, b], cooldown=10.0)
+    registry.release(a, ok=False)
+    now[0] = 5.0
+    registry.release(b, ok=False)
+    assert registry.acquire("m") == a
+
+
+def test_from_file_toml_and_json(tmp_path, monkeypatch):
+    monkeypatch.setenv("KEY_B", "secret-b")
+    toml_path = tmp_path / "providers.toml"
+    toml_path.write_text(
+        "cooldown = 5\n"
+        "[[endpoints]]\n"
+        'name = "a"\n'
+        'base_url = "https://a.example.com/v1"\n'
+        'api_key = "secret-a"\n'
+        "weight = 2\n"
+        'models = ["openai/*"]\n'
+        "[endpoints.client]\n"
+        "max_connections = 8\n"
+        "[[endpoints]]\n"
+        'name = "b"\n'
+        'base_url = "https://b.example.com/v1"\n'
+        'api_key_env = "KEY_B"\n'
+    )
+    registry = ProviderRegistry.from_file(toml_path)
+    a, b = registry.endpoints
+    assert registry.cooldown == 5
+    assert (a.weight, a.models, dict(a.client_settings)) == (2.0, ("openai/*",), {"max_connections": 8})
+    assert b.api_key == "secret-b"
+
+    json_path = tmp_path / "providers.json"
+    json_path.write_text(
+        json.dumps({"endpoints": [{"name": "a", "base_url": "https://a.example.com/v1", "api_key": "k"}]})
+    )
+    assert [e.name for e in ProviderRegistry.from_file(json_path).endpoints] == ["a"]
+
+    monkeypatch.delenv("KEY_B")
+    with pytest.raises(RuntimeError, match="Missing API key"):
+        ProviderRegistry.from_file(toml_path)
+
+
+def test_chat_completion_spreads_load_across_endpoints(servers, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    first = servers()
+    second = servers()
+    registry = ProviderRegistry([_endpoint("a", first), _endpoint("b", second)])
+    set_provider_registry(registry)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: chat_completion("hi", model="m"), range(40)))
+
+    assert all(result["message"] == "hi" for result in results)
+    assert first.requests + second.requests == 40
+    assert first.requests and second.requests
+    assert all(stats["inflight"] == 0 for stats in registry.snapshot().values())
+
+
+def test_chat_completion_fails_over_and_ejects_bad_endpoint(servers):
+    good = servers()
+    bad = servers(error_rate=1.0)
+    registry = ProviderRegistry([_endpoint("bad", bad), _endpoint("good", good)], cooldown=60.0)
+    set_provider_registry(registry)
+    policy = RetryPolicy(max_attempts=3, base_delay=0, jitter=0)
+
+    outcomes = Counter(
+        chat_completion("hi", model="m", retry_policy=policy)["message"] for _ in range(5)
+    )
+
+    assert outcomes == {"hi": 5}
+    assert bad.requests == 1
+    assert good.requests == 5
+    assert registry.snapshot()["bad"]["ejected"]
+
+
+def test_cancelled_attempt_releases_its_endpoint(servers):
+    slow = servers(latency=5.0)
+    registry = ProviderRegistry([_endpoint("slow", slow)])
+    set_provider_registry(registry)
+
+    async def main():
+        task = asyncio.create_task(achat_completion("hi", model="m"))
+        while slow.requests == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    stats = registry.snapshot()["slow"]
+    assert stats["inflight"] == 0
+    # A cancellation says nothing about the endpoint's health or speed.
+    assert stats["latency"] is None
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import socket
+import time
+
+import httpx
+import numpy as np
+import pytest
+from openai import OpenAI
+
+from smartmodelrouter.bandit import OnlineRouter
+from smartmodelrouter.embeddings import embed_texts
+from smartmodelrouter.llm import reload_config
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.proxy import DECISION_HEADER, MODEL_HEADER, RoutingProxy
+from smartmodelrouter.routing import RoutingIndex
+
+
+def _echo(body):
+    return f"{body['model']} saw {len(body['messages'])} messages"
+
+
+@pytest.fixture
+def upstream():
+    with MockOpenAIServer(reply=_echo) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        yield server
+
+
+def _request(prompt, **extra):
+    return {"model": "auto", "messages": [{"role": "user", "content": prompt}], **extra}
+
+
+def test_forwards_conversation_to_routed_model(upstream):
+    with RoutingProxy(lambda prompt: "math-model" if "+" in prompt else "other") as proxy:
+        body = _request("What is 2 + 2?", temperature=0, max_tokens=5)
+        body["messages"].insert(0, {"role": "system", "content": "Be brief."})
+        response = httpx.post(f"{proxy.base_url}/chat/completions", json=body)
+
+    assert response.status_code == 200
+    completion = response.json()
+    assert completion["choices"][0]["message"]["content"] == "math-model saw 2 messages"
+    assert completion["model"] == "math-model"
+    assert response.headers[MODEL_HEADER] == "math-model"
+    decision = json.loads(response.headers[DECISION_HEADER])
+    assert decision["requested"] == "auto"
+    assert decision["router"] == "custom"
+    assert proxy.stats()["requests"] == 1
+
+
+def test_streams_server_sent_events_to_openai_client(upstream):
+    with RoutingProxy(default_model="streamer") as proxy:
+        client = OpenAI(base_url=proxy.base_url, api_key="unused")
+        chunks = list(
+            client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": "hi"}],
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        )
+        # The connection is reused for the next request.
+        again = client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": "hi"}]
+        )
+        client.close()
+
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert text == "streamer saw 1 messages"
+    assert chunks[-2].choices[0].finish_reason == "stop"
+    assert chunks[-1].usage.total_tokens > 0
+    assert again.choices[0].message.content == text
+
+
+def test_routes_by_index_and_passthrough(upstream):
+    prompts = ["What is 2 + 2?", "Write a poem about the sea"]
+    index = RoutingIndex(
+        embed_texts(prompts), ["calc", "poet"], np.array([[1.0, 0.0], [0.0, 1.0]])
+    )
+    with RoutingProxy(index, k=1, passthrough=True) as proxy:
+        url = f"{proxy.base_url}/chat/completions"
+        routed = httpx.post(url, json=_request("Write a poem about the sea"))
+        pinned = httpx.post(url, json={**_request("What is 2 + 2?"), "model": "poet"})
+        models = httpx.get(f"{proxy.base_url}/models").json()
+
+    assert routed.headers[MODEL_HEADER] == "poet"
+    decision = json.loads(routed.headers[DECISION_HEADER])
+    assert decision["router"] == "index"
+    assert decision["scores"] == {"calc": 0.0, "poet": 1.0}
+    assert pinned.headers[MODEL_HEADER] == "poet"
+    assert json.loads(pinned.headers[DECISION_HEADER])["router"] == "passthrough"
+    assert [model["id"] for model in models["data"]] == ["calc", "poet"]
+
+
+def test_reports_outcomes_to_online_router(upstream):
+    router = OnlineRouter(["a", "b"], seed=0)
+    with RoutingProxy(router) as proxy:
+        for _ in range(3):
+            response = httpx.post(f"{proxy.base_url}/chat/completions", json=_request("hi"))
+            assert response.status_code == 200
+    assert sum(stats["pulls"] for stats in router.stats().values()) == 3
+
+
+def test_stream_passes_the_upstream_finish_reason_through(upstream):
+    with RoutingProxy(default_model="streamer") as proxy:
+        client = OpenAI(base_url=proxy.base_url, api_key="unused")
+        chunks = list(
+            client.chat.completions.create(
+                model="auto",
+                messages=[{"role": "user", "content": "hi"}],
+                max_tokens=2,
+                stream=True,
+            )
+        )
+        client.close()
+
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+    assert text == "streamer saw"
+    assert chunks[-1].choices[0].finish_reason == "length"
+
+
+def test_client_disconnect_mid_stream_is_reported_as_failure(monkeypatch):
+    router = OnlineRouter(["a", "b"], seed=0)
+    rewards = []
+    report = router.report
+
+    def spy(decision, reward, **kwargs):
+        rewards.append(reward)
+        report(decision, reward, **kwargs)
+
+    monkeypatch.setattr(router, "report", spy)
+    body = json.dumps(_request("hi", stream=True)).encode()
+    with MockOpenAIServer(reply=" ".join(["word"] * 200), token_delay=0.01) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        with RoutingProxy(router) as proxy:
+            with socket.create_connection((proxy.host, proxy.port)) as conn:
+                conn.sendall(
+                    b"POST /v1/chat/completions HTTP/1.1\r\nHost: proxy\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                assert conn.recv(4096).startswith(b"HTTP/1.1 200")
+            deadline = time.monotonic() + 5
+            while not rewards and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+    assert rewards == [0.0]
+
+
+def test_rejects_requests_beyond_the_pending_limit():
+    async def main(proxy):
+        async with httpx.AsyncClient(base_url=proxy.base_url) as client:
+            responses = await asyncio.gather(
+                *(client.post("/chat/completions", json=_request("hi")) for _ in range(3))
+            )
+            health = await client.get(f"http://{proxy.host}:{proxy.port}/health")
+        return responses, health.json()
+
+    async def serve():
+        async with RoutingProxy(max_concurrency=1, max_pending=1) as proxy:
+            return await main(proxy)
+
+    with MockOpenAIServer(latency=0.2) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        responses, health = asyncio.run(serve())
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 503]
+    rejected = next(response for response in responses if response.status_code == 503)
+    assert rejected.headers["retry-after"] == "1"
+    assert rejected.json()["error"]["type"] == "overloaded"
+    assert server.requests == 2
+    assert health["rejected"] == 1 and health["active"] == 0
+
+
+def test_errors_use_openai_shape(upstream):
+    upstream.error_rate = 1.0
+    upstream.error_status = 400
+    with RoutingProxy(default_model="m") as proxy:
+        url = f"{proxy.base_url}/chat/completions"
+        failed = httpx.post(url, json=_request("hi"))
+        failed_stream = httpx.post(url, json=_request("hi", stream=True))
+        malformed = httpx.post(url, content=b"{not json")
+        empty = httpx.post(url, json={"model": "auto", "messages": []})
+        missing = httpx.get(f"{proxy.base_url}/nothing")
+
+    assert failed.status_code == failed_stream.status_code == 400
+    assert failed.headers[MODEL_HEADER] == "m"
+    assert failed.json()["error"]["type"] == "upstream_error"
+    assert malformed.status_code == empty.status_code == 400
+    assert missing.status_code == 404
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from smartmodelrouter import llm
+from smartmodelrouter.llm import achat_completion, chat_completion, reload_config
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.ratelimit import (
+    RateLimit,
+    RateLimiter,
+    TokenBucket,
+    estimate_tokens,
+)
+from smartmodelrouter.resilience import RetryPolicy
+
+
+def _drain(limiter, model, key=None, count=None):
+    limit = limiter.limits.get(model, limiter.default)
+    for _ in range(int(count or limit.rpm)):
+        limiter.acquire(model, 1, key=key)
+
+
+def test_token_bucket_refills_continuously():
+    bucket = TokenBucket(60, now=0.0)
+    bucket.take(60)
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now=1.0) == 0
+    # Requests larger than the bucket only wait for a full bucket.
+    assert bucket.wait_time(1000, now=1.0) == pytest.approx(59.0)
+    bucket.pause(now=1.0, delay=2.0)
+    assert bucket.level == 0
+    assert bucket.wait_time(1, now=2.0) == pytest.approx(2.0)
+    assert bucket.wait_time(1, now=4.0) == pytest.approx(0.0)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+def test_rate_limit_validation():
+    with pytest.raises(ValueError):
+        RateLimit(rpm=0)
+
+
+def test_unlimited_models_are_admitted_immediately():
+    limiter = RateLimiter({"slow": RateLimit(rpm=1)})
+    permit = limiter.acquire("fast", 10_000)
+    assert permit.limiter is None
+    permit.settle(5)
+
+
+def test_requests_wait_for_rpm_capacity():
+    limiter = RateLimiter({"m": RateLimit(rpm=600)})
+    _drain(limiter, "m")
+    started = time.perf_counter()
+    limiter.acquire("m", 1)
+    limiter.acquire("m", 1)
+    assert 0.15 <= time.perf_counter() - started < 1.0
+    # Other models are not held back.
+    started = time.perf_counter()
+    limiter.acquire("other", 1)
+    assert time.perf_counter() - started < 0.05
+
+
+def test_key_limits_are_shared_by_models():
+    limiter = RateLimiter(key_limits={"k": RateLimit(rpm=600)})
+    for model in ("a", "b") * 300:
+        limiter.acquire(model, 1, key="k")
+    started = time.perf_counter()
+    limiter.acquire("c", 1, key="k")
+    assert time.perf_counter() - started >= 0.05
+    limiter.acquire("c", 1, key="other")
+
+
+def test_waiters_are_admitted_by_priority():
+    limiter = RateLimiter({"m": RateLimit(rpm=600)})
+    _drain(limiter, "m")
+    admitted = []
+    threads = [
+        threading.Thread(
+            target=lambda p=priority: (limiter.acquire("m", 1, priority=p), admitted.append(p))
+        )
+        for priority in (5, 1, 3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted == [1, 3, 5]
+
+
+def test_async_waiters_are_admitted_by_priority():
+    limiter = RateLimiter({"m": RateLimit(rpm=600)})
+    _drain(limiter, "m")
+    admitted = []
+
+    async def request(priority):
+        await limiter.aacquire("m", 1, priority=priority)
+        admitted.append(priority)
+
+    async def main():
+        await asyncio.gather(*(request(priority) for priority in (4, 0, 2, 1)))
+
+    asyncio.run(main())
+    assert admitted == [0, 1, 2, 4]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = RateLimiter({"m": RateLimit(rpm=60)})
+    _drain(limiter, "m")
+
+    async def main():
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(limiter.aacquire("m", 1), 0.05)
+
+    asyncio.run(main())
+    assert limiter._waiters == []
+
+
+def test_settle_corrects_token_reservation():
+    limiter = RateLimiter({"m": RateLimit(tpm=6000)})
+    permit = limiter.acquire("m", 5000)
+    bucket = permit.tokens[0]
+    assert bucket.level == pytest.approx(1000, abs=1)
+    permit.settle(200)
+    assert bucket.level == pytest.approx(5800, abs=1)
+    permit.settle(None)
+    assert bucket.level == pytest.approx(5800, abs=1)
+
+
+def test_throttle_holds_back_later_requests():
+    limiter = RateLimiter({"m": RateLimit(rpm=6000)})
+    permit = limiter.acquire("m", 1)
+    permit.throttle(0.1)
+    started = time.perf_counter()
+    limiter.acquire("m", 1)
+    assert time.perf_counter() - started >= 0.1
+
+
+@pytest.fixture
+def server():
+    with MockOpenAIServer() as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        yield server
+
+
+def test_chat_completion_respects_limiter(server):
+    limiter = RateLimiter({"m": RateLimit(rpm=600, tpm=1_000_000)})
+    llm.set_rate_limiter(limiter)
+    _drain(limiter, "m", key=server.base_url)
+    started = time.perf_counter()
+    result = chat_completion("2 + 2?", model="m", max_tokens=100)
+    assert time.perf_counter() - started >= 0.05
+    assert result["message"] == "42"
+    # The token reservation was corrected to the reported usage.
+    bucket = limiter._buckets[("model", server.base_url, "m", "tpm")]
+    assert bucket.capacity - bucket.level < 100
+
+
+def test_achat_completion_respects_limiter(server):
+    limiter = RateLimiter({"m": RateLimit(rpm=600)})
+    llm.set_rate_limiter(limiter)
+    _drain(limiter, "m", key=server.base_url)
+
+    async def main():
+        return await asyncio.gather(
+            *(achat_completion("2 + 2?", model="m", priority=i) for i in range(3))
+        )
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    assert time.perf_counter() - started >= 0.2
+    assert [result["message"] for result in results] == ["42"] * 3
+
+
+def test_failed_requests_refund_their_token_reservation(server):
+    server.error_rate = 1.0
+    limiter = RateLimiter({"m": RateLimit(tpm=1_000_000)})
+    llm.set_rate_limiter(limiter)
+    policy = RetryPolicy(max_attempts=3, base_delay=0, jitter=0)
+    with pytest.raises(RuntimeError):
+        chat_completion("2 + 2?", model="m", max_tokens=10_000, retry_policy=policy)
+    assert server.requests == 3
+    bucket = limiter._buckets[("model", server.base_url, "m", "tpm")]
+    assert bucket.level == pytest.approx(bucket.capacity, abs=1)
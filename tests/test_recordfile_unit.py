@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from smartmodelrouter import recordfile
+from smartmodelrouter.datasets import load_dataset
+from smartmodelrouter.recordfile import RecordFile, index_path, iter_records
+
+ENTRIES = [
+    {"question": "What is 15 divided by 3?", "answer": "5"},
+    {"question": "Größe von π? «ok»", "answer": "3.14", "tags": ["a", {"b": [1, 2]}]},
+    {"question": "Escaped \"quotes\", commas, ] and [", "answer": "-1e3"},
+    {"question": "x" * 50, "answer": 12345678901234567890},
+]
+
+
+@pytest.fixture(params=["array", "jsonl"])
+def data_file(request, tmp_path):
+    if request.param == "array":
+        path = tmp_path / "problems.json"
+        path.write_text(json.dumps(ENTRIES, indent=2, ensure_ascii=False), encoding="utf-8")
+    else:
+        path = tmp_path / "problems.jsonl"
+        lines = [json.dumps(entry, ensure_ascii=False) for entry in ENTRIES]
+        path.write_text("\n".join(lines[:2]) + "\n\n" + "\r\n".join(lines[2:]), encoding="utf-8")
+    return path
+
+
+def test_iter_records_streams_entries(data_file):
+    assert list(iter_records(data_file)) == ENTRIES
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_array_parser_handles_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "values.json"
+    values = [1234567, "é" * 5, {"k": [1.5, None, True]}, [], -0.25, ENTRIES[1]]
+    path.write_text(" [ " + " ,\n".join(json.dumps(v, ensure_ascii=False) for v in values) + " ]")
+    spans = list(recordfile._spans(path, chunk_size=chunk_size))
+    assert [value for _, _, value in spans] == values
+    raw = path.read_bytes()
+    assert [json.loads(raw[start:end]) for start, end, _ in spans] == values
+
+
+def test_malformed_array_raises(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[{"a": 1} {"b": 2}]')
+    with pytest.raises(ValueError):
+        list(iter_records(path))
+    path.write_text('[{"a": 1}, {"b": ')
+    with pytest.raises(ValueError):
+        list(iter_records(path))
+
+
+def test_record_file_random_access(data_file):
+    with RecordFile(data_file) as records:
+        assert len(records) == len(ENTRIES)
+        assert records[1] == ENTRIES[1]
+        assert records[-1] == ENTRIES[-1]
+        assert records[1:3] == ENTRIES[1:3]
+        assert list(records) == ENTRIES
+        with pytest.raises(IndexError):
+            records[len(ENTRIES)]
+    assert index_path(data_file).exists()
+
+
+def test_index_is_reused_and_rebuilt_when_the_file_changes(data_file, monkeypatch):
+    RecordFile(data_file)
+    scans = []
+    original = recordfile._scan_offsets
+    monkeypatch.setattr(
+        recordfile, "_scan_offsets", lambda path: scans.append(path) or original(path)
+    )
+    assert RecordFile(data_file)[2] == ENTRIES[2]
+    assert scans == []
+
+    data_file.write_text(json.dumps(ENTRIES[:2]), encoding="utf-8")
+    records = RecordFile(data_file)
+    assert len(scans) == 1
+    assert list(records) == ENTRIES[:2]
+
+
+def test_unwritable_index_falls_back_to_memory(data_file, tmp_path):
+    records = RecordFile(data_file, index=tmp_path / "missing" / "problems.idx")
+    assert records[3] == ENTRIES[3]
+    assert not (tmp_path / "missing").exists()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    path.write_bytes(b"")
+    records = RecordFile(path)
+    assert len(records) == 0
+    with pytest.raises(IndexError):
+        records[0]
+
+
+def test_load_dataset_opens_files_lazily(data_file, monkeypatch):
+    monkeypatch.setattr(
+        "smartmodelrouter.datasets._fetch",
+        lambda dataset: pytest.fail("file datasets must not hit the network"),
+    )
+    questions = load_dataset(str(data_file))
+    assert isinstance(questions, RecordFile)
+    assert questions[0] == ENTRIES[0]
+    assert load_dataset(str(data_file)) is questions
+
+    data_file.write_text(json.dumps(ENTRIES[:1]), encoding="utf-8")
+    os.utime(data_file, ns=(0, 0))
+    reloaded = load_dataset(str(data_file))
+    assert reloaded is not questions
+    assert len(reloaded) == 1
@@ -0,0 +1,187 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from smartmodelrouter import llm
+from smartmodelrouter.llm import (
+    achat_completion,
+    chat_completion,
+    configure_circuit_breakers,
+    reload_config,
+)
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def _status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://example.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("error", response=response, body=None)
+
+
+def _scripted_client(script, calls):
+    """Return a client class whose ``create`` follows ``script`` per model."""
+
+    class DummyClient:
+        base_url = "https://example.com/v1/"
+
+        def __init__(self, *args, **kwargs):
+            self.chat = self.Chat()
+
+        class Chat:
+            def __init__(self):
+                self.completions = self.Completions()
+
+            class Completions:
+                def create(self, **kwargs):
+                    calls.append(kwargs["model"])
+                    outcome = script(kwargs["model"], len(calls))
+                    if isinstance(outcome, Exception):
+                        raise outcome
+
+                    class Msg:
+                        content = outcome
+
+                    class Choice:
+                        message = Msg()
+
+                    class Completion:
+                        choices = [Choice()]
+                        usage = {}
+
+                    return Completion()
+
+    return DummyClient
+
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.com/v1")
+    sleeps = []
+    monkeypatch.setattr("smartmodelrouter.llm.time.sleep", sleeps.append)
+    return sleeps
+
+
+def test_backoff_is_jittered_exponential_and_capped(monkeypatch):
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, multiplier=2.0, max_delay=5.0, jitter=0.2)
+    delays = [policy.next_delay(attempt, None, started=0.0) for attempt in range(4)]
+    for delay, expected in zip(delays, [1, 2, 4, 5]):
+        assert expected * 0.8 <= delay <= expected * 1.2
+    assert policy.next_delay(9, None, started=0.0) is None
+
+
+def test_backoff_honours_retry_after_and_deadline(monkeypatch):
+    monkeypatch.setattr("smartmodelrouter.resilience.time.monotonic", lambda: 100.0)
+    policy = RetryPolicy(jitter=0.0, deadline=10.0)
+    seconds = _status_error(RateLimitError, 429, {"Retry-After": "7"})
+    millis = _status_error(RateLimitError, 429, {"retry-after-ms": "2500"})
+
+    assert policy.next_delay(0, seconds, started=100.0) == 7.0
+    assert policy.next_delay(0, millis, started=100.0) == 2.5
+    # 7s of Retry-After would end past the 10s deadline after 5s elapsed.
+    assert policy.next_delay(0, seconds, started=95.0) is None
+
+
+def test_retryable_errors():
+    policy = RetryPolicy()
+    assert policy.is_retryable(_status_error(RateLimitError, 429))
+    assert policy.is_retryable(httpx.ConnectError("down"))
+    assert not policy.is_retryable(_status_error(BadRequestError, 400))
+    assert not policy.is_retryable(ValueError("bug"))
+
+
+def test_circuit_breaker_transitions(monkeypatch):
+    now = {"t": 0.0}
+    monkeypatch.setattr("smartmodelrouter.resilience.time.monotonic", lambda: now["t"])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10.0)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now["t"] = 10.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now["t"] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_chat_completion_retries_rate_limits_with_retry_after(monkeypatch, fake_env):
+    calls = []
+
+    def script(model, n):
+        return _status_error(RateLimitError, 429, {"Retry-After": "3"}) if n == 1 else "ok"
+
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _scripted_client(script, calls))
+    result = chat_completion("hi", model="m")
+    assert result["message"] == "ok"
+    assert fake_env == [3.0]
+
+
+def test_chat_completion_does_not_retry_client_errors(monkeypatch, fake_env):
+    calls = []
+
+    def script(model, n):
+        return _status_error(BadRequestError, 400)
+
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _scripted_client(script, calls))
+    with pytest.raises(BadRequestError):
+        chat_completion("hi", model="m")
+    assert calls == ["m"]
+
+
+def test_open_breaker_fails_fast_or_uses_fallback(monkeypatch, fake_env):
+    calls = []
+
+    def script(model, n):
+        return httpx.ConnectError("down") if model == "flaky" else f"from {model}"
+
+    monkeypatch.setattr("smartmodelrouter.llm.OpenAI", _scripted_client(script, calls))
+    configure_circuit_breakers(failure_threshold=2, recovery_timeout=60.0)
+    with pytest.raises(RuntimeError, match="Failed to retrieve completion"):
+        chat_completion("hi", model="flaky")
+    calls.clear()
+    with pytest.raises(CircuitOpenError):
+        chat_completion("hi", model="flaky")
+    assert calls == []
+
+    configure_circuit_breakers(
+        failure_threshold=2, recovery_timeout=60.0, fallbacks={"flaky": "steady"}
+    )
+    with pytest.raises(RuntimeError):
+        chat_completion("hi", model="flaky")
+    result = chat_completion("hi", model="flaky")
+    assert result["message"] == "from steady"
+    assert result["model"] == "steady"
+
+
+def test_cancelled_half_open_trial_is_released():
+    configure_circuit_breakers(failure_threshold=1, recovery_timeout=0.0)
+    with MockOpenAIServer(latency=5.0) as server:
+        reload_config(api_key="test", base_url=server.base_url)
+        breaker = llm._breakers.get("m", server.base_url)
+        breaker.record_failure()
+
+        async def main():
+            task = asyncio.create_task(achat_completion("hi", model="m"))
+            while server.requests == 0:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import pytest
+
+from smartmodelrouter.benchmark import aevaluate_model, evaluate_model, evaluate_suite
+from smartmodelrouter.results import ResultSink
+
+
+def _record(run, message="4", model="m"):
+    return {
+        "model": model,
+        "dataset": "math",
+        "index": 0,
+        "run": run,
+        "message": message,
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+        "latency": 0.5,
+        "correct": message == "4",
+        "problem": "not persisted",
+    }
+
+
+@pytest.fixture
+def one_problem(monkeypatch):
+    monkeypatch.setattr(
+        "smartmodelrouter.benchmark._load_dataset",
+        lambda dataset: [{"question": "What is 2+2?", "answer": "4"}],
+    )
+
+
+def test_sink_appends_and_reopens(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    with ResultSink(path) as sink:
+        sink.write(_record(0))
+        sink.write(_record(1, "5"))
+        assert sink.get(("m", "math", 0, 1))["message"] == "5"
+
+    with ResultSink(path) as sink:
+        assert sink.completed() == {("m", "math", 0, 0), ("m", "math", 0, 1)}
+        records = list(sink.records())
+    assert [record["run"] for record in records] == [0, 1]
+    assert "problem" not in records[0]
+    assert records[0]["usage"]["total_tokens"] == 4
+
+
+def test_sink_discards_partial_last_line(tmp_path):
+    path = tmp_path / "runs.jsonl"
+    with ResultSink(path) as sink:
+        sink.write(_record(0))
+    with path.open("ab") as fh:
+        fh.write(b'{"model": "m", "dataset": "ma')
+
+    with ResultSink(path) as sink:
+        assert len(sink) == 1
+        sink.write(_record(1))
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["run"] for line in lines] == [0, 1]
+
+
+def test_evaluate_model_resumes_from_checkpoint(tmp_path, monkeypatch, one_problem):
+    calls = []
+
+    def fake_chat(prompt, model, max_tokens=1024, temperature=0):
+        calls.append(prompt)
+        if len(calls) == 2:
+            raise RuntimeError("crash")
+        return {"message": "4", "usage": {"total_tokens": 1}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.chat_completion", fake_chat)
+    path = tmp_path / "runs.jsonl"
+    with ResultSink(path) as sink, pytest.raises(RuntimeError):
+        evaluate_model("m", "math", 0, runs=3, sink=sink)
+
+    with ResultSink(path) as sink:
+        result = evaluate_model("m", "math", 0, runs=3, sink=sink)
+        assert len(sink) == 3
+    assert len(calls) == 4  # run 0 was not repeated
+    assert result["correct"] == 3
+    assert result["responses"] == ["4", "4", "4"]
+
+
+def test_aevaluate_model_skips_recorded_runs(tmp_path, monkeypatch, one_problem):
+    calls = []
+
+    async def fake_achat(prompt, model, max_tokens=1024, temperature=0):
+        calls.append(prompt)
+        return {"message": "3", "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.achat_completion", fake_achat)
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        sink.write(_record(1))
+        result = asyncio.run(aevaluate_model("m", "math", 0, runs=3, sink=sink))
+        assert sink.get(("m", "math", 0, 2))["latency"] is not None
+    assert len(calls) == 2
+    assert result["responses"] == ["3", "4", "3"]
+    assert result["correct"] == 1
+
+
+def test_evaluate_suite_resumes_and_aggregates(tmp_path, monkeypatch, one_problem):
+    calls = []
+
+    def fake_chat(prompt, model, max_tokens=1024, temperature=0):
+        calls.append(model)
+        return {"message": "4", "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.chat_completion", fake_chat)
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        sink.write(_record(0, "5", model="a"))
+        seen = []
+        suite = evaluate_suite(
+            ["a", "b"], ["math"], runs=2, sink=sink, on_result=seen.append
+        )
+        assert len(sink) == 4
+
+    assert sorted(calls) == ["a", "b", "b"]
+    assert len(seen) == 4
+    assert suite["results"]["a"]["math"][0]["responses"] == ["5", "4"]
+    assert suite["overall"] == {"a": 0.5, "b": 1.0}
+    # Suite rows report calls like evaluate_model; restored runs are free.
+    assert suite["results"]["a"]["math"][0]["calls"] == 1
+    assert suite["results"]["b"]["math"][0]["calls"] == 2
+    assert suite["results"]["a"]["math"][0]["stopped"] is None
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        for run in range(5):
+            sink.write(_record(run))
+        sink.to_parquet(tmp_path / "runs.parquet", batch_size=2)
+        assert sink.to_arrow().num_rows == 5
+    table = pq.read_table(tmp_path / "runs.parquet")
+    assert table.num_rows == 5
+    assert table.column("total_tokens").to_pylist() == [4] * 5
+
+
+def test_arrow_export_requires_pyarrow(tmp_path, monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_pyarrow(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_pyarrow)
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        with pytest.raises(ImportError, match="smartmodelrouter\\[parquet\\]"):
+            sink.to_arrow()
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from smartmodelrouter.routing import RoutingIndex
+
+
+def _clustered_index(rows_per_cluster=50, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((2, dim))
+    embeddings = np.vstack(
+        [center + 0.05 * rng.standard_normal((rows_per_cluster, dim)) for center in centers]
+    )
+    # "fast" is great on cluster 0 and poor on cluster 1; "slow" the opposite.
+    accuracy = np.zeros((2 * rows_per_cluster, 2))
+    accuracy[:rows_per_cluster] = [0.9, 0.2]
+    accuracy[rows_per_cluster:] = [0.1, 0.8]
+    return RoutingIndex(embeddings, ["fast", "slow"], accuracy), centers
+
+
+def test_route_embedding_votes_with_nearest_problems():
+    index, centers = _clustered_index()
+    assert index.route_embedding(centers[0], k=5) == "fast"
+    assert index.route_embedding(centers[1], k=5) == "slow"
+
+    rows, sims = index.nearest(centers[1], k=5)
+    assert len(rows) == 5
+    assert (rows >= 50).all()
+    assert np.all(np.diff(sims) <= 0)
+
+
+def test_scores_apply_cost_penalty_and_ignore_missing_accuracy():
+    embeddings = np.eye(3)
+    accuracy = np.array([[0.9, 0.8, np.nan], [0.9, 0.8, np.nan], [0.9, 0.8, np.nan]])
+    cost = np.array([[1.0, 0.1, 0.0]] * 3)
+    index = RoutingIndex(embeddings, ["big", "small", "unseen"], accuracy, cost)
+
+    scores = index.scores(np.array([1.0, 0.0, 0.0]), k=3, cost_weight=0.5)
+    assert set(scores) == {"big", "small"}
+    assert index.route_embedding(np.array([1.0, 0.0, 0.0]), k=3) == "big"
+    assert index.route_embedding(np.array([1.0, 0.0, 0.0]), k=3, cost_weight=0.5) == "small"
+
+
+def test_lsh_search_finds_the_same_cluster():
+    index, centers = _clustered_index(rows_per_cluster=200)
+    index.enable_lsh(n_bits=8, n_tables=4)
+
+    rows, _ = index.nearest(centers[0], k=10)
+    exact_rows, _ = index.nearest(centers[0], k=10, approximate=False)
+    assert (rows < 200).all()
+    assert len(set(rows) & set(exact_rows)) >= 8
+    assert index.route_embedding(centers[1], k=10) == "slow"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index, centers = _clustered_index()
+    index.enable_lsh(n_bits=8, n_tables=2)
+    index.save(tmp_path / "index")
+
+    loaded = RoutingIndex.load(tmp_path / "index")
+    assert loaded.models == ["fast", "slow"]
+    assert loaded.keys == index.keys
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+    np.testing.assert_array_equal(
+        loaded.nearest(centers[0], k=5)[0], index.nearest(centers[0], k=5)[0]
+    )
+
+
+def test_from_suite_joins_embeddings_with_accuracy(monkeypatch):
+    questions = {
+        "math": [{"question": "add two numbers"}, {"question": "multiply two numbers"}],
+        "coding": [{"question": "write a python function"}],
+    }
+    monkeypatch.setattr("smartmodelrouter.embeddings._load_dataset", questions.__getitem__)
+
+    def result(correct):
+        return {"model": "", "runs": 2, "correct": correct, "responses": [], "problem": ""}
+
+    suite = {
+        "results": {
+            "a": {"math": {0: result(2), 1: result(1)}, "coding": {0: result(0)}},
+            "b": {"math": {0: result(0)}, "coding": {0: result(2)}},
+        }
+    }
+    index = RoutingIndex.from_suite(suite, model_costs={"a": 0.01})
+
+    assert index.keys == ["coding/0", "math/0", "math/1"]
+    assert index.embeddings.dtype == np.float32
+    assert index.embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(index.accuracy[:, 0], [0.0, 1.0, 0.5])
+    assert np.isnan(index.accuracy[2, 1])
+    np.testing.assert_allclose(index.cost[:, 0], 0.01)
+    assert index.route("write a python function", k=1) == "b"
+
+
+def test_constructor_validates_shapes():
+    with pytest.raises(ValueError, match="must have shape"):
+        RoutingIndex(np.eye(2), ["a"], np.zeros((3, 1)))
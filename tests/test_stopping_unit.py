@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from smartmodelrouter.benchmark import aevaluate_model, evaluate_model
+from smartmodelrouter.results import ResultSink
+from smartmodelrouter.stopping import EarlyStopping, wilson_interval
+
+
+@pytest.fixture
+def one_problem(monkeypatch):
+    monkeypatch.setattr(
+        "smartmodelrouter.benchmark._load_dataset",
+        lambda dataset: [{"question": "What is 2+2?", "answer": "4"}],
+    )
+
+
+def _scripted_chat(monkeypatch, messages):
+    calls = []
+
+    def fake_chat(prompt, model, max_tokens=1024, temperature=0):
+        calls.append(prompt)
+        return {"message": messages[len(calls) - 1], "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.chat_completion", fake_chat)
+    return calls
+
+
+def test_wilson_interval_matches_reference():
+    low, high = wilson_interval(8, 10)
+    assert low == pytest.approx(0.4902, abs=1e-4)
+    assert high == pytest.approx(0.9433, abs=1e-4)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(10, 10)
+    assert high == 1.0 and low == pytest.approx(0.7225, abs=1e-4)
+
+
+def test_check_rules():
+    rule = EarlyStopping(identical_runs=3, min_runs=3, max_width=0.3)
+    assert rule.check(["4", "4"], 2) is None
+    assert rule.check(["4", "4", "4"], 3) == "identical"
+    assert rule.check(["4", "5", "4"], 2) is None
+    # Only the leading responses collapse the rest.
+    assert rule.check(["4", "5", "4", "4"], 3) is None
+
+    wilson = EarlyStopping(identical_runs=None, min_runs=1, max_width=0.3)
+    assert wilson.check(["4"] * 8, 8) is None
+    assert wilson.check(["4"] * 9, 9) == "wilson"
+
+    sprt = EarlyStopping(identical_runs=None, method="sprt", target=0.5, margin=0.3)
+    assert sprt.check(["4", "4"], 2) is None
+    assert sprt.check(["4", "4", "4"], 3) == "sprt"
+    assert sprt.check(["5", "5", "5"], 0) == "sprt"
+    assert sprt.check(["4", "5", "4", "5"], 2) is None
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        EarlyStopping(min_runs=0)
+    with pytest.raises(ValueError):
+        EarlyStopping(identical_runs=1)
+    with pytest.raises(ValueError):
+        EarlyStopping(method="bayes")
+
+
+def test_identical_responses_collapse_remaining_runs(monkeypatch, one_problem):
+    calls = _scripted_chat(monkeypatch, ["4"] * 10)
+    result = evaluate_model("m", "math", 0, runs=10, stopping=EarlyStopping())
+    assert len(calls) == 3
+    assert result["calls"] == 3
+    assert result["stopped"] == "identical"
+    assert result["runs"] == 10
+    assert result["correct"] == 10
+    assert result["responses"] == ["4"] * 10
+
+
+def test_settled_estimate_reports_runs_made(monkeypatch, one_problem):
+    messages = ["4", "5", "5", "5", "5", "5", "5", "5"]
+    calls = _scripted_chat(monkeypatch, messages)
+    rule = EarlyStopping(method="sprt", target=0.6, margin=0.3)
+    result = evaluate_model("m", "math", 0, runs=10, stopping=rule)
+    assert result["stopped"] == "sprt"
+    assert result["runs"] == result["calls"] == len(calls) < 10
+    assert result["responses"] == messages[: len(calls)]
+    assert result["correct"] == 1
+
+
+def test_without_stopping_every_run_is_made(monkeypatch, one_problem):
+    calls = _scripted_chat(monkeypatch, ["4"] * 5)
+    result = evaluate_model("m", "math", 0, runs=5)
+    assert len(calls) == result["calls"] == result["runs"] == 5
+    assert result["stopped"] is None
+
+
+def test_restored_runs_count_towards_the_rule(tmp_path, monkeypatch, one_problem):
+    calls = _scripted_chat(monkeypatch, ["4"] * 10)
+    with ResultSink(tmp_path / "runs.jsonl") as sink:
+        evaluate_model("m", "math", 0, runs=2, sink=sink)
+        result = evaluate_model("m", "math", 0, runs=10, sink=sink, stopping=EarlyStopping())
+    assert len(calls) == 3
+    assert result["calls"] == 1
+    assert result["stopped"] == "identical"
+
+
+def test_aevaluate_model_stops_in_waves(monkeypatch, one_problem):
+    state = {"calls": 0}
+    messages = ["4", "5", "4", "4", "5", "5", "4", "4", "5", "4"]
+
+    async def fake_achat(prompt, model, max_tokens=1024, temperature=0):
+        state["calls"] += 1
+        return {"message": messages[state["calls"] - 1], "usage": {}}
+
+    monkeypatch.setattr("smartmodelrouter.benchmark.achat_completion", fake_achat)
+    rule = EarlyStopping(min_runs=2, max_width=0.7)
+    result = asyncio.run(
+        aevaluate_model("m", "math", 0, runs=10, concurrency=2, stopping=rule)
+    )
+    assert result["stopped"] == "wilson"
+    assert result["responses"] == messages[: result["runs"]]
+    assert result["calls"] == state["calls"] < 10
+    assert result["runs"] <= result["calls"]
+
+    state["calls"] = 0
+    messages = ["4"] * 10
+    result = asyncio.run(
+        aevaluate_model("m", "math", 0, runs=10, concurrency=10, stopping=EarlyStopping())
+    )
+    assert state["calls"] == 3
+    assert result["runs"] == 10 and result["correct"] == 10
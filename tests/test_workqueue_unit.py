@@ -0,0 +1,162 @@
+import json
+import time
+
+import pytest
+
+from smartmodelrouter import workqueue
+from smartmodelrouter.mockserver import MockOpenAIServer
+from smartmodelrouter.workqueue import (
+    WorkQueue,
+    collect_suite,
+    enqueue_suite,
+    evaluate_distributed,
+    run_worker,
+)
+
+QUESTIONS = [
+    {"question": "What is 40 + 2?", "answer": "42"},
+    {"question": "What is 2 + 2?", "answer": "4"},
+    {"question": "What is 6 * 7?", "answer": "42"},
+]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with WorkQueue(tmp_path / "queue.sqlite", max_attempts=2) as queue:
+        yield queue
+
+
+def test_leases_are_exclusive_until_they_expire(queue):
+    keys = [("m", "math", 0, run) for run in range(3)]
+    assert queue.enqueue(keys) == 3
+    assert queue.enqueue(keys) == 0
+
+    assert queue.claim("a", limit=2, lease=0.05) == keys[:2]
+    assert queue.claim("b", limit=5) == keys[2:]
+    assert queue.claim("b") == []
+    assert queue.counts() == {"pending": 0, "leased": 3, "done": 0, "failed": 0}
+
+    time.sleep(0.06)
+    # Worker "a" stopped renewing, so its tasks go to the next claimer.
+    assert queue.claim("b", limit=5) == keys[:2]
+    assert queue.renew("b") == 3
+    assert queue.complete(keys[0], {"run": 0})
+    assert not queue.complete(keys[0], {"run": 0})
+    assert queue.counts()["done"] == 1
+    assert list(queue.records()) == [{"run": 0}]
+
+
+def test_failed_attempts_are_retried_then_given_up(queue):
+    key = ("m", "math", 0, 0)
+    queue.enqueue([key])
+    queue.claim("a")
+    queue.fail(key, "boom")
+    assert queue.counts()["pending"] == 1
+    queue.claim("a")
+    queue.fail(key, "boom again")
+    assert queue.finished()
+    assert queue.failures() == [(key, "boom again")]
+
+
+def test_tasks_that_keep_losing_their_lease_fail(queue):
+    key = ("m", "math", 0, 0)
+    queue.enqueue([key])
+    for _ in range(2):
+        assert queue.claim("crashy", lease=0.0) == [key]
+    assert queue.claim("next") == []
+    assert queue.failures() == [(key, "lease expired")]
+
+
+def _fake_completion(monkeypatch, calls):
+    def chat_completion(prompt, model, max_tokens, temperature):
+        calls.append((model, prompt))
+        return {"message": " 42 ", "usage": {"total_tokens": 3}}
+
+    monkeypatch.setattr(workqueue._benchmark, "chat_completion", chat_completion)
+    monkeypatch.setattr(workqueue._benchmark, "_load_dataset", lambda dataset: QUESTIONS)
+
+
+def test_worker_finishes_tasks_of_a_crashed_worker(monkeypatch, tmp_path):
+    calls = []
+    _fake_completion(monkeypatch, calls)
+    path = tmp_path / "queue.sqlite"
+    with WorkQueue(path) as queue:
+        assert enqueue_suite(queue, ["m1", "m2"], ["math"], indices=[0, 1], runs=2) == 8
+        queue.claim("crashed", limit=3, lease=0.2)
+
+    assert run_worker(path, worker="w", threads=3, lease=5.0, poll_interval=0.02) == 8
+    assert len(calls) == 8
+
+    with WorkQueue(path) as queue:
+        suite = collect_suite(queue)
+    assert list(suite["results"]) == ["m1", "m2"]
+    result = suite["results"]["m1"]["math"][0]
+    assert result["responses"] == ["42", "42"]
+    assert result["correct"] == 2
+    assert suite["accuracy"]["m2"]["math"] == 0.5
+
+
+def test_collect_suite_skips_records_of_other_sweeps(monkeypatch, tmp_path):
+    _fake_completion(monkeypatch, [])
+    path = tmp_path / "queue.sqlite"
+    with WorkQueue(path) as queue:
+        enqueue_suite(queue, ["m1", "m2"], ["math", "code"], indices=[0, 1], runs=3)
+    run_worker(path, threads=2, poll_interval=0.01)
+
+    with WorkQueue(path) as queue:
+        suite = collect_suite(queue, ["m1"], runs=2, datasets=["math"], indices={"math": [1]})
+    assert list(suite["results"]) == ["m1"]
+    assert list(suite["results"]["m1"]) == ["math"]
+    assert list(suite["results"]["m1"]["math"]) == [1]
+    assert suite["results"]["m1"]["math"][1]["responses"] == ["42", "42"]
+
+
+def test_evaluate_distributed_rejects_an_unfinished_queue(monkeypatch, tmp_path):
+    _fake_completion(monkeypatch, [])
+    monkeypatch.setattr(workqueue, "_run_processes", lambda *args: None)
+    with pytest.raises(RuntimeError, match="not finished: 2 pending"):
+        evaluate_distributed(tmp_path / "queue.sqlite", ["m"], ["math"], indices=[0], runs=2)
+
+
+def test_failing_runs_are_reported(monkeypatch, tmp_path):
+    def chat_completion(prompt, model, max_tokens, temperature):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(workqueue._benchmark, "chat_completion", chat_completion)
+    monkeypatch.setattr(workqueue._benchmark, "_load_dataset", lambda dataset: QUESTIONS)
+    path = tmp_path / "queue.sqlite"
+    with WorkQueue(path) as queue:
+        enqueue_suite(queue, ["m"], ["math"], indices=[0], runs=1)
+    assert run_worker(path, threads=1, max_attempts=2, poll_interval=0.01) == 0
+    with WorkQueue(path) as queue:
+        [(key, error)] = queue.failures()
+    assert key == ("m", "math", 0, 0)
+    assert error == "RuntimeError: provider down"
+
+
+def test_evaluate_distributed_with_worker_processes(monkeypatch, tmp_path):
+    dataset = tmp_path / "problems.jsonl"
+    dataset.write_text("\n".join(json.dumps(entry) for entry in QUESTIONS) + "\n")
+    with MockOpenAIServer(latency=0.01) as server:
+        # Spawned workers configure their clients from the environment.
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        suite = evaluate_distributed(
+            tmp_path / "queue.sqlite",
+            ["a", "b"],
+            [str(dataset)],
+            runs=3,
+            processes=2,
+            threads=2,
+        )
+    assert server.requests == 18
+    per_problem = suite["results"]["a"][str(dataset)]
+    assert [per_problem[index]["correct"] for index in range(3)] == [3, 0, 3]
+    assert per_problem[1]["responses"] == ["42"] * 3
+    assert suite["overall"] == {"a": pytest.approx(2 / 3), "b": pytest.approx(2 / 3)}
+
+    # Re-running against the finished queue makes no new requests.
+    again = evaluate_distributed(
+        tmp_path / "queue.sqlite", ["a", "b"], [str(dataset)], runs=3, processes=1
+    )
+    assert again == suite